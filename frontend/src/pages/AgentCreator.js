@@ -2,9 +2,11 @@ import React, { useState, useEffect } from 'react';
 import axios from 'axios';
 
 const API_URL = process.env.REACT_APP_AGENT_CREATOR_URL || 'http://localhost:8003';
+const LIST_PAGE_SIZE = 50;
 
 function AgentCreator() {
   const [agents, setAgents] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [templates, setTemplates] = useState([]);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
@@ -24,10 +26,15 @@ function AgentCreator() {
     loadTemplates();
   }, []);
 
-  const loadAgents = async () => {
+  // Without a cursor the first page replaces the list; with one it is appended
+  const loadAgents = async (cursor = null) => {
     try {
-      const response = await axios.get(`${API_URL}/agents/list`);
-      setAgents(response.data.agents || []);
+      const response = await axios.get(`${API_URL}/agents/list`, {
+        params: { limit: LIST_PAGE_SIZE, ...(cursor ? { cursor } : {}) }
+      });
+      const page = response.data.agents || [];
+      setAgents(prev => (cursor ? [...prev, ...page] : page));
+      setNextCursor(response.data.next_cursor || null);
     } catch (err) {
       console.error('Failed to load agents:', err);
     }
@@ -203,7 +210,7 @@ function AgentCreator() {
       </div>
 
       <div className="card">
-        <h2>Your Agents ({agents.length})</h2>
+        <h2>Your Agents ({agents.length}{nextCursor ? '+' : ''})</h2>
         {agents.length === 0 ? (
           <p style={{ color: '#666' }}>No agents created yet.</p>
         ) : (
@@ -224,6 +231,15 @@ function AgentCreator() {
             ))}
           </div>
         )}
+        {nextCursor && (
+          <button
+            className="button"
+            style={{ marginTop: '15px' }}
+            onClick={() => loadAgents(nextCursor)}
+          >
+            Load More
+          </button>
+        )}
       </div>
     </div>
   );
@@ -2,6 +2,23 @@ import React, { useState } from 'react';
 import axios from 'axios';
 
 const API_URL = process.env.REACT_APP_AUDIO_SERVICE_URL || 'http://localhost:8002';
+const POLL_INTERVAL_MS = 2000;
+// Give up after 30 minutes of polling
+const MAX_POLL_ATTEMPTS = 900;
+
+class ResultTimeoutError extends Error {}
+
+// Jobs are queued by the service; poll the result URL until it is ready
+const waitForResult = async (resultUrl) => {
+  for (let attempt = 0; attempt < MAX_POLL_ATTEMPTS; attempt++) {
+    const response = await axios.get(`${API_URL}${resultUrl}`);
+    if (response.status === 200) {
+      return response.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+  }
+  throw new ResultTimeoutError('Timed out waiting for the result');
+};
 
 function AudioService() {
   const [file, setFile] = useState(null);
@@ -31,9 +48,9 @@ function AudioService() {
 
     try {
       const response = await axios.post(`${API_URL}/audio/transcribe`, formData);
-      setResult(response.data);
+      setResult(await waitForResult(response.data.result_url));
     } catch (err) {
-      setError(err.response?.data?.detail || 'Transcription failed');
+      setError(err.response?.data?.detail || (err instanceof ResultTimeoutError ? err.message : 'Transcription failed'));
     } finally {
       setLoading(false);
     }
@@ -59,9 +76,9 @@ function AudioService() {
 
     try {
       const response = await axios.post(`${API_URL}/audio/highlight`, formData);
-      setResult(response.data);
+      setResult(await waitForResult(response.data.result_url));
     } catch (err) {
-      setError(err.response?.data?.detail || 'Processing failed');
+      setError(err.response?.data?.detail || (err instanceof ResultTimeoutError ? err.message : 'Processing failed'));
     } finally {
       setLoading(false);
     }
@@ -280,8 +280,8 @@ function WhatsAppService() {
           <p style={{ color: '#666' }}>No messages logged yet.</p>
         ) : (
           <div style={{ maxHeight: '400px', overflow: 'auto' }}>
-            {messages.slice().reverse().map((msg, index) => (
-              <div key={index} style={{ 
+            {messages.map((msg) => (
+              <div key={msg.id} style={{ 
                 padding: '10px', 
                 border: '1px solid #ddd', 
                 borderRadius: '5px',
@@ -1,15 +1,34 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from fastapi.responses import Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, ValidationError
+from typing import Any, List, Dict, Optional, Tuple, Set
+from contextlib import asynccontextmanager, contextmanager
+from collections import OrderedDict
+import base64
 import json
 import yaml
 import uuid
+import sqlite3
+import threading
+import time
 from pathlib import Path
 from datetime import datetime
 import os
 
-app = FastAPI(title="Agent Creator Service", description="Create and manage AI agents")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the store (and import legacy files) before serving requests
+    await run_in_threadpool(get_agent_store)
+    yield
+    # Commit pending writes before exiting
+    if agent_store is not None:
+        await run_in_threadpool(agent_store.close)
+
+
+app = FastAPI(title="Agent Creator Service", description="Create and manage AI agents", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -23,6 +42,29 @@ app.add_middleware(
 AGENTS_DIR = Path(os.getenv("UPLOAD_DIR", "/uploads")) / "agents"
 AGENTS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Storage backend: "sqlite" (default, shared by all workers) or "files"
+# (legacy one-JSON-file-per-agent layout)
+AGENT_STORE = os.getenv("AGENT_STORE", "sqlite")
+AGENTS_DB_PATH = Path(os.getenv("AGENTS_DB_PATH", str(AGENTS_DIR / "agents.db")))
+
+# Write-behind batching: writes are committed at most this long after they
+# arrive, in batches of up to this many agents
+AGENT_WRITE_INTERVAL_MS = int(os.getenv("AGENT_WRITE_INTERVAL_MS", "50"))
+AGENT_WRITE_BATCH_SIZE = int(os.getenv("AGENT_WRITE_BATCH_SIZE", "500"))
+# Longest a list or bulk request waits for pending writes before failing with 503
+AGENT_FLUSH_TIMEOUT = float(os.getenv("AGENT_FLUSH_TIMEOUT", "10"))
+
+# Listing: fields that can be projected (never system_prompt or tools)
+LIST_FIELDS = ["agent_id", "name", "description", "model", "temperature", "capabilities", "created_at"]
+DEFAULT_LIST_FIELDS = ["agent_id", "name", "description", "created_at"]
+MAX_LIST_LIMIT = 500
+
+# Bulk endpoints: most items accepted per request
+AGENT_BULK_MAX_ITEMS = int(os.getenv("AGENT_BULK_MAX_ITEMS", "10000"))
+
+# Bumped when the SQLite schema changes; older databases are migrated on open
+AGENT_SCHEMA_VERSION = 2
+
 
 class Tool(BaseModel):
     name: str
@@ -40,6 +82,10 @@ class Agent(BaseModel):
     capabilities: List[str] = Field(default=[], description="Agent capabilities")
 
 
+class AgentUpdate(Agent):
+    agent_id: str = Field(..., description="Agent to update")
+
+
 class AgentResponse(BaseModel):
     agent_id: str
     name: str
@@ -48,12 +94,480 @@ class AgentResponse(BaseModel):
     config: Dict
 
 
-# In-memory storage (in production, use a database)
-agents_store: Dict[str, Dict] = {}
+def agent_columns(record: Dict) -> Tuple:
+    """Indexed and listed columns of an agent row."""
+    config = record["config"]
+    return (
+        record["id"],
+        config["name"],
+        config["description"],
+        config.get("model"),
+        config.get("temperature"),
+        json.dumps(config.get("capabilities", [])),
+        config["created_at"],
+        json.dumps(config)
+    )
 
 
-def generate_agent_config(agent: Agent) -> Dict:
-    """Generate agent configuration."""
+def project_agent(record: Dict, fields: List[str]) -> Dict:
+    """Listing entry with only the requested fields."""
+    config = record["config"]
+    return {field: record["id"] if field == "agent_id" else config.get(field) for field in fields}
+
+
+class SQLiteAgentStore:
+    """Agents in an SQLite database (WAL mode) that several workers can share.
+    
+    Listed fields are stored as columns next to the full config, and
+    capabilities in a side table, so listings are answered from indexes
+    without decoding configs.
+    """
+    
+    # Column expression for each listing field
+    LIST_COLUMNS = {
+        "agent_id": "id",
+        "name": "name",
+        "description": "description",
+        "model": "model",
+        "temperature": "temperature",
+        "capabilities": "capabilities",
+        "created_at": "created_at"
+    }
+    
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS agents ("
+                "id TEXT PRIMARY KEY, created_at TEXT NOT NULL, config TEXT NOT NULL)"
+            )
+            if conn.execute("PRAGMA user_version").fetchone()[0] < AGENT_SCHEMA_VERSION:
+                self._migrate(conn)
+    
+    def _migrate(self, conn: sqlite3.Connection):
+        """Add listing columns, the capability table and indexes, and backfill them."""
+        # Lock out other workers migrating the same file
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= AGENT_SCHEMA_VERSION:
+            return
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(agents)")}
+        for column, definition in [
+            ("name", "TEXT NOT NULL DEFAULT ''"),
+            ("description", "TEXT NOT NULL DEFAULT ''"),
+            ("model", "TEXT"),
+            ("temperature", "REAL"),
+            ("capabilities", "TEXT NOT NULL DEFAULT '[]'")
+        ]:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE agents ADD COLUMN {column} {definition}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS agent_capabilities ("
+            "agent_id TEXT NOT NULL, capability TEXT NOT NULL, PRIMARY KEY (agent_id, capability))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS agents_created ON agents (created_at, id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS agents_model ON agents (model, created_at, id)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS agent_capabilities_capability "
+            "ON agent_capabilities (capability, agent_id)"
+        )
+        
+        records = [
+            {"id": agent_id, "config": json.loads(config)}
+            for agent_id, config in conn.execute("SELECT id, config FROM agents")
+        ]
+        self._write(conn, records, [])
+        conn.execute(f"PRAGMA user_version = {AGENT_SCHEMA_VERSION}")
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get(self, agent_id: str) -> Optional[Dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT config FROM agents WHERE id = ?", (agent_id,)).fetchone()
+        return {"id": agent_id, "config": json.loads(row[0])} if row else None
+    
+    def list_all(self) -> List[Dict]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, config FROM agents ORDER BY created_at, id").fetchall()
+        return [{"id": agent_id, "config": json.loads(config)} for agent_id, config in rows]
+    
+    def query(
+        self,
+        fields: List[str],
+        model: Optional[str] = None,
+        capabilities: Optional[List[str]] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 50
+    ) -> List[Tuple[Tuple[str, str], Dict]]:
+        """One page of agents ordered by (created_at, id).
+        
+        Returns (sort key, projected entry) pairs; after is the sort key of
+        the last entry of the previous page.
+        """
+        columns = ", ".join(self.LIST_COLUMNS[field] for field in fields)
+        where, params = [], []
+        if model is not None:
+            where.append("model = ?")
+            params.append(model)
+        for capability in capabilities or []:
+            where.append("id IN (SELECT agent_id FROM agent_capabilities WHERE capability = ?)")
+            params.append(capability)
+        if created_after is not None:
+            where.append("created_at >= ?")
+            params.append(created_after)
+        if created_before is not None:
+            where.append("created_at < ?")
+            params.append(created_before)
+        if after is not None:
+            where.append("(created_at, id) > (?, ?)")
+            params.extend(after)
+        
+        sql = f"SELECT created_at, id, {columns} FROM agents"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at, id LIMIT ?"
+        params.append(limit)
+        
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        page = []
+        for created_at, agent_id, *values in rows:
+            entry = dict(zip(fields, values))
+            if "capabilities" in entry:
+                entry["capabilities"] = json.loads(entry["capabilities"])
+            page.append(((created_at, agent_id), entry))
+        return page
+    
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM agents").fetchone()[0]
+    
+    def existing(self, agent_ids: List[str]) -> Set[str]:
+        """The subset of agent_ids that are stored."""
+        found = set()
+        with self._connect() as conn:
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(agent_ids), 500):
+                chunk = agent_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                found.update(row[0] for row in conn.execute(f"SELECT id FROM agents WHERE id IN ({placeholders})", chunk))
+        return found
+    
+    def created_at(self, agent_ids: List[str]) -> Dict[str, str]:
+        """created_at of each stored agent among agent_ids."""
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(agent_ids), 500):
+                chunk = agent_ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                found.update(conn.execute(f"SELECT id, created_at FROM agents WHERE id IN ({placeholders})", chunk))
+        return found
+    
+    def _write(self, conn: sqlite3.Connection, upserts: List[Dict], deletes: List[str]):
+        conn.executemany(
+            "INSERT OR REPLACE INTO agents "
+            "(id, name, description, model, temperature, capabilities, created_at, config) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [agent_columns(record) for record in upserts]
+        )
+        # Rebuild capability rows for every touched agent
+        conn.executemany(
+            "DELETE FROM agent_capabilities WHERE agent_id = ?",
+            [(record["id"],) for record in upserts] + [(agent_id,) for agent_id in deletes]
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO agent_capabilities (agent_id, capability) VALUES (?, ?)",
+            [
+                (record["id"], capability)
+                for record in upserts
+                for capability in record["config"].get("capabilities", [])
+            ]
+        )
+        conn.executemany("DELETE FROM agents WHERE id = ?", [(agent_id,) for agent_id in deletes])
+    
+    def apply(self, upserts: List[Dict], deletes: List[str]):
+        """Write a batch of upserts and deletes in one transaction."""
+        with self._connect() as conn:
+            self._write(conn, upserts, deletes)
+
+
+class FileAgentStore:
+    """Legacy layout: one {agent_id}.json config file per agent."""
+    
+    def __init__(self, root: Path):
+        self.root = root
+        root.mkdir(parents=True, exist_ok=True)
+    
+    def get(self, agent_id: str) -> Optional[Dict]:
+        path = self.root / f"{agent_id}.json"
+        try:
+            with open(path, "r") as f:
+                return {"id": agent_id, "config": json.load(f)}
+        except FileNotFoundError:
+            return None
+    
+    def list_all(self) -> List[Dict]:
+        records = [self.get(path.stem) for path in self.root.glob("*.json")]
+        records = [record for record in records if record is not None]
+        return sorted(records, key=lambda record: (record["config"]["created_at"], record["id"]))
+    
+    def query(
+        self,
+        fields: List[str],
+        model: Optional[str] = None,
+        capabilities: Optional[List[str]] = None,
+        created_after: Optional[str] = None,
+        created_before: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: int = 50
+    ) -> List[Tuple[Tuple[str, str], Dict]]:
+        """Same contract as SQLiteAgentStore.query, by scanning every file."""
+        page = []
+        for record in self.list_all():
+            config = record["config"]
+            key = (config["created_at"], record["id"])
+            if (
+                (model is not None and config.get("model") != model)
+                or not set(capabilities or []) <= set(config.get("capabilities", []))
+                or (created_after is not None and key[0] < created_after)
+                or (created_before is not None and key[0] >= created_before)
+                or (after is not None and key <= tuple(after))
+            ):
+                continue
+            page.append((key, project_agent(record, fields)))
+            if len(page) == limit:
+                break
+        return page
+    
+    def count(self) -> int:
+        return sum(1 for _ in self.root.glob("*.json"))
+    
+    def existing(self, agent_ids: List[str]) -> Set[str]:
+        return {agent_id for agent_id in agent_ids if (self.root / f"{agent_id}.json").exists()}
+    
+    def created_at(self, agent_ids: List[str]) -> Dict[str, str]:
+        records = (self.get(agent_id) for agent_id in agent_ids)
+        return {record["id"]: record["config"]["created_at"] for record in records if record is not None}
+    
+    def apply(self, upserts: List[Dict], deletes: List[str]):
+        for record in upserts:
+            path = self.root / f"{record['id']}.json"
+            temp_path = path.with_suffix(".json.tmp")
+            with open(temp_path, "w") as f:
+                json.dump(record["config"], f, indent=2)
+            os.replace(temp_path, path)
+        for agent_id in deletes:
+            (self.root / f"{agent_id}.json").unlink(missing_ok=True)
+            # YAML copies written by older versions
+            (self.root / f"{agent_id}.yaml").unlink(missing_ok=True)
+
+
+AGENT_STORES = {"sqlite": lambda: SQLiteAgentStore(AGENTS_DB_PATH), "files": lambda: FileAgentStore(AGENTS_DIR)}
+
+
+class WriteBehindStore:
+    """Buffer writes in memory and commit them to a backend in batches.
+    
+    Pending writes (None marks a delete) are served to reads in this process
+    straight away; a background thread commits them within
+    AGENT_WRITE_INTERVAL_MS, so request handlers never wait on disk. Other
+    workers see a write once it is committed.
+    """
+    
+    def __init__(self, backend, batch_size: int, interval: float, flush_timeout: float = AGENT_FLUSH_TIMEOUT):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.interval = interval
+        self.flush_timeout = flush_timeout
+        self.pending: "OrderedDict[str, Optional[Dict]]" = OrderedDict()
+        self._writing: Dict[str, Optional[Dict]] = {}
+        self._flush_waiters = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._thread = threading.Thread(target=self._run, name="agent-writer", daemon=True)
+        self._thread.start()
+    
+    def _lookup(self, agent_id: str) -> Tuple[bool, Optional[Dict]]:
+        with self._cond:
+            for layer in (self.pending, self._writing):
+                if agent_id in layer:
+                    return True, layer[agent_id]
+        return False, None
+    
+    def get(self, agent_id: str) -> Optional[Dict]:
+        found, record = self._lookup(agent_id)
+        return record if found else self.backend.get(agent_id)
+    
+    def put_many(self, records: List[Dict]):
+        with self._cond:
+            for record in records:
+                self.pending[record["id"]] = record
+                self.pending.move_to_end(record["id"])
+            self._cond.notify_all()
+    
+    def put(self, record: Dict):
+        self.put_many([record])
+    
+    def delete(self, agent_id: str) -> bool:
+        """Delete an agent; returns False if it doesn't exist."""
+        if self.get(agent_id) is None:
+            return False
+        with self._cond:
+            self.pending[agent_id] = None
+            self._cond.notify_all()
+        return True
+    
+    def list_all(self) -> List[Dict]:
+        # Commit first so the backend's ordering applies to every record
+        self._commit_pending()
+        return self.backend.list_all()
+    
+    def query(self, fields: List[str], **filters) -> List[Tuple[Tuple[str, str], Dict]]:
+        # Commit first so pending writes are filtered and paged like the rest
+        self._commit_pending()
+        return self.backend.query(fields, **filters)
+    
+    def existing(self, agent_ids: List[str]) -> Set[str]:
+        self._commit_pending()
+        return self.backend.existing(agent_ids)
+    
+    def created_at(self, agent_ids: List[str]) -> Dict[str, str]:
+        self._commit_pending()
+        return self.backend.created_at(agent_ids)
+    
+    def apply(self, upserts: List[Dict], deletes: List[str]):
+        """Commit a batch synchronously, in one backend transaction.
+        
+        Pending writes are committed first so they can't overwrite the batch.
+        """
+        self._commit_pending()
+        self.backend.apply(upserts, deletes)
+    
+    def _commit_pending(self):
+        """Flush, failing with 503 while the backend keeps rejecting writes."""
+        if not self.flush(self.flush_timeout):
+            raise HTTPException(
+                status_code=503,
+                detail=f"Agent store is not accepting writes: {self.last_error or 'commit timed out'}"
+            )
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every pending write is committed."""
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(lambda: not self.pending and not self._writing, timeout)
+            finally:
+                self._flush_waiters -= 1
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self.pending or self._closed)
+                if not self.pending:
+                    return
+                # Let a burst accumulate unless someone is waiting on it
+                self._cond.wait_for(
+                    lambda: len(self.pending) >= self.batch_size or self._flush_waiters or self._closed,
+                    self.interval
+                )
+                batch = []
+                while self.pending and len(batch) < self.batch_size:
+                    batch.append(self.pending.popitem(last=False))
+                self._writing = dict(batch)
+            
+            try:
+                self.backend.apply(
+                    [record for _, record in batch if record is not None],
+                    [agent_id for agent_id, record in batch if record is None]
+                )
+                self.batches += 1
+                self.writes += len(batch)
+                failed = False
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                failed = True
+            
+            with self._cond:
+                if failed:
+                    # Retry, without overriding writes that arrived meanwhile
+                    for agent_id, record in batch:
+                        if agent_id not in self.pending:
+                            self.pending[agent_id] = record
+                            self.pending.move_to_end(agent_id, last=False)
+                self._writing = {}
+                self._cond.notify_all()
+            if failed:
+                time.sleep(1)
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            pending = len(self.pending) + len(self._writing)
+        return {
+            "backend": type(self.backend).__name__,
+            "pending": pending,
+            "batches": self.batches,
+            "writes": self.writes,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+    
+    def close(self):
+        """Commit pending writes and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=30)
+
+
+agent_store: Optional[WriteBehindStore] = None
+agent_store_lock = threading.Lock()
+
+
+def import_legacy_agents(backend: SQLiteAgentStore) -> int:
+    """Copy agents saved as JSON files into an empty database."""
+    if backend.count():
+        return 0
+    records = FileAgentStore(AGENTS_DIR).list_all()
+    backend.apply(records, [])
+    return len(records)
+
+
+def get_agent_store() -> WriteBehindStore:
+    """Open the configured store on first use."""
+    global agent_store
+    with agent_store_lock:
+        if agent_store is None:
+            if AGENT_STORE not in AGENT_STORES:
+                raise RuntimeError(f"Unknown AGENT_STORE {AGENT_STORE!r}; allowed: {', '.join(AGENT_STORES)}")
+            backend = AGENT_STORES[AGENT_STORE]()
+            if isinstance(backend, SQLiteAgentStore):
+                import_legacy_agents(backend)
+            agent_store = WriteBehindStore(backend, AGENT_WRITE_BATCH_SIZE, AGENT_WRITE_INTERVAL_MS / 1000)
+        return agent_store
+
+
+def generate_agent_config(agent: Agent, created_at: Optional[str] = None) -> Dict:
+    """Generate agent configuration.
+    
+    Updates pass the agent's original created_at, which listing pages by.
+    """
     return {
         "name": agent.name,
         "description": agent.description,
@@ -62,23 +576,10 @@ def generate_agent_config(agent: Agent) -> Dict:
         "system_prompt": agent.system_prompt,
         "tools": [tool.dict() for tool in agent.tools],
         "capabilities": agent.capabilities,
-        "created_at": datetime.utcnow().isoformat()
+        "created_at": created_at or datetime.utcnow().isoformat()
     }
 
 
-def save_agent_config(agent_id: str, config: Dict):
-    """Save agent configuration to file."""
-    # Save as JSON
-    json_path = AGENTS_DIR / f"{agent_id}.json"
-    with open(json_path, "w") as f:
-        json.dump(config, f, indent=2)
-    
-    # Save as YAML
-    yaml_path = AGENTS_DIR / f"{agent_id}.yaml"
-    with open(yaml_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False)
-
-
 @app.get("/")
 async def root():
     return {
@@ -96,14 +597,11 @@ async def create_agent(agent: Agent):
     # Generate configuration
     config = generate_agent_config(agent)
     
-    # Store agent
-    agents_store[agent_id] = {
+    # Store agent; the write is committed in the background
+    get_agent_store().put({
         "id": agent_id,
         "config": config
-    }
-    
-    # Save to file
-    save_agent_config(agent_id, config)
+    })
     
     return AgentResponse(
         agent_id=agent_id,
@@ -114,46 +612,112 @@ async def create_agent(agent: Agent):
     )
 
 
+def encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    created_at, agent_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    return str(created_at), str(agent_id)
+
+
 @app.get("/agents/list")
-async def list_agents():
-    """List all created agents."""
+async def list_agents(
+    model: Optional[str] = None,
+    capabilities: Optional[str] = None,
+    created_after: Optional[str] = None,
+    created_before: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_LIST_LIMIT)
+):
+    """List created agents, oldest first, one page at a time.
+    
+    capabilities is comma-separated and matches agents having all of them;
+    created_after/created_before bound created_at (ISO 8601, half-open).
+    fields picks the returned keys from LIST_FIELDS. Pass next_cursor back
+    as cursor to get the following page.
+    """
+    selected = [field.strip() for field in fields.split(",") if field.strip()] if fields else DEFAULT_LIST_FIELDS
+    unknown = [field for field in selected if field not in LIST_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(LIST_FIELDS)}"
+        )
+    
+    try:
+        for bound in (created_after, created_before):
+            if bound is not None:
+                datetime.fromisoformat(bound)
+        after = decode_cursor(cursor) if cursor else None
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor or date: {str(e)}")
+    
+    # One extra row tells whether there is a next page
+    page = await run_in_threadpool(
+        get_agent_store().query,
+        selected,
+        model=model,
+        capabilities=[c.strip() for c in capabilities.split(",") if c.strip()] if capabilities else None,
+        created_after=created_after,
+        created_before=created_before,
+        after=after,
+        limit=limit + 1
+    )
+    next_cursor = encode_cursor(page[limit - 1][0]) if len(page) > limit else None
     return {
-        "agents": [
-            {
-                "agent_id": agent_id,
-                "name": data["config"]["name"],
-                "description": data["config"]["description"],
-                "created_at": data["config"]["created_at"]
-            }
-            for agent_id, data in agents_store.items()
-        ],
-        "total": len(agents_store)
+        "agents": [entry for _, entry in page[:limit]],
+        "next_cursor": next_cursor
     }
 
 
+@app.get("/agents/store/stats")
+async def store_stats():
+    """Storage backend and write-behind queue statistics."""
+    return get_agent_store().stats()
+
+
 @app.get("/agents/{agent_id}")
 async def get_agent(agent_id: str):
     """Get agent configuration."""
-    if agent_id not in agents_store:
+    record = await run_in_threadpool(get_agent_store().get, agent_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    
+    return record
+
+
+@app.get("/agents/{agent_id}/yaml")
+async def get_agent_yaml(agent_id: str):
+    """Get agent configuration rendered as YAML."""
+    record = await run_in_threadpool(get_agent_store().get, agent_id)
+    if record is None:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    return agents_store[agent_id]
+    return Response(
+        content=yaml.dump(record["config"], default_flow_style=False),
+        media_type="application/x-yaml",
+        headers={"Content-Disposition": f'inline; filename="{agent_id}.yaml"'}
+    )
 
 
 @app.put("/agents/{agent_id}")
 async def update_agent(agent_id: str, agent: Agent):
     """Update agent configuration."""
-    if agent_id not in agents_store:
+    store = get_agent_store()
+    current = await run_in_threadpool(store.get, agent_id)
+    if current is None:
         raise HTTPException(status_code=404, detail="Agent not found")
     
     # Generate new configuration
-    config = generate_agent_config(agent)
+    config = generate_agent_config(agent, current["config"]["created_at"])
     
     # Update store
-    agents_store[agent_id]["config"] = config
-    
-    # Save to file
-    save_agent_config(agent_id, config)
+    store.put({
+        "id": agent_id,
+        "config": config
+    })
     
     return {
         "agent_id": agent_id,
@@ -165,22 +729,141 @@ async def update_agent(agent_id: str, agent: Agent):
 @app.delete("/agents/{agent_id}")
 async def delete_agent(agent_id: str):
     """Delete an agent."""
-    if agent_id not in agents_store:
+    if not await run_in_threadpool(get_agent_store().delete, agent_id):
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    # Remove from store
-    del agents_store[agent_id]
+    return {"message": "Agent deleted successfully"}
+
+
+def parse_bulk_body(body: bytes, content_type: str) -> List[Any]:
+    """Items of a JSON array or NDJSON body.
     
-    # Delete files
-    json_path = AGENTS_DIR / f"{agent_id}.json"
-    yaml_path = AGENTS_DIR / f"{agent_id}.yaml"
+    NDJSON lines that aren't valid JSON become ValueError items, so they're
+    reported per item instead of failing the whole request.
+    """
+    if "ndjson" in content_type:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ValueError(f"Invalid JSON: {str(e)}"))
+    else:
+        try:
+            items = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {str(e)}")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array or NDJSON body")
     
-    if json_path.exists():
-        json_path.unlink()
-    if yaml_path.exists():
-        yaml_path.unlink()
+    if len(items) > AGENT_BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {AGENT_BULK_MAX_ITEMS} items per request")
+    return items
+
+
+def validate_items(items: List[Any], model) -> List[Tuple[int, Any, Optional[List[Dict]]]]:
+    """Validate every item against model, returning (index, parsed, errors)."""
+    validated = []
+    for index, item in enumerate(items):
+        if isinstance(item, Exception):
+            validated.append((index, None, [{"loc": [], "msg": str(item)}]))
+            continue
+        try:
+            validated.append((index, model.model_validate(item), None))
+        except ValidationError as e:
+            errors = [{"loc": list(error["loc"]), "msg": error["msg"]} for error in e.errors()]
+            validated.append((index, None, errors))
+    return validated
+
+
+def bulk_summary(results: List[Dict], success: str) -> Dict:
+    succeeded = sum(1 for result in results if result["status"] == success)
+    return {"results": results, "succeeded": succeeded, "failed": len(results) - succeeded}
+
+
+def bulk_create(items: List[Any]) -> Dict:
+    results, records = [], []
+    for index, agent, errors in validate_items(items, Agent):
+        if errors:
+            results.append({"index": index, "status": "invalid", "errors": errors})
+            continue
+        agent_id = str(uuid.uuid4())
+        records.append({"id": agent_id, "config": generate_agent_config(agent)})
+        results.append({"index": index, "status": "created", "agent_id": agent_id})
     
-    return {"message": "Agent deleted successfully"}
+    get_agent_store().apply(records, [])
+    return bulk_summary(results, "created")
+
+
+def bulk_update(items: List[Any]) -> Dict:
+    store = get_agent_store()
+    validated = validate_items(items, AgentUpdate)
+    created = store.created_at([agent.agent_id for _, agent, errors in validated if not errors])
+    
+    results, records, seen = [], [], set()
+    for index, agent, errors in validated:
+        if not errors and agent.agent_id in seen:
+            # One config per agent per batch; a repeat would mix capabilities
+            errors = [{"loc": ["agent_id"], "msg": "Duplicate agent_id in batch"}]
+        if errors:
+            results.append({"index": index, "status": "invalid", "errors": errors})
+        elif agent.agent_id not in created:
+            results.append({"index": index, "status": "not_found", "agent_id": agent.agent_id})
+        else:
+            seen.add(agent.agent_id)
+            records.append({"id": agent.agent_id, "config": generate_agent_config(agent, created[agent.agent_id])})
+            results.append({"index": index, "status": "updated", "agent_id": agent.agent_id})
+    
+    store.apply(records, [])
+    return bulk_summary(results, "updated")
+
+
+def bulk_delete(items: List[Any]) -> Dict:
+    store = get_agent_store()
+    # Items are agent ids, or objects with an agent_id
+    agent_ids = [item.get("agent_id") if isinstance(item, dict) else item for item in items]
+    valid = [agent_id for agent_id in agent_ids if isinstance(agent_id, str)]
+    existing = store.existing(valid)
+    
+    results, deletes = [], []
+    for index, agent_id in enumerate(agent_ids):
+        if not isinstance(agent_id, str):
+            results.append({"index": index, "status": "invalid", "errors": [{"loc": ["agent_id"], "msg": "Expected an agent id"}]})
+        elif agent_id not in existing:
+            results.append({"index": index, "status": "not_found", "agent_id": agent_id})
+        else:
+            deletes.append(agent_id)
+            results.append({"index": index, "status": "deleted", "agent_id": agent_id})
+    
+    store.apply([], deletes)
+    return bulk_summary(results, "deleted")
+
+
+@app.post("/agents/bulk/create")
+async def bulk_create_agents(request: Request):
+    """Create many agents from a JSON array or NDJSON body.
+    
+    Every item is validated, valid ones are committed in one transaction,
+    and the response has a result per item in request order.
+    """
+    items = await run_in_threadpool(parse_bulk_body, await request.body(), request.headers.get("content-type", ""))
+    return await run_in_threadpool(bulk_create, items)
+
+
+@app.post("/agents/bulk/update")
+async def bulk_update_agents(request: Request):
+    """Replace many agents' configurations; items are agents plus agent_id."""
+    items = await run_in_threadpool(parse_bulk_body, await request.body(), request.headers.get("content-type", ""))
+    return await run_in_threadpool(bulk_update, items)
+
+
+@app.post("/agents/bulk/delete")
+async def bulk_delete_agents(request: Request):
+    """Delete many agents; items are agent ids or {"agent_id": ...} objects."""
+    items = await run_in_threadpool(parse_bulk_body, await request.body(), request.headers.get("content-type", ""))
+    return await run_in_threadpool(bulk_delete, items)
 
 
 @app.get("/agents/templates/list")
@@ -1,16 +1,45 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime
 import whisper
 import os
 import json
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
 import uuid
-from pydub import AudioSegment
+import hashlib
+import asyncio
+import tempfile
+import sqlite3
+import subprocess
+import multiprocessing
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from functools import lru_cache
+from pydub import AudioSegment, silence
 import os
 
-app = FastAPI(title="Audio Transcription Service", description="Audio transcription with highlight generation")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm configured models so the first request doesn't pay the load
+    await run_in_threadpool(models.preload, WHISPER_PRELOAD_MODELS)
+    yield
+    # Stop transcription workers on shutdown
+    await jobs.shutdown()
+    chunk_pools.shutdown()
+
+
+app = FastAPI(
+    title="Audio Transcription Service",
+    description="Audio transcription with highlight generation",
+    lifespan=lifespan
+)
 
 # CORS middleware
 app.add_middleware(
@@ -24,23 +53,232 @@ app.add_middleware(
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "/uploads")) / "audio"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# Load Whisper model (using base model for balance of speed and accuracy)
-model = None
+# Upload spooling settings
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024 ** 3)))
+
+# Transcription job settings
+AUDIO_WORKERS = int(os.getenv("AUDIO_WORKERS", "1"))
+AUDIO_QUEUE_SIZE = int(os.getenv("AUDIO_QUEUE_SIZE", "32"))
+# Failed jobs keep their error for clients to read this long, then are dropped
+AUDIO_FAILED_JOB_TTL = float(os.getenv("AUDIO_FAILED_JOB_TTL", "3600"))
+
+# Long audio is split at silences and transcribed in parallel processes
+AUDIO_CHUNK_MIN_SECONDS = float(os.getenv("AUDIO_CHUNK_MIN_SECONDS", "600"))
+AUDIO_CHUNK_TARGET_SECONDS = float(os.getenv("AUDIO_CHUNK_TARGET_SECONDS", "120"))
+AUDIO_CHUNK_PROCESSES = int(os.getenv("AUDIO_CHUNK_PROCESSES", str(os.cpu_count() or 1)))
+AUDIO_SILENCE_MIN_MS = int(os.getenv("AUDIO_SILENCE_MIN_MS", "700"))
+AUDIO_SILENCE_THRESH_DB = float(os.getenv("AUDIO_SILENCE_THRESH_DB", "-16"))
+
+# Full-text search index shared with the OCR service
+SEARCH_DB_PATH = Path(os.getenv("UPLOAD_DIR", "/uploads")) / "search" / "index.db"
 
+# Whisper model registry settings (base is the balance of speed and accuracy)
+WHISPER_DEFAULT_MODEL = os.getenv("WHISPER_DEFAULT_MODEL", "base")
+WHISPER_MODELS = [
+    name.strip() for name in os.getenv("WHISPER_MODELS", "tiny,base,small,medium,large").split(",")
+    if name.strip()
+]
+WHISPER_PRELOAD_MODELS = [
+    name.strip() for name in os.getenv("WHISPER_PRELOAD_MODELS", WHISPER_DEFAULT_MODEL).split(",")
+    if name.strip()
+]
+WHISPER_MEMORY_BUDGET_MB = int(os.getenv("WHISPER_MEMORY_BUDGET_MB", "4096"))
+# Approximate fp32 sizes of models that haven't been loaded yet
+WHISPER_MODEL_BYTES = {
+    "tiny": 39_000_000 * 4,
+    "base": 74_000_000 * 4,
+    "small": 244_000_000 * 4,
+    "medium": 769_000_000 * 4,
+    "large": 1_550_000_000 * 4
+}
 
-def get_model():
-    """Lazy load the Whisper model."""
-    global model
-    if model is None:
-        model = whisper.load_model("base")
-    return model
 
+def model_size_bytes(loaded_model) -> int:
+    """Approximate resident size of a model from its parameters and buffers."""
+    tensors = list(loaded_model.parameters()) + list(loaded_model.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
 
-def transcribe_audio(audio_path: str) -> Dict:
-    """Transcribe audio file with timestamps."""
-    model = get_model()
-    result = model.transcribe(audio_path, word_timestamps=True)
+
+class ModelRegistry:
+    """LRU of loaded Whisper models bounded by a memory budget.
+    
+    Loading a model that pushes the total over budget evicts the least
+    recently used ones; the model being loaded is always kept.
+    """
+    
+    def __init__(self, available: List[str], budget_bytes: int):
+        self.available = available
+        self.budget_bytes = budget_bytes
+        self.models: "OrderedDict[str, Tuple[object, int]]" = OrderedDict()
+        self.metrics: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
     
+    def _cached(self, name: str):
+        with self._lock:
+            if name in self.models:
+                self.models.move_to_end(name)
+                self.metrics[name]["hits"] += 1
+                return self.models[name][0]
+            return None
+    
+    def get(self, name: str):
+        """Return a loaded model, loading it on first use."""
+        if name not in self.available:
+            raise ValueError(f"Unknown model '{name}'. Available: {', '.join(self.available)}")
+        
+        loaded_model = self._cached(name)
+        if loaded_model is not None:
+            return loaded_model
+        
+        with self._lock:
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+        # Only one thread loads a given model; others wait for it
+        with load_lock:
+            loaded_model = self._cached(name)
+            if loaded_model is not None:
+                return loaded_model
+            
+            started = time.perf_counter()
+            loaded_model = whisper.load_model(name)
+            load_seconds = time.perf_counter() - started
+            size = model_size_bytes(loaded_model)
+            
+            with self._lock:
+                self.models[name] = (loaded_model, size)
+                metrics = self.metrics.setdefault(name, {
+                    "loads": 0, "hits": 0, "evictions": 0,
+                    "last_load_seconds": None, "total_load_seconds": 0.0
+                })
+                metrics["loads"] += 1
+                metrics["last_load_seconds"] = load_seconds
+                metrics["total_load_seconds"] += load_seconds
+                metrics["size_bytes"] = size
+                while self.used_bytes() > self.budget_bytes and len(self.models) > 1:
+                    evicted, _ = self.models.popitem(last=False)
+                    self.metrics[evicted]["evictions"] += 1
+            return loaded_model
+    
+    def preload(self, names: List[str]):
+        for name in names:
+            self.get(name)
+    
+    def used_bytes(self) -> int:
+        return sum(size for _, size in self.models.values())
+    
+    def size_of(self, name: str) -> int:
+        """Measured size of a model once loaded, an estimate before."""
+        with self._lock:
+            measured = self.metrics.get(name, {}).get("size_bytes")
+        return measured or WHISPER_MODEL_BYTES.get(name, WHISPER_MODEL_BYTES["large"])
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "default": WHISPER_DEFAULT_MODEL,
+                "available": self.available,
+                "loaded": list(self.models),
+                "memory_budget_bytes": self.budget_bytes,
+                "memory_used_bytes": self.used_bytes(),
+                "metrics": self.metrics
+            }
+
+
+models = ModelRegistry(WHISPER_MODELS, WHISPER_MEMORY_BUDGET_MB * 1024 ** 2)
+
+
+def get_model(name: Optional[str] = None):
+    """Get a Whisper model from the registry, loading it if needed."""
+    return models.get(name or WHISPER_DEFAULT_MODEL)
+
+
+def write_chunk(f, digest, chunk: bytes):
+    """Hash and write one upload chunk (runs in the threadpool)."""
+    digest.update(chunk)
+    f.write(chunk)
+
+
+async def spool_upload(file: UploadFile, dest: Path, max_bytes: Optional[int] = None) -> Tuple[int, str]:
+    """Stream an upload to disk in bounded chunks.
+    
+    Returns the size and SHA-256 hex digest of the upload. Uploads larger than
+    max_bytes are rejected with 413 and the partial file is removed.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size is {max_bytes} bytes"
+    )
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+    
+    digest = hashlib.sha256()
+    size = 0
+    f = await run_in_threadpool(open, dest, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise too_large
+            await run_in_threadpool(write_chunk, f, digest, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        dest.unlink(missing_ok=True)
+        raise
+    await run_in_threadpool(f.close)
+    
+    return size, digest.hexdigest()
+
+
+class UploadLimitMiddleware:
+    """Reject request bodies over MAX_UPLOAD_BYTES before they are parsed.
+    
+    The multipart parser spools the whole body before a handler runs, so
+    spool_upload alone can only refuse an upload after receiving it. A
+    declared Content-Length over the limit is answered with 413 without
+    reading the body; otherwise the body is counted as it arrives and the
+    request fails with 413 as soon as it crosses the limit.
+    """
+    
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        max_bytes = MAX_UPLOAD_BYTES if self.max_bytes is None else self.max_bytes
+        detail = f"File too large. Maximum size is {max_bytes} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > max_bytes:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(UploadLimitMiddleware)
+
+
+def format_transcription(result: Dict) -> Dict:
+    """Keep the fields we expose from a Whisper result."""
     return {
         "text": result["text"],
         "language": result["language"],
@@ -57,23 +295,597 @@ def transcribe_audio(audio_path: str) -> Dict:
     }
 
 
-def generate_highlights(transcription: Dict, keywords: List[str]) -> List[Dict]:
-    """Generate highlights based on keywords in the transcription."""
+def init_chunk_worker(threads: int):
+    """Limit torch threads so chunk workers don't oversubscribe the CPU.
+    
+    A worker only ever keeps the model it last used.
+    """
+    import torch
+    torch.set_num_threads(threads)
+    models.budget_bytes = 0
+
+
+def chunk_workers(model_name: str, reserved_bytes: int = 0) -> int:
+    """Chunk processes that fit in the memory budget next to the loaded models.
+    
+    Each worker holds its own copy of the model, so the pool is capped at
+    what's left of WHISPER_MEMORY_BUDGET_MB after this process's registry
+    and reserved_bytes held by other chunk pools.
+    """
+    free = models.budget_bytes - models.used_bytes() - reserved_bytes
+    return max(0, min(AUDIO_CHUNK_PROCESSES, free // models.size_of(model_name)))
+
+
+class ChunkPools:
+    """Chunk transcription process pools, one per model, within the memory budget.
+    
+    Jobs hold a pool while they submit and collect chunks. A pool is only
+    shut down once it is idle and another model needs its memory, so a job
+    never finds its pool closed under it.
+    """
+    
+    def __init__(self):
+        self.pools: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+    
+    def _reserved_bytes(self) -> int:
+        return sum(pool["processes"] * models.size_of(name) for name, pool in self.pools.items())
+    
+    def _create(self, model_name: str) -> Optional[Dict]:
+        # Idle pools of other models give their memory back first
+        for name in [name for name, pool in self.pools.items() if pool["users"] == 0]:
+            self.pools.pop(name)["executor"].shutdown(wait=False)
+        processes = chunk_workers(model_name, self._reserved_bytes())
+        if processes < 2:
+            return None
+        threads = max(1, (os.cpu_count() or 1) // processes)
+        pool = {
+            "executor": ProcessPoolExecutor(
+                max_workers=processes,
+                # torch does not survive fork reliably
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_chunk_worker,
+                initargs=(threads,)
+            ),
+            "processes": processes,
+            "users": 0
+        }
+        self.pools[model_name] = pool
+        return pool
+    
+    @contextmanager
+    def acquire(self, model_name: str) -> Iterator[Optional[ProcessPoolExecutor]]:
+        """Hold the pool for a model, creating it if it fits; None if it doesn't."""
+        with self._lock:
+            pool = self.pools.get(model_name) or self._create(model_name)
+            if pool is not None:
+                pool["users"] += 1
+        if pool is None:
+            yield None
+            return
+        try:
+            yield pool["executor"]
+        finally:
+            with self._lock:
+                pool["users"] -= 1
+    
+    def shutdown(self):
+        with self._lock:
+            for pool in self.pools.values():
+                pool["executor"].shutdown(wait=False, cancel_futures=True)
+            self.pools.clear()
+
+
+chunk_pools = ChunkPools()
+
+
+def probe_duration(audio_path: str) -> Optional[float]:
+    """Duration in seconds from the container header, without decoding."""
+    try:
+        output = subprocess.run(
+            [
+                "ffprobe", "-v", "error", "-show_entries", "format=duration",
+                "-of", "default=noprint_wrappers=1:nokey=1", audio_path
+            ],
+            capture_output=True, text=True, timeout=30, check=True
+        ).stdout
+        return float(output.strip())
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+
+def plan_chunks(
+    speech_ranges: List[Tuple[int, int]],
+    duration_ms: int,
+    target_ms: int
+) -> List[Tuple[int, int]]:
+    """Plan [start, end) chunk boundaries in milliseconds.
+    
+    Chunks are cut in the middle of the silence between speech ranges once
+    they reach target_ms, falling back to the previous pause before a chunk
+    grows past twice the target. Speech with no pause at all is cut hard.
+    """
+    max_ms = 2 * target_ms
+    cuts = []
+    last_cut = 0
+    candidate = 0
+    
+    def cut_before(point: int):
+        nonlocal last_cut
+        if point - last_cut > max_ms and candidate > last_cut:
+            last_cut = candidate
+            cuts.append(last_cut)
+        while point - last_cut > max_ms:
+            last_cut += target_ms
+            cuts.append(last_cut)
+    
+    for (_, prev_end), (next_start, _) in zip(speech_ranges, speech_ranges[1:]):
+        midpoint = (prev_end + next_start) // 2
+        cut_before(midpoint)
+        if midpoint - last_cut >= target_ms:
+            last_cut = midpoint
+            cuts.append(last_cut)
+        candidate = midpoint
+    cut_before(duration_ms)
+    
+    bounds = [0] + cuts + [duration_ms]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def transcribe_chunk(chunk_path: str, model_name: str) -> Dict:
+    """Transcribe one chunk in a worker process."""
+    return format_transcription(get_model(model_name).transcribe(chunk_path, word_timestamps=True))
+
+
+def stitch_transcriptions(chunks: List[Tuple[float, Dict]]) -> Dict:
+    """Merge chunk transcriptions, shifting timestamps by each chunk's offset."""
+    segments = []
+    languages = Counter()
+    for offset, chunk in chunks:
+        languages[chunk["language"]] += len(chunk["segments"])
+        for segment in chunk["segments"]:
+            segments.append({
+                "id": len(segments),
+                "start": segment["start"] + offset,
+                "end": segment["end"] + offset,
+                "text": segment["text"],
+                "words": [
+                    {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                    for word in segment["words"]
+                ]
+            })
+    
+    language = languages.most_common(1)[0][0] if languages else chunks[0][1]["language"]
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "language": language,
+        "segments": segments
+    }
+
+
+def transcribe_audio(audio_path: str, model_name: Optional[str] = None, progress=None) -> Dict:
+    """Transcribe audio file with timestamps.
+    
+    Audio longer than AUDIO_CHUNK_MIN_SECONDS is split at silences and the
+    chunks are transcribed in parallel worker processes. progress, if given,
+    is called with the completed fraction as chunks finish.
+    """
+    model_name = model_name or WHISPER_DEFAULT_MODEL
+    # Only long audio is decoded here; the probe just reads the header
+    duration = probe_duration(audio_path) if AUDIO_CHUNK_PROCESSES > 1 else None
+    if duration is None or duration < AUDIO_CHUNK_MIN_SECONDS:
+        return format_transcription(get_model(model_name).transcribe(audio_path, word_timestamps=True))
+    
+    with chunk_pools.acquire(model_name) as executor:
+        if executor is None:
+            # Fewer than two workers fit next to the loaded models
+            return format_transcription(get_model(model_name).transcribe(audio_path, word_timestamps=True))
+        return transcribe_chunked(audio_path, model_name, executor, progress)
+
+
+def transcribe_chunked(audio_path: str, model_name: str, executor: ProcessPoolExecutor, progress=None) -> Dict:
+    """Split audio at silences and transcribe the chunks on executor."""
+    audio = AudioSegment.from_file(audio_path)
+    speech_ranges = silence.detect_nonsilent(
+        audio,
+        min_silence_len=AUDIO_SILENCE_MIN_MS,
+        silence_thresh=audio.dBFS + AUDIO_SILENCE_THRESH_DB,
+        seek_step=10
+    )
+    bounds = plan_chunks(speech_ranges, len(audio), int(AUDIO_CHUNK_TARGET_SECONDS * 1000))
+    
+    with tempfile.TemporaryDirectory(dir=UPLOAD_DIR) as tmp_dir:
+        futures = {}
+        for index, (start, end) in enumerate(bounds):
+            chunk_path = os.path.join(tmp_dir, f"chunk_{index}.wav")
+            audio[start:end].export(chunk_path, format="wav")
+            futures[executor.submit(transcribe_chunk, chunk_path, model_name)] = index
+        
+        results = [None] * len(bounds)
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if progress is not None:
+                progress(done / len(bounds))
+    
+    return stitch_transcriptions([
+        (start / 1000, result) for (start, _), result in zip(bounds, results)
+    ])
+
+
+class TranscriptionJobs:
+    """Bounded job queue drained by a fixed pool of transcription workers.
+    
+    Workers run jobs in a dedicated thread pool so the event loop stays free,
+    and submissions are rejected once the queue is full. Failed jobs are
+    forgotten failed_ttl seconds after they finish.
+    """
+    
+    def __init__(self, workers: int, queue_size: int, failed_ttl: float = AUDIO_FAILED_JOB_TTL):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.failed_ttl = failed_ttl
+        self.jobs: Dict[str, Dict] = {}
+        # file_id -> expiry of failed jobs, in order of expiry
+        self._failed: "OrderedDict[str, float]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # (Re)bind the queue and workers to the running event loop
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="transcription"
+            )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    def get(self, file_id: str) -> Optional[Dict]:
+        self._expire_failed()
+        return self.jobs.get(file_id)
+    
+    def _expire_failed(self):
+        now = time.monotonic()
+        while self._failed and next(iter(self._failed.values())) <= now:
+            file_id, _ = self._failed.popitem(last=False)
+            self.jobs.pop(file_id, None)
+    
+    def submit(self, file_id: str, func, *args) -> Dict:
+        """Queue func(job, *args) and return the job record."""
+        self._ensure_started()
+        self._expire_failed()
+        job = {
+            "file_id": file_id,
+            "status": "pending",
+            "progress": 0.0,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "error": None
+        }
+        try:
+            self._queue.put_nowait((job, func, args))
+        except asyncio.QueueFull:
+            raise HTTPException(status_code=503, detail="Transcription queue is full, retry later")
+        self.jobs[file_id] = job
+        return job
+    
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, func, args = await self._queue.get()
+            job["status"] = "running"
+            job["started_at"] = datetime.utcnow().isoformat()
+            try:
+                await loop.run_in_executor(self._executor, func, job, *args)
+                job["status"] = "done"
+                job["progress"] = 1.0
+                # The result file is the record from here on
+                self.jobs.pop(job["file_id"], None)
+            except Exception as e:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                self._failed[job["file_id"]] = time.monotonic() + self.failed_ttl
+            finally:
+                job["finished_at"] = datetime.utcnow().isoformat()
+                self._queue.task_done()
+    
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": sum(1 for job in self.jobs.values() if job["status"] == "running")
+        }
+    
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self._loop = None
+
+
+jobs = TranscriptionJobs(AUDIO_WORKERS, AUDIO_QUEUE_SIZE)
+
+
+class SearchIndex:
+    """Full-text index over OCR and transcription results (SQLite FTS5).
+    
+    The database lives on the shared uploads volume so the OCR and audio
+    services write to, and search, the same index.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5("
+                "text, file_id UNINDEXED, source UNINDEXED, location UNINDEXED)"
+            )
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def add(self, file_id: str, source: str, rows: Iterable[Tuple[str, Dict]]) -> int:
+        """Index (text, location) rows for a result; returns the row count."""
+        records = [
+            (text, file_id, source, json.dumps(location))
+            for text, location in rows
+            if text.strip()
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO documents (text, file_id, source, location) VALUES (?, ?, ?, ?)",
+                records
+            )
+        return len(records)
+    
+    def remove_source(self, source: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+    
+    def search(self, query: str, source: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Search for rows containing all words of query, best matches first."""
+        # Quote each word so user input is never parsed as FTS5 syntax
+        match = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+        sql = (
+            "SELECT file_id, source, location, text FROM documents "
+            "WHERE documents MATCH ?"
+        )
+        params: List = [match]
+        if source:
+            sql += " AND source = ?"
+            params.append(source)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
+        
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {"file_id": file_id, "source": row_source, "text": text, **json.loads(location)}
+            for file_id, row_source, location, text in rows
+        ]
+
+
+search_index = SearchIndex(SEARCH_DB_PATH)
+
+
+def audio_index_rows(transcription: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Search index rows for a transcription: one per segment."""
+    for segment in transcription["segments"]:
+        yield segment["text"], {
+            "segment_id": segment["id"],
+            "start": segment["start"],
+            "end": segment["end"]
+        }
+
+
+def rebuild_search_index() -> int:
+    """Re-index every stored transcription; returns the number indexed."""
+    search_index.remove_source("audio")
+    count = 0
+    for suffix in ("_transcription.json", "_highlights.json"):
+        for result_path in sorted(UPLOAD_DIR.glob(f"*{suffix}")):
+            file_id = result_path.name[:-len(suffix)]
+            with open(result_path, "r") as f:
+                result = json.load(f)
+            # Older transcription files hold the bare transcription
+            transcription = result.get("transcription", result)
+            search_index.add(file_id, "audio", audio_index_rows(transcription))
+            count += 1
+    return count
+
+
+def run_transcription_job(job: Dict, file_path: str, filename: str, model_name: str):
+    """Transcribe an uploaded file and save the transcription result."""
+    result = transcribe_audio(file_path, model_name, progress=lambda done: job.update(progress=done))
+    
+    result_path = UPLOAD_DIR / f"{job['file_id']}_transcription.json"
+    with open(result_path, "w") as f:
+        json.dump({
+            "file_id": job["file_id"],
+            "filename": filename,
+            "model": model_name,
+            "transcription": result
+        }, f)
+    
+    search_index.add(job["file_id"], "audio", audio_index_rows(result))
+
+
+def run_highlight_job(
+    job: Dict,
+    file_path: str,
+    filename: str,
+    model_name: str,
+    keywords: List[str],
+    case_sensitive: bool,
+    whole_word: bool
+):
+    """Transcribe an uploaded file and save the keyword highlights."""
+    transcription = transcribe_audio(file_path, model_name, progress=lambda done: job.update(progress=done))
+    highlights = generate_highlights(transcription, keywords, case_sensitive, whole_word)
+    
+    result_path = UPLOAD_DIR / f"{job['file_id']}_highlights.json"
+    with open(result_path, "w") as f:
+        json.dump({
+            "file_id": job["file_id"],
+            "filename": filename,
+            "model": model_name,
+            "transcription": transcription,
+            "highlights": highlights,
+            "keywords": keywords
+        }, f)
+    
+    search_index.add(job["file_id"], "audio", audio_index_rows(transcription))
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every keyword in one pass over a text."""
+    
+    def __init__(self, keywords: List[str], case_sensitive: bool = False, whole_word: bool = False):
+        self.keywords = list(keywords)
+        self.case_sensitive = case_sensitive
+        self.whole_word = whole_word
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        
+        for index, keyword in enumerate(self.keywords):
+            node = 0
+            for char in self._fold(keyword):
+                child = self._goto[node].get(char)
+                if child is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = child
+            if node:
+                self._out[node].append(index)
+        
+        # Breadth-first failure links; depth-1 nodes fail to the root
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+    
+    def _fold(self, text: str) -> str:
+        return text if self.case_sensitive else text.casefold()
+    
+    def find(self, text: str) -> List[Tuple[int, int, int]]:
+        """Return (keyword index, start, end) for each match in text."""
+        folded = self._fold(text)
+        # Case folding can change lengths (e.g. "ß"); map offsets back per char
+        offsets = None
+        if len(folded) != len(text):
+            offsets = [i for i, char in enumerate(text) for _ in self._fold(char)]
+            folded = "".join(self._fold(char) for char in text)
+        
+        matches = []
+        node = 0
+        for position, char in enumerate(folded):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for index in self._out[node]:
+                end = position + 1
+                start = end - len(self._fold(self.keywords[index]))
+                if offsets is not None:
+                    start, end = offsets[start], offsets[position] + 1
+                if self.whole_word and not self._is_word(text, start, end):
+                    continue
+                matches.append((index, start, end))
+        return matches
+    
+    @staticmethod
+    def _is_word(text: str, start: int, end: int) -> bool:
+        before = text[start - 1] if start > 0 else " "
+        after = text[end] if end < len(text) else " "
+        return not (before.isalnum() or before == "_") and not (after.isalnum() or after == "_")
+
+
+@lru_cache(maxsize=32)
+def compile_keywords(keywords: Tuple[str, ...], case_sensitive: bool, whole_word: bool) -> KeywordMatcher:
+    """Build (or reuse) the matcher for a keyword set."""
+    return KeywordMatcher(list(keywords), case_sensitive=case_sensitive, whole_word=whole_word)
+
+
+def word_spans(text: str, words: List[Dict]) -> List[Tuple[int, int, Dict]]:
+    """Locate Whisper words in the segment text as (start, end, word)."""
+    spans = []
+    cursor = 0
+    for word in words:
+        token = word.get("word", "").strip()
+        position = text.find(token, cursor) if token else -1
+        if position >= 0:
+            spans.append((position, position + len(token), word))
+            cursor = position + len(token)
+    return spans
+
+
+def generate_highlights(
+    transcription: Dict,
+    keywords: List[str],
+    case_sensitive: bool = False,
+    whole_word: bool = False
+) -> List[Dict]:
+    """Generate highlights based on keywords in the transcription.
+    
+    Each segment is scanned once for all keywords. Every hit is reported in
+    matches with word-level timestamps when word timings are available.
+    """
+    matcher = compile_keywords(tuple(keywords), case_sensitive, whole_word)
     highlights = []
     
     for segment in transcription["segments"]:
-        segment_text = segment["text"].lower()
+        text = segment["text"]
+        hits: Dict[int, List[Dict]] = {}
+        spans = None
         
-        for keyword in keywords:
-            if keyword.lower() in segment_text:
-                highlights.append({
-                    "keyword": keyword,
-                    "segment_id": segment["id"],
-                    "start": segment["start"],
-                    "end": segment["end"],
-                    "text": segment["text"],
-                    "context": segment["text"]
-                })
+        for index, start, end in matcher.find(text):
+            if spans is None:
+                spans = word_spans(text, segment.get("words", []))
+            covered = [word for word_start, word_end, word in spans if word_start < end and word_end > start]
+            hits.setdefault(index, []).append({
+                "text": text[start:end],
+                "start": covered[0]["start"] if covered else segment["start"],
+                "end": covered[-1]["end"] if covered else segment["end"],
+                "words": covered
+            })
+        
+        for index in sorted(hits):
+            highlights.append({
+                "keyword": keywords[index],
+                "segment_id": segment["id"],
+                "start": segment["start"],
+                "end": segment["end"],
+                "text": segment["text"],
+                "context": segment["text"],
+                "matches": hits[index]
+            })
     
     return highlights
 
@@ -87,9 +899,9 @@ async def root():
     }
 
 
-@app.post("/audio/transcribe")
-async def transcribe(file: UploadFile = File(...)):
-    """Transcribe audio file."""
+@app.post("/audio/transcribe", status_code=202)
+async def transcribe(file: UploadFile = File(...), model: str = WHISPER_DEFAULT_MODEL):
+    """Queue an audio file for transcription."""
     # Check file extension
     allowed_extensions = ['.mp3', '.wav', '.m4a', '.ogg', '.flac']
     file_ext = os.path.splitext(file.filename)[1].lower()
@@ -100,39 +912,43 @@ async def transcribe(file: UploadFile = File(...)):
             detail=f"Unsupported file format. Allowed: {', '.join(allowed_extensions)}"
         )
     
+    if model not in WHISPER_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported model. Allowed: {', '.join(WHISPER_MODELS)}"
+        )
+    
     # Save uploaded file
     file_id = str(uuid.uuid4())
     file_path = UPLOAD_DIR / f"{file_id}{file_ext}"
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    await spool_upload(file, file_path)
     
     try:
-        # Transcribe audio
-        result = transcribe_audio(str(file_path))
-        
-        # Save transcription result
-        result_path = UPLOAD_DIR / f"{file_id}_transcription.json"
-        with open(result_path, "w") as f:
-            json.dump(result, f)
-        
-        return {
-            "file_id": file_id,
-            "filename": file.filename,
-            "transcription": result
-        }
+        job = jobs.submit(file_id, run_transcription_job, str(file_path), file.filename, model)
+    except HTTPException:
+        # Rejected: nothing will ever process the upload
+        file_path.unlink(missing_ok=True)
+        raise
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+    return {
+        "file_id": file_id,
+        "filename": file.filename,
+        "model": model,
+        "status": job["status"],
+        "result_url": f"/audio/result/{file_id}"
+    }
 
 
-@app.post("/audio/highlight")
+@app.post("/audio/highlight", status_code=202)
 async def create_highlights(
     file: UploadFile = File(...),
-    keywords: str = ""
+    keywords: str = "",
+    model: str = WHISPER_DEFAULT_MODEL,
+    case_sensitive: bool = False,
+    whole_word: bool = False
 ):
-    """Transcribe audio and generate highlights for keywords."""
+    """Queue audio for transcription and keyword highlight generation."""
     # Check file extension
     allowed_extensions = ['.mp3', '.wav', '.m4a', '.ogg', '.flac']
     file_ext = os.path.splitext(file.filename)[1].lower()
@@ -143,6 +959,12 @@ async def create_highlights(
             detail=f"Unsupported file format. Allowed: {', '.join(allowed_extensions)}"
         )
     
+    if model not in WHISPER_MODELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported model. Allowed: {', '.join(WHISPER_MODELS)}"
+        )
+    
     # Parse keywords
     keyword_list = [kw.strip() for kw in keywords.split(",") if kw.strip()]
     
@@ -153,44 +975,41 @@ async def create_highlights(
     file_id = str(uuid.uuid4())
     file_path = UPLOAD_DIR / f"{file_id}{file_ext}"
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    await spool_upload(file, file_path)
     
     try:
-        # Transcribe audio
-        transcription = transcribe_audio(str(file_path))
-        
-        # Generate highlights
-        highlights = generate_highlights(transcription, keyword_list)
-        
-        result = {
-            "file_id": file_id,
-            "filename": file.filename,
-            "transcription": transcription,
-            "highlights": highlights,
-            "keywords": keyword_list
-        }
-        
-        # Save result
-        result_path = UPLOAD_DIR / f"{file_id}_highlights.json"
-        with open(result_path, "w") as f:
-            json.dump(result, f)
-        
-        return result
+        job = jobs.submit(
+            file_id, run_highlight_job, str(file_path), file.filename, model, keyword_list,
+            case_sensitive, whole_word
+        )
+    except HTTPException:
+        # Rejected: nothing will ever process the upload
+        file_path.unlink(missing_ok=True)
+        raise
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+    return {
+        "file_id": file_id,
+        "filename": file.filename,
+        "keywords": keyword_list,
+        "model": model,
+        "status": job["status"],
+        "result_url": f"/audio/result/{file_id}"
+    }
 
 
 @app.get("/audio/result/{file_id}")
 async def get_result(file_id: str):
-    """Get transcription or highlight result."""
+    """Get transcription or highlight result, or the job status while pending."""
     # Try to find transcription or highlights file
     transcription_path = UPLOAD_DIR / f"{file_id}_transcription.json"
     highlights_path = UPLOAD_DIR / f"{file_id}_highlights.json"
+    job = jobs.get(file_id)
     
-    if highlights_path.exists():
+    if job is not None and job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {job['error']}")
+    elif job is not None and job["status"] != "done":
+        return JSONResponse(status_code=202, content=job)
+    elif highlights_path.exists():
         with open(highlights_path, "r") as f:
             return json.load(f)
     elif transcription_path.exists():
@@ -200,6 +1019,39 @@ async def get_result(file_id: str):
         raise HTTPException(status_code=404, detail="Result not found")
 
 
+@app.get("/audio/models")
+async def list_models():
+    """Get available and loaded Whisper models with load-time metrics."""
+    return models.stats()
+
+
+@app.get("/audio/jobs/stats")
+async def job_stats():
+    """Get transcription queue depth and worker usage."""
+    return jobs.stats()
+
+
+@app.get("/search")
+async def search(q: str, source: Optional[str] = None, limit: int = 50):
+    """Search past transcriptions and OCR extractions."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty search query")
+    
+    results = await run_in_threadpool(search_index.search, q, source, min(limit, 500))
+    return {"query": q, "results": results, "total": len(results)}
+
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "audio-service"}
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Audio service maintenance")
+    parser.add_argument("command", choices=["rebuild-index"])
+    args = parser.parse_args()
+    
+    if args.command == "rebuild-index":
+        print(f"Indexed {rebuild_search_index()} transcriptions")
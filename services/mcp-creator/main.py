@@ -1,15 +1,27 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Literal
 import json
 import uuid
 from pathlib import Path
 from datetime import datetime
-from jinja2 import Template
+from jinja2 import Environment, DictLoader, FileSystemBytecodeCache
+from fastapi.concurrency import run_in_threadpool
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+import math
 import os
 
-app = FastAPI(title="MCP Creator Service", description="Model Context Protocol API Creator")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop render workers on shutdown
+    if render_executor is not None:
+        render_executor.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(title="MCP Creator Service", description="Model Context Protocol API Creator", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -23,12 +35,32 @@ app.add_middleware(
 MCP_DIR = Path(os.getenv("UPLOAD_DIR", "/uploads")) / "mcp"
 MCP_DIR.mkdir(parents=True, exist_ok=True)
 
+# Compiled template bytecode, shared by workers and kept across restarts
+TEMPLATE_CACHE_DIR = Path(os.getenv("MCP_TEMPLATE_CACHE_DIR", str(MCP_DIR / ".template-cache")))
+TEMPLATE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Projects with at least this many resources render them across processes
+MCP_RENDER_PROCESSES = int(os.getenv("MCP_RENDER_PROCESSES", str(os.cpu_count() or 1)))
+MCP_PARALLEL_MIN_RESOURCES = int(os.getenv("MCP_PARALLEL_MIN_RESOURCES", "64"))
+
+# Process pool shared by all requests (created on first use)
+render_executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_render_executor() -> Optional[ProcessPoolExecutor]:
+    """Lazy create the resource rendering process pool."""
+    global render_executor
+    if render_executor is None and MCP_RENDER_PROCESSES > 1:
+        render_executor = ProcessPoolExecutor(max_workers=MCP_RENDER_PROCESSES)
+    return render_executor
+
 
 class Field_Model(BaseModel):
     name: str
     type: str  # string, integer, float, boolean, date, etc.
     required: bool = True
     description: Optional[str] = None
+    indexed: bool = False  # index the field and allow filtering on it (sqlite storage)
 
 
 class MCPResource(BaseModel):
@@ -47,16 +79,45 @@ class MCPProject(BaseModel):
     description: str = Field(..., description="Project description")
     base_path: str = Field(default="/api/v1", description="API base path")
     resources: List[MCPResource] = Field(..., description="Resources to create")
+    storage: Literal["memory", "sqlite"] = Field(
+        default="memory", description="Storage of the generated service: in-memory dicts or SQLite/SQLAlchemy"
+    )
 
 
 # In-memory storage
 mcp_projects: Dict[str, Dict] = {}
 
 
-def generate_fastapi_code(project: MCPProject) -> str:
-    """Generate FastAPI code for CRUD operations."""
-    
-    template = '''from fastapi import FastAPI, HTTPException
+def python_type_filter(field_type: str) -> str:
+    """Convert field type to Python type."""
+    type_map = {
+        "string": "str",
+        "integer": "int",
+        "float": "float",
+        "boolean": "bool",
+        "date": "str",
+        "datetime": "str",
+        "email": "str",
+        "url": "str"
+    }
+    return type_map.get(field_type.lower(), "str")
+
+
+def sql_type_filter(field_type: str) -> str:
+    """Convert field type to SQLAlchemy column type."""
+    type_map = {
+        "integer": "Integer",
+        "float": "Float",
+        "boolean": "Boolean"
+    }
+    return type_map.get(field_type.lower(), "String")
+
+
+# Templates of the generated main.py: the app setup and one chunk per resource
+# (rendered independently so large projects can render them in parallel) for
+# each storage, and the shared routes
+GENERATED_TEMPLATES = {
+    "memory/header.py.j2": '''from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
@@ -77,11 +138,11 @@ app.add_middleware(
 # In-memory storage (replace with database in production)
 storage: Dict[str, Dict[str, Any]] = {}
 
-{% for resource in resources %}
-# {{ resource.name | title }} Models
+''',
+    "models.py.j2": '''# {{ resource.name | title }} Models
 class {{ resource.name | title }}Base(BaseModel):
     {% for field in resource.fields %}
-    {{ field.name }}: {{ field.type | python_type }}{{ " = None" if not field.required else "" }}  # {{ field.description or "" }}
+    {{ field.name }}: {{ field.type | python_type if field.required else "Optional[%s] = None" % (field.type | python_type) }}  # {{ field.description or "" }}
     {% endfor %}
 
 class {{ resource.name | title }}Create({{ resource.name | title }}Base):
@@ -96,7 +157,9 @@ class {{ resource.name | title }}Response({{ resource.name | title }}Base):
     id: str
     created_at: str
     updated_at: str
-
+''',
+    "memory/resource.py.j2": '''
+{% include "models.py.j2" %}
 # {{ resource.name | title }} storage
 {{ resource.name }}_storage: Dict[str, Dict] = {}
 
@@ -163,8 +226,197 @@ async def delete_{{ resource.name }}({{ resource.name }}_id: str):
     return {"message": "{{ resource.name | title }} deleted successfully"}
 {% endif %}
 
-{% endfor %}
+''',
+    "sqlite/header.py.j2": '''from fastapi import FastAPI, HTTPException, Query
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel
+from sqlalchemy import (
+    Boolean, Column, Float, Index, Integer, MetaData, String, Table,
+    create_engine, delete, event, insert, select, tuple_, update
+)
+from sqlalchemy.pool import StaticPool
+from typing import List, Optional
+from datetime import datetime
+import os
+import uuid
+
+app = FastAPI(title="{{ project_name }}", description="{{ description }}")
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Database settings
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+MAX_PAGE_SIZE = 1000
+
+is_sqlite = DATABASE_URL.startswith("sqlite")
+if is_sqlite and (":memory:" in DATABASE_URL or DATABASE_URL.rstrip("/") == "sqlite:"):
+    # An in-memory database lives in one connection, shared by every thread
+    pool_args = {"poolclass": StaticPool}
+else:
+    pool_args = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    connect_args={"check_same_thread": False} if is_sqlite else {},
+    **pool_args
+)
+
+if is_sqlite:
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers run alongside the writer
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+metadata = MetaData()
+
+
+def now() -> str:
+    return datetime.utcnow().isoformat(timespec="microseconds")
+
+
+def parse_cursor(cursor: str):
+    """Split a "created_at_id" cursor into its sort key."""
+    created_at, _, last_id = cursor.partition("_")
+    if not last_id:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, last_id
+
+''',
+    "sqlite/resource.py.j2": '''
+{% include "models.py.j2" %}
+class {{ resource.name | title }}Page(BaseModel):
+    items: List[{{ resource.name | title }}Response]
+    next_cursor: Optional[str] = None
+
+# {{ resource.name | title }} table, listed in (created_at, id) order
+{{ resource.name }}_table = Table(
+    "{{ resource.name }}",
+    metadata,
+    Column("id", String(36), primary_key=True),
+    {% for field in resource.fields %}
+    Column("{{ field.name }}", {{ field.type | sql_type }}, nullable={{ not field.required }}),
+    {% endfor %}
+    Column("created_at", String(32), nullable=False),
+    Column("updated_at", String(32), nullable=False),
+    Index("ix_{{ resource.name }}_created_at_id", "created_at", "id"),
+    {% for field in resource.fields if field.indexed %}
+    Index("ix_{{ resource.name }}_{{ field.name }}", "{{ field.name }}", "created_at", "id"),
+    {% endfor %}
+)
+
+{% if resource.enable_create %}
+@app.post("{{ base_path }}/{{ resource.name }}", response_model={{ resource.name | title }}Response)
+def create_{{ resource.name }}({{ resource.name }}: {{ resource.name | title }}Create):
+    """Create a new {{ resource.name }}."""
+    timestamp = now()
+    {{ resource.name }}_data = {
+        "id": str(uuid.uuid4()),
+        **{{ resource.name }}.dict(),
+        "created_at": timestamp,
+        "updated_at": timestamp
+    }
+    
+    with engine.begin() as conn:
+        conn.execute(insert({{ resource.name }}_table).values(**{{ resource.name }}_data))
+    return {{ resource.name }}_data
+{% endif %}
+
+{% if resource.enable_read %}
+@app.get("{{ base_path }}/{{ resource.name }}/{{"{"}}{{ resource.name }}_id{{"}"}}", response_model={{ resource.name | title }}Response)
+def get_{{ resource.name }}({{ resource.name }}_id: str):
+    """Get {{ resource.name }} by ID."""
+    with engine.connect() as conn:
+        row = conn.execute(
+            select({{ resource.name }}_table).where({{ resource.name }}_table.c.id == {{ resource.name }}_id)
+        ).mappings().first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="{{ resource.name | title }} not found")
+    return dict(row)
+{% endif %}
+
+{% if resource.enable_list %}
+@app.get("{{ base_path }}/{{ resource.name }}", response_model={{ resource.name | title }}Page)
+def list_{{ resource.name }}s(
+    after: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    {% for field in resource.fields if field.indexed %}
+    {{ field.name }}: Optional[{{ field.type | python_type }}] = None,
+    {% endfor %}
+):
+    """List {{ resource.name }}s, oldest first. Pass next_cursor as after for the next page."""
+    query = select({{ resource.name }}_table)
+    {% for field in resource.fields if field.indexed %}
+    if {{ field.name }} is not None:
+        query = query.where({{ resource.name }}_table.c.{{ field.name }} == {{ field.name }})
+    {% endfor %}
+    if after is not None:
+        query = query.where(
+            tuple_({{ resource.name }}_table.c.created_at, {{ resource.name }}_table.c.id) > tuple_(*parse_cursor(after))
+        )
+    query = query.order_by({{ resource.name }}_table.c.created_at, {{ resource.name }}_table.c.id).limit(limit + 1)
+    
+    with engine.connect() as conn:
+        rows = conn.execute(query).mappings().all()
+    items = [dict(row) for row in rows[:limit]]
+    next_cursor = f"{items[-1]['created_at']}_{items[-1]['id']}" if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+{% endif %}
+
+{% if resource.enable_update %}
+@app.put("{{ base_path }}/{{ resource.name }}/{{"{"}}{{ resource.name }}_id{{"}"}}", response_model={{ resource.name | title }}Response)
+def update_{{ resource.name }}({{ resource.name }}_id: str, {{ resource.name }}_update: {{ resource.name | title }}Update):
+    """Update {{ resource.name }}."""
+    update_data = {{ resource.name }}_update.dict(exclude_unset=True)
+    {%- set required_fields = resource.fields | selectattr("required") | map(attribute="name") | list %}
+    {%- if required_fields %}
+    nulled = [name for name in {{ required_fields | tojson }} if name in update_data and update_data[name] is None]
+    if nulled:
+        raise HTTPException(status_code=422, detail=f"Required fields can't be null: {', '.join(nulled)}")
+    {%- endif %}
+    
+    with engine.begin() as conn:
+        result = conn.execute(
+            update({{ resource.name }}_table)
+            .where({{ resource.name }}_table.c.id == {{ resource.name }}_id)
+            .values(**update_data, updated_at=now())
+        )
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="{{ resource.name | title }} not found")
+        row = conn.execute(
+            select({{ resource.name }}_table).where({{ resource.name }}_table.c.id == {{ resource.name }}_id)
+        ).mappings().first()
+    return dict(row)
+{% endif %}
+
+{% if resource.enable_delete %}
+@app.delete("{{ base_path }}/{{ resource.name }}/{{"{"}}{{ resource.name }}_id{{"}"}}")
+def delete_{{ resource.name }}({{ resource.name }}_id: str):
+    """Delete {{ resource.name }}."""
+    with engine.begin() as conn:
+        result = conn.execute(delete({{ resource.name }}_table).where({{ resource.name }}_table.c.id == {{ resource.name }}_id))
+    if result.rowcount == 0:
+        raise HTTPException(status_code=404, detail="{{ resource.name | title }} not found")
+    return {"message": "{{ resource.name | title }} deleted successfully"}
+{% endif %}
 
+''',
+    "footer.py.j2": '''
+{% if storage == "sqlite" %}
+# Create tables and indexes that don't exist yet
+metadata.create_all(engine)
+{% endif %}
 @app.get("/")
 async def root():
     return {
@@ -177,32 +429,55 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 '''
+}
+
+# Compiled once per process; the bytecode cache lets new workers skip compilation
+template_env = Environment(
+    loader=DictLoader(GENERATED_TEMPLATES),
+    bytecode_cache=FileSystemBytecodeCache(str(TEMPLATE_CACHE_DIR)),
+    auto_reload=False,
+    keep_trailing_newline=True
+)
+template_env.filters['python_type'] = python_type_filter
+template_env.filters['sql_type'] = sql_type_filter
+
+
+def render_resources(resources: List[Dict], base_path: str, storage: str = "memory") -> List[str]:
+    """Render the code chunk for each resource."""
+    template = template_env.get_template(f"{storage}/resource.py.j2")
+    return [template.render(resource=resource, base_path=base_path) for resource in resources]
+
+
+def generate_fastapi_code(project: MCPProject, pool: Optional[ProcessPoolExecutor] = None) -> str:
+    """Generate FastAPI code for CRUD operations.
     
-    def python_type_filter(field_type: str) -> str:
-        """Convert field type to Python type."""
-        type_map = {
-            "string": "str",
-            "integer": "int",
-            "float": "float",
-            "boolean": "bool",
-            "date": "str",
-            "datetime": "str",
-            "email": "str",
-            "url": "str"
-        }
-        return type_map.get(field_type.lower(), "str")
+    Resources are rendered across the process pool when one is given and
+    the project has at least MCP_PARALLEL_MIN_RESOURCES of them.
+    """
+    context = {
+        "project_name": project.project_name,
+        "description": project.description,
+        "base_path": project.base_path,
+        "resources": [r.dict() for r in project.resources],
+        "storage": project.storage
+    }
     
-    # Add filter to environment instead of globals if possible, or use environment
-    from jinja2 import Environment
-    env = Environment()
-    env.filters['python_type'] = python_type_filter
-    jinja_template = env.from_string(template)
+    resources = context["resources"]
+    if pool is None or len(resources) < MCP_PARALLEL_MIN_RESOURCES:
+        chunks = render_resources(resources, project.base_path, project.storage)
+    else:
+        shard_size = math.ceil(len(resources) / MCP_RENDER_PROCESSES)
+        shards = [resources[start:start + shard_size] for start in range(0, len(resources), shard_size)]
+        chunks = []
+        for shard_chunks in pool.map(
+            render_resources, shards, [project.base_path] * len(shards), [project.storage] * len(shards)
+        ):
+            chunks.extend(shard_chunks)
     
-    return jinja_template.render(
-        project_name=project.project_name,
-        description=project.description,
-        base_path=project.base_path,
-        resources=[r.dict() for r in project.resources]
+    return (
+        template_env.get_template(f"{project.storage}/header.py.j2").render(**context)
+        + "".join(chunks)
+        + template_env.get_template("footer.py.j2").render(**context)
     )
 
 
@@ -226,6 +501,8 @@ uvicorn==0.27.0
 pydantic==2.5.3
 python-multipart==0.0.6
 '''
+    if project.storage == "sqlite":
+        requirements += "sqlalchemy==2.0.25\n"
     
     return {
         "Dockerfile": dockerfile,
@@ -233,6 +510,22 @@ python-multipart==0.0.6
     }
 
 
+def write_project_files(project_dir: Path, files: Dict[str, str]):
+    """Write a generated project's files (runs in the threadpool)."""
+    project_dir.mkdir(parents=True, exist_ok=True)
+    for name, content in files.items():
+        (project_dir / name).write_text(content)
+
+
+def read_project_files(project_dir: Path, names: List[str]) -> Dict[str, str]:
+    """Read the generated files that exist (runs in the threadpool)."""
+    return {
+        name: (project_dir / name).read_text()
+        for name in names
+        if (project_dir / name).exists()
+    }
+
+
 @app.get("/")
 async def root():
     return {
@@ -247,19 +540,11 @@ async def create_mcp_project(project: MCPProject):
     """Create a new MCP (Model Context Protocol) CRUD API project."""
     project_id = str(uuid.uuid4())
     
-    # Generate code
-    api_code = generate_fastapi_code(project)
+    # Generate code off the event loop, in parallel for large projects
+    pool = get_render_executor() if len(project.resources) >= MCP_PARALLEL_MIN_RESOURCES else None
+    api_code = await run_in_threadpool(generate_fastapi_code, project, pool)
     docker_files = generate_docker_files(project)
     
-    # Create project directory
-    project_dir = MCP_DIR / project_id
-    project_dir.mkdir(parents=True, exist_ok=True)
-    
-    # Save files
-    (project_dir / "main.py").write_text(api_code)
-    (project_dir / "Dockerfile").write_text(docker_files["Dockerfile"])
-    (project_dir / "requirements.txt").write_text(docker_files["requirements.txt"])
-    
     # Save project metadata
     metadata = {
         "project_id": project_id,
@@ -270,7 +555,13 @@ async def create_mcp_project(project: MCPProject):
         "created_at": datetime.utcnow().isoformat()
     }
     
-    (project_dir / "metadata.json").write_text(json.dumps(metadata, indent=2))
+    # Save files
+    await run_in_threadpool(write_project_files, MCP_DIR / project_id, {
+        "main.py": api_code,
+        "Dockerfile": docker_files["Dockerfile"],
+        "requirements.txt": docker_files["requirements.txt"],
+        "metadata.json": json.dumps(metadata, indent=2)
+    })
     
     # Store in memory
     mcp_projects[project_id] = metadata
@@ -308,14 +599,10 @@ async def get_mcp_project(project_id: str):
     if project_id not in mcp_projects:
         raise HTTPException(status_code=404, detail="Project not found")
     
-    project_dir = MCP_DIR / project_id
-    
     # Read generated files
-    files = {}
-    for file in ["main.py", "Dockerfile", "requirements.txt"]:
-        file_path = project_dir / file
-        if file_path.exists():
-            files[file] = file_path.read_text()
+    files = await run_in_threadpool(
+        read_project_files, MCP_DIR / project_id, ["main.py", "Dockerfile", "requirements.txt"]
+    )
     
     return {
         "project_id": project_id,
@@ -327,15 +614,14 @@ async def get_mcp_project(project_id: str):
 @app.get("/mcp/code/{project_id}")
 async def get_generated_code(project_id: str):
     """Get generated code for a project."""
-    project_dir = MCP_DIR / project_id
-    main_file = project_dir / "main.py"
+    files = await run_in_threadpool(read_project_files, MCP_DIR / project_id, ["main.py"])
     
-    if not main_file.exists():
+    if "main.py" not in files:
         raise HTTPException(status_code=404, detail="Project not found")
     
     return {
         "project_id": project_id,
-        "code": main_file.read_text()
+        "code": files["main.py"]
     }
 
 
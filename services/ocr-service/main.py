@@ -1,6 +1,12 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from collections import OrderedDict, deque
+from array import array
+import anyio
 import fitz  # PyMuPDF
 import pytesseract
 from pdf2image import convert_from_path
@@ -8,11 +14,29 @@ from PIL import Image
 import os
 import json
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator, AsyncIterator, Callable, Any
 import uuid
+import hashlib
+import email.utils
+import math
+import bisect
+import mmap
+import string
+import struct
+import sqlite3
+import threading
 import os
 
-app = FastAPI(title="OCR Service", description="PDF OCR with text highlighting")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stop extraction workers on shutdown
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="OCR Service", description="PDF OCR with text highlighting", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -26,57 +50,1081 @@ app.add_middleware(
 UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", "/uploads")) / "ocr"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
+# Page-parallel extraction settings
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+OCR_PAGES_PER_SHARD = int(os.getenv("OCR_PAGES_PER_SHARD", "16"))
+# Shards whose Tesseract work is queued ahead of the page being read
+OCR_READAHEAD_SHARDS = int(os.getenv("OCR_READAHEAD_SHARDS", "4"))
 
-def extract_text_with_coordinates(pdf_path: str) -> Dict:
-    """Extract text from PDF with coordinates for each word."""
-    doc = fitz.open(pdf_path)
-    results = []
+# Upload spooling settings
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(500 * 1024 ** 2)))
+
+# Tesseract fallback for pages without a text layer
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANGUAGE = os.getenv("OCR_LANGUAGE", "eng")
+OCR_MODES = ["auto", "off"]
+
+# Highlight output: rewrite the PDF, append an incremental update, or return
+# annotation quads as JSON without writing a PDF
+HIGHLIGHT_MODES = ["full", "incremental", "overlay"]
+
+# Stored result format: "json" or the memory-mappable "compact" format
+OCR_RESULT_FORMAT = os.getenv("OCR_RESULT_FORMAT", "json")
+RESULT_SUFFIXES = {"json": "_result.json", "compact": "_result.ocrc"}
+PAGE_SOURCES = ["text", "ocr", "scanned"]
+
+# Compact format header: magic, version, reserved, page count, span count,
+# font count, text buffer bytes, font table bytes (little-endian)
+COMPACT_MAGIC = b"OCRC"
+COMPACT_VERSION = 1
+COMPACT_HEADER = struct.Struct("<4sHHIIIII")
+
+# Content-addressed result cache settings
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Downloads are sent in chunks of this size when zero-copy isn't available
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+# Full-text search index shared with the audio service
+SEARCH_DB_PATH = Path(os.getenv("UPLOAD_DIR", "/uploads")) / "search" / "index.db"
+
+# Process pool shared by all requests (created on first use)
+executor: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> Optional[ProcessPoolExecutor]:
+    """Lazy create the page extraction process pool."""
+    global executor
+    if executor is None and OCR_WORKERS > 1:
+        executor = ProcessPoolExecutor(max_workers=OCR_WORKERS)
+    return executor
+
+
+def write_chunk(f, digest, chunk: bytes):
+    """Hash and write one upload chunk (runs in the threadpool)."""
+    digest.update(chunk)
+    f.write(chunk)
+
+
+async def spool_upload(file: UploadFile, dest: Path, max_bytes: Optional[int] = None) -> Tuple[int, str]:
+    """Stream an upload to disk in bounded chunks.
+    
+    Returns the size and SHA-256 hex digest of the upload. Uploads larger than
+    max_bytes are rejected with 413 and the partial file is removed.
+    """
+    max_bytes = MAX_UPLOAD_BYTES if max_bytes is None else max_bytes
+    too_large = HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size is {max_bytes} bytes"
+    )
+    if file.size is not None and file.size > max_bytes:
+        raise too_large
+    
+    digest = hashlib.sha256()
+    size = 0
+    f = await run_in_threadpool(open, dest, "wb")
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise too_large
+            await run_in_threadpool(write_chunk, f, digest, chunk)
+    except BaseException:
+        await run_in_threadpool(f.close)
+        dest.unlink(missing_ok=True)
+        raise
+    await run_in_threadpool(f.close)
+    
+    return size, digest.hexdigest()
+
+
+class UploadLimitMiddleware:
+    """Reject request bodies over MAX_UPLOAD_BYTES before they are parsed.
+    
+    The multipart parser spools the whole body before a handler runs, so
+    spool_upload alone can only refuse an upload after receiving it. A
+    declared Content-Length over the limit is answered with 413 without
+    reading the body; otherwise the body is counted as it arrives and the
+    request fails with 413 as soon as it crosses the limit.
+    """
     
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text_instances = page.get_text("dict")
+    def __init__(self, app, max_bytes: Optional[int] = None):
+        self.app = app
+        self.max_bytes = max_bytes
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
         
-        page_data = {
-            "page_number": page_num + 1,
-            "width": page.rect.width,
-            "height": page.rect.height,
-            "blocks": []
-        }
+        max_bytes = MAX_UPLOAD_BYTES if self.max_bytes is None else self.max_bytes
+        detail = f"File too large. Maximum size is {max_bytes} bytes"
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > max_bytes:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+        
+        await self.app(scope, limited_receive, send)
+
+
+app.add_middleware(UploadLimitMiddleware)
+
+
+class ArtifactCache:
+    """Size-bounded LRU index from content digests to artifacts in a directory.
+    
+    Each entry owns the files it lists; evicting an entry deletes them and
+    calls on_evict with it, so data derived from the files can go too. The
+    index is persisted next to the artifacts so it survives restarts; get
+    and put touch the disk, so async handlers run them in the threadpool.
+    """
+    
+    def __init__(
+        self,
+        root: Path,
+        max_bytes: int,
+        index_name: str = "cache_index.json",
+        on_evict: Optional[Callable[[Dict], None]] = None
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.index_path = root / index_name
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, "r") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Stored least recently used first
+        for key, entry in entries:
+            if self._files_exist(entry):
+                self.entries[key] = entry
+                self.total_bytes += entry["size"]
+    
+    def _save(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(list(self.entries.items()), f)
+        os.replace(tmp_path, self.index_path)
+    
+    def _files_exist(self, entry: Dict) -> bool:
+        return all((self.root / name).exists() for name in entry["files"])
+    
+    def _remove(self, key: str):
+        entry = self.entries.pop(key)
+        self.total_bytes -= entry["size"]
+        for name in entry["files"]:
+            (self.root / name).unlink(missing_ok=True)
+        if self.on_evict is not None:
+            self.on_evict(entry)
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Return the entry for a key and mark it as recently used."""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and self._files_exist(entry):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                # Artifacts were removed behind our back
+                self._remove(key)
+                self._save()
+            self.misses += 1
+            return None
+    
+    def put(self, key: str, file_id: str, files: List[str]) -> Dict:
+        """Register artifacts for a key, evicting least recently used entries.
         
-        for block in text_instances.get("blocks", []):
-            if block.get("type") == 0:  # Text block
-                for line in block.get("lines", []):
-                    for span in line.get("spans", []):
-                        page_data["blocks"].append({
-                            "text": span.get("text", ""),
-                            "bbox": span.get("bbox", []),
-                            "size": span.get("size", 0),
-                            "font": span.get("font", "")
-                        })
+        Returns the entry now stored for the key. If a concurrent identical
+        request stored it first, that entry is kept (its file_id may already
+        have been handed out) and the newcomer's artifacts are dropped.
+        """
+        size = sum((self.root / name).stat().st_size for name in files)
+        with self._lock:
+            existing = self.entries.get(key)
+            if existing is not None and existing["file_id"] != file_id and self._files_exist(existing):
+                self.entries.move_to_end(key)
+                for name in files:
+                    (self.root / name).unlink(missing_ok=True)
+                if self.on_evict is not None:
+                    self.on_evict({"file_id": file_id, "files": files, "size": size})
+                self._save()
+                return existing
+            if existing is not None and existing["file_id"] == file_id:
+                # Re-registering the same artifacts must not delete them
+                del self.entries[key]
+                self.total_bytes -= existing["size"]
+            elif existing is not None:
+                self._remove(key)
+            entry = {"file_id": file_id, "files": files, "size": size}
+            self.entries[key] = entry
+            self.total_bytes += size
+            # Never evict the entry we just added
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+            self._save()
+            return entry
+    
+    def replace_files(self, old_names: List[str], new_names: List[str]):
+        """Swap old_names for new_names in the entry owning them (e.g. after a format conversion)."""
+        with self._lock:
+            for entry in self.entries.values():
+                if old_names[0] in entry["files"]:
+                    entry["files"] = [name for name in entry["files"] if name not in old_names] + new_names
+                    size = sum((self.root / name).stat().st_size for name in entry["files"])
+                    self.total_bytes += size - entry["size"]
+                    entry["size"] = size
+            self._save()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "size_bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+
+def cache_key(kind: str, content_digest: str, search_terms: Optional[List[str]] = None) -> str:
+    """Build a cache key from the upload digest and, for highlighting, the terms."""
+    key = f"{kind}:{content_digest}"
+    if search_terms:
+        terms = "\n".join(sorted(set(search_terms)))
+        key += ":" + hashlib.sha256(terms.encode("utf-8")).hexdigest()
+    return key
+
+
+def forget_evicted(entry: Dict):
+    """Drop search rows of an evicted result, so search only finds stored results."""
+    search_index.remove_file(entry["file_id"])
+
+
+result_cache = ArtifactCache(UPLOAD_DIR, OCR_CACHE_MAX_BYTES, on_evict=forget_evicted)
+
+
+class SearchIndex:
+    """Full-text index over OCR and transcription results (SQLite FTS5).
+    
+    The database lives on the shared uploads volume so the OCR and audio
+    services write to, and search, the same index.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5("
+                "text, file_id UNINDEXED, source UNINDEXED, location UNINDEXED)"
+            )
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def add(self, file_id: str, source: str, rows: Iterable[Tuple[str, Dict]]) -> int:
+        """Index (text, location) rows for a result; returns the row count."""
+        records = [
+            (text, file_id, source, json.dumps(location))
+            for text, location in rows
+            if text.strip()
+        ]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO documents (text, file_id, source, location) VALUES (?, ?, ?, ?)",
+                records
+            )
+        return len(records)
+    
+    def remove_file(self, file_id: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM documents WHERE file_id = ?", (file_id,))
+    
+    def remove_source(self, source: str):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM documents WHERE source = ?", (source,))
+    
+    def search(self, query: str, source: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Search for rows containing all words of query, best matches first."""
+        # Quote each word so user input is never parsed as FTS5 syntax
+        match = " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+        sql = (
+            "SELECT file_id, source, location, text FROM documents "
+            "WHERE documents MATCH ?"
+        )
+        params: List = [match]
+        if source:
+            sql += " AND source = ?"
+            params.append(source)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(limit)
         
-        results.append(page_data)
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {"file_id": file_id, "source": row_source, "text": text, **json.loads(location)}
+            for file_id, row_source, location, text in rows
+        ]
+
+
+search_index = SearchIndex(SEARCH_DB_PATH)
+
+
+def ocr_index_rows(result: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Search index rows for an extraction: one per text span."""
+    for page in result["pages"]:
+        for block in page["blocks"]:
+            yield block["text"], {"page": page["page_number"], "bbox": block["bbox"]}
+
+
+def rebuild_search_index() -> int:
+    """Re-index every stored extraction result; returns the number indexed."""
+    search_index.remove_source("ocr")
+    count = 0
+    for suffix in RESULT_SUFFIXES.values():
+        for path in sorted(UPLOAD_DIR.glob(f"*{suffix}")):
+            file_id = path.name[:-len(suffix)]
+            search_index.add(file_id, "ocr", ocr_index_rows(load_result(path)))
+            count += 1
+    return count
+
+
+def extract_page(page, page_num: int) -> Dict:
+    """Extract text spans with coordinates from a single page.
+    
+    Pages with images but no text layer are marked with source "scanned" so
+    they can be sent to OCR; everything else has source "text".
+    """
+    text_instances = page.get_text("dict")
+    
+    page_data = {
+        "page_number": page_num + 1,
+        "width": page.rect.width,
+        "height": page.rect.height,
+        "source": "text",
+        "blocks": []
+    }
+    
+    has_images = False
+    for block in text_instances.get("blocks", []):
+        if block.get("type") == 0:  # Text block
+            for line in block.get("lines", []):
+                for span in line.get("spans", []):
+                    page_data["blocks"].append({
+                        "text": span.get("text", ""),
+                        "bbox": span.get("bbox", []),
+                        "size": span.get("size", 0),
+                        "font": span.get("font", "")
+                    })
+        elif block.get("type") == 1:  # Image block
+            has_images = True
+    
+    if has_images and not any(block["text"].strip() for block in page_data["blocks"]):
+        page_data["source"] = "scanned"
+    
+    return page_data
+
+
+def ocr_page(pdf_path: str, page_num: int, width: float, height: float, dpi: int) -> List[Dict]:
+    """Rasterize one page and OCR it into word blocks in PDF coordinates."""
+    image = convert_from_path(pdf_path, dpi=dpi, first_page=page_num + 1, last_page=page_num + 1)[0]
+    data = pytesseract.image_to_data(image, lang=OCR_LANGUAGE, output_type=pytesseract.Output.DICT)
+    
+    # Scale pixels back to the page's point space used by the fitz spans
+    scale_x = width / image.width
+    scale_y = height / image.height
+    blocks = []
+    for i, text in enumerate(data["text"]):
+        if not text.strip():
+            continue
+        x0 = data["left"][i] * scale_x
+        y0 = data["top"][i] * scale_y
+        x1 = (data["left"][i] + data["width"][i]) * scale_x
+        y1 = (data["top"][i] + data["height"][i]) * scale_y
+        blocks.append({
+            "text": text,
+            "bbox": [x0, y0, x1, y1],
+            "size": y1 - y0,
+            "font": "",
+            "confidence": float(data["conf"][i])
+        })
+    return blocks
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> List[Dict]:
+    """Extract pages [start, stop) in a worker with its own document handle."""
+    doc = fitz.open(pdf_path)
+    try:
+        return [extract_page(doc[page_num], page_num) for page_num in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def page_shards(total_pages: int, shard_size: int) -> List[Tuple[int, int]]:
+    """Split a page count into contiguous [start, stop) ranges."""
+    shard_size = max(1, shard_size)
+    return [
+        (start, min(start + shard_size, total_pages))
+        for start in range(0, total_pages, shard_size)
+    ]
+
+
+def submit_scanned_pages(pdf_path: str, pages: List[Dict], pool: ProcessPoolExecutor) -> List[Tuple[Dict, Future]]:
+    """Queue Tesseract for each page without a text layer, one pool task per page."""
+    return [
+        (page, pool.submit(ocr_page, pdf_path, page["page_number"] - 1, page["width"], page["height"], OCR_DPI))
+        for page in pages
+        if page["source"] == "scanned"
+    ]
+
+
+def fill_ocr_blocks(scanned: List[Tuple[Dict, Future]]):
+    """Wait for queued OCR tasks and put their blocks on the pages."""
+    for page, future in scanned:
+        page["blocks"] = future.result()
+        page["source"] = "ocr"
+
+
+def ocr_scanned_pages(pdf_path: str, pages: List[Dict], pool: Optional[ProcessPoolExecutor] = None):
+    """Fill in blocks for pages without a text layer using Tesseract.
+    
+    Only scanned pages are rasterized; each is OCRed as its own pool task.
+    """
+    if pool is not None:
+        fill_ocr_blocks(submit_scanned_pages(pdf_path, pages, pool))
+        return
+    for page in pages:
+        if page["source"] == "scanned":
+            page["blocks"] = ocr_page(pdf_path, page["page_number"] - 1, page["width"], page["height"], OCR_DPI)
+            page["source"] = "ocr"
+
+
+def iter_pages(
+    pdf_path: str,
+    pool: Optional[ProcessPoolExecutor] = None,
+    ocr_mode: str = "auto"
+) -> Iterator[Dict]:
+    """Yield extracted pages in page order as they become available.
+    
+    When a process pool is given, page ranges are extracted in parallel and
+    each shard is yielded as soon as it and the shards before it are done.
+    OCR for the next OCR_READAHEAD_SHARDS shards is queued before a shard is
+    yielded, so a slow reader doesn't leave the pool idle. With ocr_mode
+    "auto", pages that have no text layer are OCRed; with "off" they are
+    returned empty as "scanned".
+    """
+    doc = fitz.open(pdf_path)
+    total_pages = len(doc)
+    
+    shards = page_shards(total_pages, OCR_PAGES_PER_SHARD)
+    if pool is None or len(shards) <= 1:
+        try:
+            pages = [extract_page(doc[page_num], page_num) for page_num in range(total_pages)]
+        finally:
+            doc.close()
+        if ocr_mode == "auto":
+            ocr_scanned_pages(pdf_path, pages, pool)
+        yield from pages
+        return
     
     doc.close()
+    extractions = iter([pool.submit(extract_page_range, pdf_path, start, stop) for start, stop in shards])
+    ahead: "deque[Tuple[List[Dict], List[Tuple[Dict, Future]]]]" = deque()
+    
+    def read_ahead():
+        # Keep the current shard plus OCR_READAHEAD_SHARDS queued
+        while len(ahead) <= OCR_READAHEAD_SHARDS:
+            extraction = next(extractions, None)
+            if extraction is None:
+                return
+            pages = extraction.result()
+            ahead.append((pages, submit_scanned_pages(pdf_path, pages, pool) if ocr_mode == "auto" else []))
+    
+    try:
+        read_ahead()
+        while ahead:
+            pages, scanned = ahead.popleft()
+            fill_ocr_blocks(scanned)
+            read_ahead()
+            yield from pages
+    finally:
+        # Abandoned by the reader: drop work that hasn't started
+        for future in extractions:
+            future.cancel()
+        for _, scanned in ahead:
+            for _, future in scanned:
+                future.cancel()
+
+
+def extract_text_with_coordinates(
+    pdf_path: str,
+    pool: Optional[ProcessPoolExecutor] = None,
+    ocr_mode: str = "auto"
+) -> Dict:
+    """Extract text from PDF with coordinates for each word."""
+    results = list(iter_pages(pdf_path, pool, ocr_mode))
     return {"pages": results, "total_pages": len(results)}
 
 
-def highlight_pdf(pdf_path: str, search_terms: List[str], output_path: str):
-    """Create a highlighted version of the PDF."""
+class ResultWriter:
+    """Write an extraction result to disk one page at a time.
+    
+    The file has the same shape as json.dump of the full result and only
+    appears under its final name once close() is called. The byte offset and
+    length of every page are written to a companion .idx file so single
+    pages can be read back without parsing the whole result.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.index_path = page_index_path(path)
+        self.paths = [self.path, self.index_path]
+        self.tmp_path = path.with_name(path.name + ".part")
+        self.page_count = 0
+        self.offsets = array("Q")
+        self._f = open(self.tmp_path, "wb")
+        self._position = self._write(b'{"pages": [')
+    
+    def _write(self, data: bytes) -> int:
+        self._f.write(data)
+        return len(data)
+    
+    def write_page(self, page: Dict):
+        if self.page_count:
+            self._position += self._write(b", ")
+        data = json.dumps(page).encode("utf-8")
+        self.offsets.extend((self._position, len(data)))
+        self._position += self._write(data)
+        self.page_count += 1
+    
+    def close(self):
+        self._write(f'], "total_pages": {self.page_count}}}'.encode("utf-8"))
+        self._f.close()
+        with open(self.index_path, "wb") as f:
+            self.offsets.tofile(f)
+        os.replace(self.tmp_path, self.path)
+    
+    def abort(self):
+        self._f.close()
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class CompactResultWriter:
+    """Write an extraction result in the compact columnar format.
+    
+    Spans are accumulated into typed arrays (float32 bboxes and sizes,
+    interned font ids, offsets into a single UTF-8 text buffer) and written
+    in one go on close(). Same interface as ResultWriter.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.paths = [self.path]
+        self.tmp_path = path.with_name(path.name + ".part")
+        self.page_count = 0
+        self.widths = array("f")
+        self.heights = array("f")
+        self.sources = array("B")
+        self.page_starts = array("I", [0])
+        self.bboxes = array("f")
+        self.sizes = array("f")
+        self.font_ids = array("I")
+        self.confidences = array("f")
+        self.text_offsets = array("I", [0])
+        self.text = bytearray()
+        self.fonts: Dict[str, int] = {}
+    
+    def write_page(self, page: Dict):
+        self.widths.append(page["width"])
+        self.heights.append(page["height"])
+        self.sources.append(PAGE_SOURCES.index(page.get("source", "text")))
+        for block in page["blocks"]:
+            self.bboxes.extend(block["bbox"] or [0.0, 0.0, 0.0, 0.0])
+            self.sizes.append(block["size"])
+            self.font_ids.append(self.fonts.setdefault(block["font"], len(self.fonts)))
+            self.confidences.append(block.get("confidence", math.nan))
+            self.text.extend(block["text"].encode("utf-8"))
+            self.text_offsets.append(len(self.text))
+        self.page_starts.append(len(self.sizes))
+        self.page_count += 1
+    
+    def close(self):
+        font_table = "\0".join(self.fonts).encode("utf-8")
+        header = COMPACT_HEADER.pack(
+            COMPACT_MAGIC, COMPACT_VERSION, 0, self.page_count, len(self.sizes),
+            len(self.fonts), len(self.text), len(font_table)
+        )
+        with open(self.tmp_path, "wb") as f:
+            f.write(header)
+            # 4-byte columns first so every column stays aligned
+            for column in (
+                self.widths, self.heights, self.page_starts, self.bboxes,
+                self.sizes, self.font_ids, self.confidences, self.text_offsets
+            ):
+                column.tofile(f)
+            self.sources.tofile(f)
+            f.write(self.text)
+            f.write(font_table)
+        os.replace(self.tmp_path, self.path)
+    
+    def abort(self):
+        self.tmp_path.unlink(missing_ok=True)
+
+
+class CompactResult:
+    """Memory-mapped reader for compact extraction results.
+    
+    Columns are read straight from the mapping, so opening a result costs the
+    same regardless of its size and only the pages asked for are decoded.
+    """
+    
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        view = self._view(memoryview(self._mmap))
+        
+        magic, version, _, page_count, span_count, font_count, text_bytes, font_bytes = (
+            COMPACT_HEADER.unpack_from(view)
+        )
+        if magic != COMPACT_MAGIC or version != COMPACT_VERSION:
+            self.close()
+            raise ValueError(f"Not a compact OCR result: {path}")
+        self.page_count = page_count
+        
+        offset = COMPACT_HEADER.size
+        
+        def column(count: int, typecode: str) -> memoryview:
+            nonlocal offset
+            data = self._view(view[offset:offset + 4 * count].cast(typecode))
+            offset += 4 * count
+            return data
+        
+        self.widths = column(page_count, "f")
+        self.heights = column(page_count, "f")
+        self.page_starts = column(page_count + 1, "I")
+        self.bboxes = column(4 * span_count, "f")
+        self.sizes = column(span_count, "f")
+        self.font_ids = column(span_count, "I")
+        self.confidences = column(span_count, "f")
+        self.text_offsets = column(span_count + 1, "I")
+        self.sources = self._view(view[offset:offset + page_count])
+        offset += page_count
+        self.text = self._view(view[offset:offset + text_bytes])
+        offset += text_bytes
+        font_table = bytes(view[offset:offset + font_bytes]).decode("utf-8")
+        self.fonts = font_table.split("\0") if font_count else []
+    
+    def _view(self, view: memoryview) -> memoryview:
+        self._views.append(view)
+        return view
+    
+    def page(self, index: int) -> Dict:
+        """Decode one page (0-based) into the JSON result shape."""
+        blocks = []
+        for span in range(self.page_starts[index], self.page_starts[index + 1]):
+            block = {
+                "text": bytes(self.text[self.text_offsets[span]:self.text_offsets[span + 1]]).decode("utf-8"),
+                "bbox": [round(value, 3) for value in self.bboxes[4 * span:4 * span + 4]],
+                "size": round(self.sizes[span], 3),
+                "font": self.fonts[self.font_ids[span]]
+            }
+            if not math.isnan(self.confidences[span]):
+                block["confidence"] = round(self.confidences[span], 3)
+            blocks.append(block)
+        return {
+            "page_number": index + 1,
+            "width": round(self.widths[index], 3),
+            "height": round(self.heights[index], 3),
+            "source": PAGE_SOURCES[self.sources[index]],
+            "blocks": blocks
+        }
+    
+    def to_json(self) -> Dict:
+        """Convert to the JSON result shape."""
+        return {
+            "pages": [self.page(index) for index in range(self.page_count)],
+            "total_pages": self.page_count
+        }
+    
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+        self._file.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+
+
+def page_index_path(path: Path) -> Path:
+    """Page offset index stored next to a JSON result."""
+    return path.with_suffix(".idx")
+
+
+def result_path(file_id: str, result_format: Optional[str] = None) -> Path:
+    """Path of a stored result in the given (default: configured) format."""
+    return UPLOAD_DIR / f"{file_id}{RESULT_SUFFIXES[result_format or OCR_RESULT_FORMAT]}"
+
+
+def stored_result_path(file_id: str) -> Optional[Path]:
+    """Path of the stored result for file_id, whichever format it is in."""
+    for result_format in RESULT_SUFFIXES:
+        path = result_path(file_id, result_format)
+        if path.exists():
+            return path
+    return None
+
+
+def load_result(path: Path) -> Dict:
+    """Load a stored result of either format in the JSON result shape."""
+    if path.name.endswith(RESULT_SUFFIXES["compact"]):
+        with CompactResult(path) as compact:
+            return compact.to_json()
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def parse_page_ranges(spec: str) -> List[Tuple[int, int]]:
+    """Parse a 1-based page spec like "1-5,8" into inclusive ranges."""
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        start, end = int(start), int(end or start)
+        if start < 1 or end < start:
+            raise ValueError(f"Invalid page range '{part}'")
+        ranges.append((start, end))
+    return ranges
+
+
+def read_result_pages(path: Path, ranges: Optional[List[Tuple[int, int]]] = None) -> Tuple[int, List[Dict]]:
+    """Read the pages in ranges (all pages if None) from a stored result.
+    
+    Returns the document's total page count and the selected pages in page
+    order. Compact results decode pages straight from the mapping; JSON
+    results seek to each page through their offset index.
+    """
+    def selected(total_pages: int) -> List[int]:
+        if ranges is None:
+            return list(range(1, total_pages + 1))
+        return sorted({
+            number
+            for start, end in ranges
+            for number in range(start, min(end, total_pages) + 1)
+        })
+    
+    if path.name.endswith(RESULT_SUFFIXES["compact"]):
+        with CompactResult(path) as compact:
+            return compact.page_count, [compact.page(number - 1) for number in selected(compact.page_count)]
+    
+    index_path = page_index_path(path)
+    if not index_path.exists():
+        # Results stored before page indexes were written
+        result = load_result(path)
+        return result["total_pages"], [result["pages"][number - 1] for number in selected(result["total_pages"])]
+    
+    offsets = array("Q")
+    with open(index_path, "rb") as f:
+        offsets.frombytes(f.read())
+    total_pages = len(offsets) // 2
+    
+    pages = []
+    with open(path, "rb") as f:
+        for number in selected(total_pages):
+            offset, length = offsets[2 * (number - 1)], offsets[2 * (number - 1) + 1]
+            f.seek(offset)
+            pages.append(json.loads(f.read(length)))
+    return total_pages, pages
+
+
+def filter_region(pages: List[Dict], region: List[float]) -> List[Dict]:
+    """Keep only blocks whose bbox intersects region [x0, y0, x1, y1]."""
+    x0, y0, x1, y1 = region
+    return [
+        {
+            **page,
+            "blocks": [
+                block for block in page["blocks"]
+                if block["bbox"] and block["bbox"][0] <= x1 and block["bbox"][2] >= x0
+                and block["bbox"][1] <= y1 and block["bbox"][3] >= y0
+            ]
+        }
+        for page in pages
+    ]
+
+
+RESULT_WRITERS = {"json": ResultWriter, "compact": CompactResultWriter}
+
+
+def open_result_writer(file_id: str, result_format: Optional[str] = None):
+    """Page-by-page writer for a result in the given (default: configured) format."""
+    result_format = result_format or OCR_RESULT_FORMAT
+    return RESULT_WRITERS[result_format](result_path(file_id, result_format))
+
+
+def save_result(file_id: str, result: Dict):
+    """Store a complete result in the configured format; returns the writer."""
+    writer = open_result_writer(file_id)
+    try:
+        for page in result["pages"]:
+            writer.write_page(page)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return writer
+
+
+def convert_results(result_format: str) -> int:
+    """Convert every stored result to result_format; returns the number converted."""
+    count = 0
+    for other_format, suffix in RESULT_SUFFIXES.items():
+        if other_format == result_format:
+            continue
+        for path in sorted(UPLOAD_DIR.glob(f"*{suffix}")):
+            file_id = path.name[:-len(suffix)]
+            writer = open_result_writer(file_id, result_format)
+            for page in load_result(path)["pages"]:
+                writer.write_page(page)
+            writer.close()
+            old_paths = [path, page_index_path(path)] if other_format == "json" else [path]
+            result_cache.replace_files(
+                [old.name for old in old_paths],
+                [new.name for new in writer.paths]
+            )
+            for old in old_paths:
+                old.unlink(missing_ok=True)
+            count += 1
+    return count
+
+
+def normalize_token(token: str) -> str:
+    """Case-fold a word and strip surrounding punctuation for matching."""
+    return token.strip(string.punctuation + "\u201c\u201d\u2018\u2019").casefold()
+
+
+def compile_terms(search_terms: List[str]) -> Dict[str, List[Tuple[int, List[str]]]]:
+    """Index search terms by their first token as (term index, tokens)."""
+    term_index: Dict[str, List[Tuple[int, List[str]]]] = {}
+    for index, term in enumerate(search_terms):
+        tokens = [normalize_token(token) for token in term.split()]
+        tokens = [token for token in tokens if token]
+        if tokens:
+            term_index.setdefault(tokens[0], []).append((index, tokens))
+    return term_index
+
+
+def locate_terms(words: List[Tuple], term_index: Dict[str, List[Tuple[int, List[str]]]]) -> Dict[int, List[Tuple]]:
+    """Find all terms in a page's words in one pass.
+    
+    words are PyMuPDF "words" tuples (x0, y0, x1, y1, text, ...). Returns the
+    word rectangles covered by each matched term.
+    """
+    tokens = [normalize_token(word[4]) for word in words]
+    hits: Dict[int, List[Tuple]] = {}
+    for position, token in enumerate(tokens):
+        for index, term_tokens in term_index.get(token, ()):
+            end = position + len(term_tokens)
+            if tokens[position:end] == term_tokens:
+                hits.setdefault(index, []).extend(tuple(word[:4]) for word in words[position:end])
+    return hits
+
+
+def compile_substrings(search_terms: List[str]) -> List[Tuple[int, str]]:
+    """Case-folded terms, with runs of whitespace collapsed, as (term index, text)."""
+    phrases = [(index, " ".join(term.split()).casefold()) for index, term in enumerate(search_terms)]
+    return [(index, phrase) for index, phrase in phrases if phrase]
+
+
+def locate_substrings(words: List[Tuple], phrases: List[Tuple[int, str]]) -> Dict[int, List[Tuple]]:
+    """Find terms anywhere in a page's text, like a case-insensitive page search.
+    
+    The page text is the words joined by single spaces, so a term can start
+    or end inside a word ("invoice" in "invoices"). Rectangles of partly
+    matched words are cut to the matched characters in proportion.
+    """
+    folded = [word[4].casefold() for word in words]
+    starts = []
+    position = 0
+    for token in folded:
+        starts.append(position)
+        position += len(token) + 1
+    text = " ".join(folded)
+    
+    hits: Dict[int, List[Tuple]] = {}
+    for index, phrase in phrases:
+        start = text.find(phrase)
+        while start >= 0:
+            end = start + len(phrase)
+            first = bisect.bisect_right(starts, start) - 1
+            last = bisect.bisect_right(starts, end - 1) - 1
+            for position in range(first, last + 1):
+                x0, y0, x1, y1 = words[position][:4]
+                word_start, length = starts[position], len(folded[position]) or 1
+                left = max(start - word_start, 0) / length
+                right = min(end - word_start, length) / length
+                hits.setdefault(index, []).append((x0 + (x1 - x0) * left, y0, x0 + (x1 - x0) * right, y1))
+            start = text.find(phrase, end)
+    return hits
+
+
+def locate_terms_in_range(
+    pdf_path: str,
+    start: int,
+    stop: int,
+    locate: Callable[[List[Tuple], Any], Dict[int, List[Tuple]]],
+    terms: Any
+) -> List[Dict[int, List[Tuple]]]:
+    """Locate terms on pages [start, stop) in a worker with its own document handle."""
     doc = fitz.open(pdf_path)
+    try:
+        return [locate(doc[page_num].get_text("words"), terms) for page_num in range(start, stop)]
+    finally:
+        doc.close()
+
+
+def rect_quad(rect: Tuple) -> List[List[float]]:
+    """Corner points of a rectangle in PyMuPDF quad order (ul, ur, ll, lr)."""
+    x0, y0, x1, y1 = (round(value, 2) for value in rect)
+    return [[x0, y0], [x1, y0], [x0, y1], [x1, y1]]
+
+
+def highlight_pdf(
+    pdf_path: str,
+    search_terms: List[str],
+    output_path: Optional[str],
+    pool: Optional[ProcessPoolExecutor] = None,
+    mode: str = "full",
+    whole_word: bool = False
+) -> Optional[Dict]:
+    """Create a highlighted version of the PDF.
     
-    for page_num in range(len(doc)):
-        page = doc[page_num]
+    Each page's words are extracted once and matched against all terms, so
+    the cost is bounded by page count rather than pages x terms. Matching runs
+    across the process pool when one is given; every term gets a single
+    annotation per page holding all of its quads.
+    
+    Terms match case-insensitively anywhere in the text; with whole_word
+    they only match whole words, ignoring surrounding punctuation.
+    
+    mode "full" writes a new document to output_path. "incremental" appends
+    only the annotation objects to pdf_path and then moves it to output_path
+    (falling back to a full rewrite when the file can't take an incremental
+    update). "overlay" writes nothing and returns the quads per page instead.
+    """
+    if mode not in HIGHLIGHT_MODES:
+        raise ValueError(f"Unsupported highlight mode: {mode}")
+    
+    if whole_word:
+        locate, terms = locate_terms, compile_terms(search_terms)
+    else:
+        locate, terms = locate_substrings, compile_substrings(search_terms)
+    doc = fitz.open(pdf_path)
+    
+    try:
+        shards = page_shards(len(doc), OCR_PAGES_PER_SHARD)
+        if pool is None or len(shards) <= 1:
+            page_hits = [locate(doc[page_num].get_text("words"), terms) for page_num in range(len(doc))]
+        else:
+            futures = [pool.submit(locate_terms_in_range, pdf_path, start, stop, locate, terms) for start, stop in shards]
+            page_hits = []
+            for future in futures:
+                page_hits.extend(future.result())
         
-        for search_term in search_terms:
-            text_instances = page.search_for(search_term)
-            
-            for inst in text_instances:
-                highlight = page.add_highlight_annot(inst)
+        if mode == "overlay":
+            pages = []
+            for page_num, hits in enumerate(page_hits):
+                if not hits:
+                    continue
+                page = doc[page_num]
+                pages.append({
+                    "page_number": page_num + 1,
+                    "width": page.rect.width,
+                    "height": page.rect.height,
+                    "highlights": [
+                        {"term": search_terms[index], "quads": [rect_quad(rect) for rect in rects]}
+                        for index, rects in hits.items()
+                    ]
+                })
+            return {"total_pages": len(doc), "pages": pages}
+        
+        for page_num, hits in enumerate(page_hits):
+            if not hits:
+                continue
+            page = doc[page_num]
+            for index, rects in hits.items():
+                highlight = page.add_highlight_annot(quads=[fitz.Rect(rect) for rect in rects])
                 highlight.set_colors(stroke=[1, 1, 0])  # Yellow highlight
+                highlight.set_info(content=search_terms[index])
                 highlight.update()
+        
+        if mode == "full":
+            doc.save(output_path)
+            return None
+        if doc.can_save_incrementally():
+            # The upload becomes the output, so no second copy is written
+            doc.saveIncr()
+            finished_path = pdf_path
+        else:
+            # Repaired or otherwise non-appendable files need a full rewrite
+            finished_path = f"{output_path}.tmp"
+            try:
+                doc.save(finished_path, garbage=1)
+            except Exception:
+                Path(finished_path).unlink(missing_ok=True)
+                raise
+    finally:
+        doc.close()
     
-    doc.save(output_path)
-    doc.close()
+    # Only a completely written file takes the output name
+    os.replace(finished_path, output_path)
+    if finished_path != pdf_path:
+        os.unlink(pdf_path)
+    return None
 
 
 @app.get("/")
@@ -88,47 +1136,154 @@ async def root():
     }
 
 
+def ndjson_line(record: Dict) -> str:
+    return json.dumps(record) + "\n"
+
+
+async def stream_cached_extraction(file_id: str, filename: str) -> AsyncIterator[str]:
+    """Replay a stored extraction as an NDJSON stream."""
+    yield ndjson_line({"type": "start", "file_id": file_id, "filename": filename, "cached": True})
+    result = await run_in_threadpool(load_result, stored_result_path(file_id))
+    for page in result["pages"]:
+        yield ndjson_line({"type": "page", "page": page})
+    yield ndjson_line({"type": "end", "file_id": file_id, "total_pages": result["total_pages"]})
+
+
+async def stream_extraction(
+    file_id: str,
+    filename: str,
+    file_path: Path,
+    key: str,
+    ocr: str
+) -> AsyncIterator[str]:
+    """Extract pages as an NDJSON stream, teeing them to the result file.
+    
+    Each page is sent as soon as it is parsed. The result is cached and
+    indexed only once the whole document has been written.
+    """
+    yield ndjson_line({"type": "start", "file_id": file_id, "filename": filename, "cached": False})
+    
+    pages = iter_pages(str(file_path), get_executor(), ocr)
+    writer = await run_in_threadpool(open_result_writer, file_id)
+    completed = False
+    try:
+        while True:
+            page = await run_in_threadpool(next, pages, None)
+            if page is None:
+                break
+            await run_in_threadpool(writer.write_page, page)
+            await run_in_threadpool(search_index.add, file_id, "ocr", ocr_index_rows({"pages": [page]}))
+            yield ndjson_line({"type": "page", "page": page})
+        
+        await run_in_threadpool(writer.close)
+        files = [file_path.name] + [path.name for path in writer.paths]
+        stored = await run_in_threadpool(result_cache.put, key, file_id, files)
+        completed = True
+        # An identical upload may have finished first; its result is the one kept
+        yield ndjson_line({"type": "end", "file_id": stored["file_id"], "total_pages": writer.page_count})
+    except Exception as e:
+        yield ndjson_line({"type": "error", "detail": f"OCR extraction failed: {str(e)}"})
+    finally:
+        # Also runs when the client disconnects mid-stream
+        if not completed:
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(pages.close)
+                await run_in_threadpool(writer.abort)
+                await run_in_threadpool(search_index.remove_file, file_id)
+                # Nothing was cached, so nothing else would delete these
+                for path in [file_path] + writer.paths:
+                    await run_in_threadpool(path.unlink, True)
+
+
 @app.post("/ocr/extract")
-async def extract_text(file: UploadFile = File(...)):
-    """Extract text from PDF with coordinates."""
+async def extract_text(file: UploadFile = File(...), ocr: str = "auto", stream: bool = False):
+    """Extract text from PDF with coordinates.
+    
+    With stream=true the result is sent as NDJSON, one page per line.
+    """
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
     
+    if ocr not in OCR_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported OCR mode. Allowed: {', '.join(OCR_MODES)}")
+    
     # Save uploaded file
     file_id = str(uuid.uuid4())
     file_path = UPLOAD_DIR / f"{file_id}.pdf"
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    _, content_digest = await spool_upload(file, file_path)
+    key = cache_key(f"extract-{ocr}", content_digest)
     
+    # Identical uploads are served from the stored result
+    cached = await run_in_threadpool(result_cache.get, key)
+    if cached is not None:
+        file_path.unlink(missing_ok=True)
+        if stream:
+            return StreamingResponse(
+                stream_cached_extraction(cached["file_id"], file.filename),
+                media_type="application/x-ndjson"
+            )
+        result = await run_in_threadpool(load_result, stored_result_path(cached["file_id"]))
+        return {
+            "file_id": cached["file_id"],
+            "filename": file.filename,
+            "extraction": result,
+            "cached": True
+        }
+    
+    if stream:
+        return StreamingResponse(
+            stream_extraction(file_id, file.filename, file_path, key, ocr),
+            media_type="application/x-ndjson"
+        )
+    
+    writer = None
     try:
-        # Extract text with coordinates
-        result = extract_text_with_coordinates(str(file_path))
+        # Extract text with coordinates off the event loop
+        result = await run_in_threadpool(
+            extract_text_with_coordinates, str(file_path), get_executor(), ocr
+        )
         
         # Save extraction result
-        result_path = UPLOAD_DIR / f"{file_id}_result.json"
-        with open(result_path, "w") as f:
-            json.dump(result, f)
+        writer = await run_in_threadpool(save_result, file_id, result)
+        
+        await run_in_threadpool(search_index.add, file_id, "ocr", ocr_index_rows(result))
+        files = [file_path.name] + [path.name for path in writer.paths]
+        stored = await run_in_threadpool(result_cache.put, key, file_id, files)
         
         return {
-            "file_id": file_id,
+            "file_id": stored["file_id"],
             "filename": file.filename,
-            "extraction": result
+            "extraction": result,
+            "cached": False
         }
     
     except Exception as e:
+        # Nothing was cached, so nothing else will clean these up
+        await run_in_threadpool(search_index.remove_file, file_id)
+        for path in [file_path] + (writer.paths if writer is not None else []):
+            path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"OCR extraction failed: {str(e)}")
 
 
 @app.post("/ocr/highlight")
 async def create_highlighted_pdf(
     file: UploadFile = File(...),
-    search_terms: str = ""
+    search_terms: str = "",
+    mode: str = "full",
+    whole_word: bool = False
 ):
-    """Create a highlighted PDF with search terms marked."""
+    """Create a highlighted PDF with search terms marked.
+    
+    Terms match anywhere in the text unless whole_word is set. mode
+    "incremental" appends the annotations to the uploaded file instead of
+    rewriting it; "overlay" returns the highlight quads per page as JSON and
+    writes no PDF.
+    """
     if not file.filename.endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    if mode not in HIGHLIGHT_MODES:
+        raise HTTPException(status_code=400, detail=f"Unsupported highlight mode. Allowed: {', '.join(HIGHLIGHT_MODES)}")
     
     # Parse search terms
     terms = [term.strip() for term in search_terms.split(",") if term.strip()]
@@ -140,42 +1295,296 @@ async def create_highlighted_pdf(
     file_id = str(uuid.uuid4())
     file_path = UPLOAD_DIR / f"{file_id}.pdf"
     highlighted_path = UPLOAD_DIR / f"{file_id}_highlighted.pdf"
+    overlay_path = UPLOAD_DIR / f"{file_id}_overlay.json"
     
-    with open(file_path, "wb") as f:
-        content = await file.read()
-        f.write(content)
+    _, content_digest = await spool_upload(file, file_path)
+    # Full and incremental saves produce equivalent PDFs and share cache entries
+    kind = "overlay" if mode == "overlay" else "highlight"
+    key = cache_key(f"{kind}-{'word' if whole_word else 'substring'}", content_digest, terms)
+    
+    cached = await run_in_threadpool(result_cache.get, key)
+    if cached is not None:
+        file_path.unlink(missing_ok=True)
+        file_id = cached["file_id"]
+        if mode == "overlay":
+            overlay = json.loads(await run_in_threadpool((UPLOAD_DIR / f"{file_id}_overlay.json").read_text))
+            return {
+                "file_id": file_id,
+                "filename": file.filename,
+                "search_terms": terms,
+                "overlay": overlay,
+                "cached": True
+            }
+        return {
+            "file_id": file_id,
+            "filename": file.filename,
+            "highlighted_file": f"{file_id}_highlighted.pdf",
+            "search_terms": terms,
+            "download_url": f"/ocr/download/{file_id}_highlighted.pdf",
+            "cached": True
+        }
     
     try:
-        # Create highlighted version
-        highlight_pdf(str(file_path), terms, str(highlighted_path))
+        # Create highlighted version off the event loop
+        overlay = await run_in_threadpool(
+            highlight_pdf, str(file_path), terms, str(highlighted_path), get_executor(), mode, whole_word
+        )
+        
+        if mode == "overlay":
+            file_path.unlink(missing_ok=True)
+            await run_in_threadpool(overlay_path.write_text, json.dumps(overlay))
+            stored = await run_in_threadpool(result_cache.put, key, file_id, [overlay_path.name])
+            return {
+                "file_id": stored["file_id"],
+                "filename": file.filename,
+                "search_terms": terms,
+                "overlay": overlay,
+                "cached": False
+            }
+        
+        if mode == "incremental":
+            stored = await run_in_threadpool(result_cache.put, key, file_id, [highlighted_path.name])
+        else:
+            stored = await run_in_threadpool(result_cache.put, key, file_id, [file_path.name, highlighted_path.name])
+        file_id = stored["file_id"]
         
         return {
             "file_id": file_id,
             "filename": file.filename,
             "highlighted_file": f"{file_id}_highlighted.pdf",
             "search_terms": terms,
-            "download_url": f"/ocr/download/{file_id}_highlighted.pdf"
+            "download_url": f"/ocr/download/{file_id}_highlighted.pdf",
+            "cached": False
         }
     
     except Exception as e:
+        # Nothing was cached, so nothing else will clean these up
+        for path in (file_path, highlighted_path, overlay_path):
+            path.unlink(missing_ok=True)
         raise HTTPException(status_code=500, detail=f"Highlighting failed: {str(e)}")
 
 
+@app.get("/ocr/result/{file_id}")
+async def get_result(file_id: str, pages: Optional[str] = None, bbox: Optional[str] = None):
+    """Get a stored extraction, optionally limited to pages and a bbox region.
+    
+    pages is a 1-based spec like "1-5,8"; bbox is "x0,y0,x1,y1" in points.
+    Only the requested pages are read from disk.
+    """
+    try:
+        ranges = parse_page_ranges(pages) if pages else None
+        region = [float(value) for value in bbox.split(",")] if bbox else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid page range or bbox: {str(e)}")
+    if region is not None and len(region) != 4:
+        raise HTTPException(status_code=400, detail="bbox must be x0,y0,x1,y1")
+    
+    path = stored_result_path(file_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Result not found")
+    
+    total_pages, selected = await run_in_threadpool(read_result_pages, path, ranges)
+    if region is not None:
+        selected = filter_region(selected, region)
+    
+    return {"file_id": file_id, "total_pages": total_pages, "pages": selected}
+
+
+class FileRangeResponse(Response):
+    """Send bytes [start, start + length) of a file.
+    
+    Uses the server's zero-copy (sendfile) extension when it advertises one,
+    otherwise reads the range in DOWNLOAD_CHUNK_SIZE chunks off the event
+    loop, so memory use doesn't depend on the file size.
+    """
+    
+    def __init__(self, path: Path, start: int, length: int, status_code: int, headers: Dict[str, str]):
+        super().__init__(status_code=status_code, headers=headers, media_type="application/pdf")
+        self.path = path
+        self.start = start
+        self.length = length
+    
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        
+        with open(self.path, "rb") as f:
+            if "http.response.zerocopy" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": f,
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False
+                })
+                return
+            
+            offset = self.start
+            remaining = self.length
+            while remaining > 0:
+                chunk = await anyio.to_thread.run_sync(
+                    os.pread, f.fileno(), min(DOWNLOAD_CHUNK_SIZE, remaining), offset
+                )
+                if not chunk:
+                    break
+                offset += len(chunk)
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining:
+                # File shrank underneath us; end the body
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        
+        if self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+# Content hashes of downloadable files keyed by (path, size, mtime)
+etag_cache: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+# file_etag runs on threadpool workers
+etag_cache_lock = threading.Lock()
+
+
+def file_etag(path: Path) -> str:
+    """Strong ETag from the SHA-256 of a file's content, memoized per file version."""
+    stat = path.stat()
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with etag_cache_lock:
+        etag = etag_cache.get(key)
+        if etag is not None:
+            etag_cache.move_to_end(key)
+            return etag
+    
+    # Hash outside the lock so other downloads aren't held up
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()}"'
+    with etag_cache_lock:
+        etag_cache[key] = etag
+        if len(etag_cache) > 1024:
+            etag_cache.popitem(last=False)
+    return etag
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single-range Range header into (start, length).
+    
+    Returns None when the header should be ignored (not bytes, or several
+    ranges) and raises ValueError when the range can't be satisfied.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        # Suffix range: the last N bytes
+        suffix = int(last)
+        if suffix <= 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        start = max(0, size - suffix)
+        return start, size - start
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Unsatisfiable range")
+    return start, end - start + 1
+
+
+def not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
 @app.get("/ocr/download/{filename}")
-async def download_file(filename: str):
-    """Download processed PDF file."""
+async def download_file(filename: str, request: Request):
+    """Download processed PDF file.
+    
+    Supports single byte ranges (206), If-Range, and conditional requests
+    via ETag/If-None-Match and Last-Modified/If-Modified-Since (304).
+    """
     file_path = UPLOAD_DIR / filename
     
     if not file_path.exists():
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(
-        path=file_path,
-        filename=filename,
-        media_type="application/pdf"
-    )
+    stat = file_path.stat()
+    etag = await run_in_threadpool(file_etag, file_path)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": email.utils.formatdate(stat.st_mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    }
+    
+    if not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=headers)
+    
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    # A stale If-Range means the client's partial copy is outdated: send it all
+    if range_header and (if_range is None or if_range in (etag, headers["Last-Modified"])):
+        try:
+            byte_range = parse_byte_range(range_header, stat.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+    
+    if byte_range is None:
+        return FileRangeResponse(
+            file_path, 0, stat.st_size, 200,
+            {**headers, "Content-Length": str(stat.st_size)}
+        )
+    
+    start, length = byte_range
+    return FileRangeResponse(file_path, start, length, 206, {
+        **headers,
+        "Content-Length": str(length),
+        "Content-Range": f"bytes {start}-{start + length - 1}/{stat.st_size}"
+    })
+
+
+@app.get("/ocr/cache/stats")
+async def cache_stats():
+    """Get result cache usage and hit/miss counters."""
+    return result_cache.stats()
+
+
+@app.get("/search")
+async def search(q: str, source: Optional[str] = None, limit: int = 50):
+    """Search past OCR extractions and transcriptions."""
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Empty search query")
+    
+    results = await run_in_threadpool(search_index.search, q, source, min(limit, 500))
+    return {"query": q, "results": results, "total": len(results)}
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "ocr-service"}
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="OCR service maintenance")
+    parser.add_argument("command", choices=["rebuild-index", "convert-results"])
+    parser.add_argument("--format", choices=list(RESULT_SUFFIXES), default=OCR_RESULT_FORMAT,
+                        help="Target format for convert-results")
+    args = parser.parse_args()
+    
+    if args.command == "rebuild-index":
+        print(f"Indexed {rebuild_search_index()} OCR results")
+    elif args.command == "convert-results":
+        print(f"Converted {convert_results(args.format)} results to {args.format}")
@@ -1,14 +1,48 @@
 from fastapi import FastAPI, HTTPException, Request, Query
+from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from contextlib import asynccontextmanager, contextmanager
+from collections import OrderedDict, deque
+import asyncio
+import gzip
+import shutil
+import sqlite3
+import threading
+import email.utils
+import importlib.util
+import random
+import time
+import uuid
+import anyio
 import httpx
 import os
 from datetime import datetime
 import json
 from pathlib import Path
 
-app = FastAPI(title="WhatsApp Integration Service", description="WhatsApp Business API integration")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Import existing log files into a new message store
+    await run_in_threadpool(message_store.backfill, MESSAGES_DIR)
+    # Remember recently logged events so webhook redeliveries are skipped
+    webhook_processor.seed(await run_in_threadpool(message_store.recent_event_keys, WEBHOOK_DEDUP_SIZE))
+    # Pick up broadcasts interrupted by the last shutdown
+    await broadcasts.resume_all()
+    yield
+    await broadcasts.shutdown()
+    # Close pooled Graph API connections on shutdown
+    if http_client is not None:
+        await http_client.aclose()
+    # Process queued webhooks, then write out buffered log entries
+    await run_in_threadpool(webhook_processor.close)
+    await run_in_threadpool(message_log.close)
+
+
+app = FastAPI(title="WhatsApp Integration Service", description="WhatsApp Business API integration", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -23,13 +57,57 @@ app.add_middleware(
 WHATSAPP_API_TOKEN = os.getenv("WHATSAPP_API_TOKEN", "")
 WHATSAPP_PHONE_NUMBER_ID = os.getenv("WHATSAPP_PHONE_NUMBER_ID", "")
 WEBHOOK_VERIFY_TOKEN = os.getenv("WEBHOOK_VERIFY_TOKEN", "verify_token_123")
-WHATSAPP_API_URL = f"https://graph.facebook.com/v18.0/{WHATSAPP_PHONE_NUMBER_ID}/messages"
+GRAPH_API_URL = os.getenv("GRAPH_API_URL", "https://graph.facebook.com/v18.0")
+WHATSAPP_API_URL = f"{GRAPH_API_URL}/{WHATSAPP_PHONE_NUMBER_ID}/messages"
+
+# Shared Graph API client: keep-alive pool, HTTP/2 when the h2 package is installed
+WHATSAPP_HTTP2 = os.getenv("WHATSAPP_HTTP2", "true").lower() == "true"
+WHATSAPP_MAX_CONNECTIONS = int(os.getenv("WHATSAPP_MAX_CONNECTIONS", "100"))
+WHATSAPP_MAX_KEEPALIVE = int(os.getenv("WHATSAPP_MAX_KEEPALIVE", "20"))
+WHATSAPP_CONNECT_TIMEOUT = float(os.getenv("WHATSAPP_CONNECT_TIMEOUT", "5"))
+WHATSAPP_READ_TIMEOUT = float(os.getenv("WHATSAPP_READ_TIMEOUT", "30"))
+WHATSAPP_POOL_TIMEOUT = float(os.getenv("WHATSAPP_POOL_TIMEOUT", "10"))
+
+# Retries with jittered exponential backoff (or Retry-After) on 429/5xx
+WHATSAPP_MAX_RETRIES = int(os.getenv("WHATSAPP_MAX_RETRIES", "3"))
+WHATSAPP_BACKOFF_BASE = float(os.getenv("WHATSAPP_BACKOFF_BASE", "0.5"))
+WHATSAPP_BACKOFF_MAX = float(os.getenv("WHATSAPP_BACKOFF_MAX", "30"))
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Failures where the request never reached the API, so resending can't duplicate it
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
 
 # Storage for messages
 MESSAGES_DIR = Path(os.getenv("UPLOAD_DIR", "/uploads")) / "whatsapp"
 MESSAGES_DIR.mkdir(parents=True, exist_ok=True)
 
-messages_log: List[Dict] = []
+# Message log: batched writes to daily files (messages-YYYY-MM-DD.jsonl),
+# gzipped once the day is over if enabled, and to the indexed message store
+MESSAGE_LOG_BATCH_SIZE = int(os.getenv("MESSAGE_LOG_BATCH_SIZE", "500"))
+MESSAGE_LOG_FLUSH_INTERVAL = float(os.getenv("MESSAGE_LOG_FLUSH_INTERVAL", "0.5"))
+MESSAGE_LOG_COMPRESS = os.getenv("MESSAGE_LOG_COMPRESS", "false").lower() == "true"
+MESSAGES_DB_PATH = Path(os.getenv("MESSAGES_DB_PATH", str(MESSAGES_DIR / "messages.db")))
+MAX_MESSAGES_PAGE = 500
+# Longest a query waits for queued log entries to be stored
+MESSAGES_QUERY_FLUSH_TIMEOUT = float(os.getenv("MESSAGES_QUERY_FLUSH_TIMEOUT", "2"))
+
+# Delivery statuses in order of progress; a message keeps its furthest status
+STATUS_RANK = {"accepted": 0, "sent": 1, "delivered": 2, "read": 3, "failed": 4}
+
+# Webhooks are acknowledged once queued and processed by worker threads; a
+# full queue answers 503 so Meta redelivers later
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "4"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "10000"))
+# Message and status ids remembered to skip redelivered events
+WEBHOOK_DEDUP_SIZE = int(os.getenv("WEBHOOK_DEDUP_SIZE", "100000"))
+
+# Broadcasts: the Business API throughput tier, and sends in flight per broadcast
+WHATSAPP_MESSAGES_PER_SECOND = float(os.getenv("WHATSAPP_MESSAGES_PER_SECOND", "80"))
+BROADCAST_CONCURRENCY = int(os.getenv("BROADCAST_CONCURRENCY", "32"))
+# Seconds between progress checkpoints to disk
+BROADCAST_CHECKPOINT_INTERVAL = float(os.getenv("BROADCAST_CHECKPOINT_INTERVAL", "1"))
+# Finished broadcasts are kept in memory this long; later reads come from disk
+BROADCAST_STATE_TTL = float(os.getenv("BROADCAST_STATE_TTL", "3600"))
+BROADCASTS_DIR = MESSAGES_DIR / "broadcasts"
 
 
 class TextMessage(BaseModel):
@@ -43,6 +121,16 @@ class TemplateMessage(BaseModel):
     language_code: str = Field(default="en", description="Language code")
 
 
+class BroadcastMessage(BaseModel):
+    text: Optional[str] = Field(None, description="Text to send")
+    template_name: Optional[str] = Field(None, description="Template to send instead of text")
+    language_code: str = Field(default="en", description="Template language code")
+
+
+class BroadcastRequest(BroadcastMessage):
+    recipients: List[str] = Field(..., description="Recipient phone numbers (with country code)")
+
+
 class MediaMessage(BaseModel):
     to: str = Field(..., description="Recipient phone number (with country code)")
     media_type: str = Field(..., description="Type: image, video, audio, document")
@@ -50,7 +138,92 @@ class MediaMessage(BaseModel):
     caption: Optional[str] = Field(None, description="Optional caption")
 
 
-async def send_whatsapp_message(payload: Dict) -> Dict:
+# Graph API client shared by all requests (created on first use)
+http_client: Optional[httpx.AsyncClient] = None
+http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def get_http_client() -> httpx.AsyncClient:
+    """Lazy create the pooled Graph API client for the running event loop."""
+    global http_client, http_client_loop
+    loop = asyncio.get_running_loop()
+    if http_client is None or http_client.is_closed or http_client_loop is not loop:
+        # Pooled connections belong to one loop, so a new loop gets a new
+        # client and the old one's connections are closed on their loop
+        if http_client is not None and not http_client.is_closed:
+            await close_stale_client(http_client, http_client_loop)
+        http_client = httpx.AsyncClient(
+            http2=WHATSAPP_HTTP2 and importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=WHATSAPP_MAX_CONNECTIONS,
+                max_keepalive_connections=WHATSAPP_MAX_KEEPALIVE,
+                keepalive_expiry=60
+            ),
+            timeout=httpx.Timeout(
+                WHATSAPP_READ_TIMEOUT, connect=WHATSAPP_CONNECT_TIMEOUT, pool=WHATSAPP_POOL_TIMEOUT
+            )
+        )
+        http_client_loop = loop
+    return http_client
+
+
+async def close_stale_client(client: httpx.AsyncClient, client_loop: Optional[asyncio.AbstractEventLoop]):
+    """Close a client created on another event loop."""
+    if client_loop is not None and client_loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), client_loop)
+        return
+    try:
+        await client.aclose()
+    except RuntimeError:
+        # Its loop is closed, and with it the connections' transports
+        pass
+
+
+def retry_delay(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """Seconds to wait before retry number attempt + 1.
+    
+    Honors Retry-After (seconds or HTTP date) and otherwise uses full-jitter
+    exponential backoff, capped at WHATSAPP_BACKOFF_MAX.
+    """
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(max(float(retry_after), 0.0), WHATSAPP_BACKOFF_MAX)
+        except ValueError:
+            try:
+                when = email.utils.parsedate_to_datetime(retry_after).timestamp()
+                return min(max(when - time.time(), 0.0), WHATSAPP_BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+    return random.uniform(0, min(WHATSAPP_BACKOFF_MAX, WHATSAPP_BACKOFF_BASE * 2 ** attempt))
+
+
+async def graph_request(
+    method: str,
+    url: str,
+    rate_limit: Optional["TokenBucket"] = None,
+    **kwargs
+) -> httpx.Response:
+    """Call the Graph API, retrying throttled, 5xx and connection failures.
+    
+    With rate_limit, every attempt (retries included) takes a token first.
+    """
+    client = await get_http_client()
+    for attempt in range(WHATSAPP_MAX_RETRIES + 1):
+        response = None
+        if rate_limit is not None:
+            await rate_limit.acquire()
+        try:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == WHATSAPP_MAX_RETRIES:
+                return response
+        except RETRY_ERRORS:
+            if attempt == WHATSAPP_MAX_RETRIES:
+                raise
+        await asyncio.sleep(retry_delay(attempt, response))
+
+
+async def send_whatsapp_message(payload: Dict, rate_limit: Optional["TokenBucket"] = None) -> Dict:
     """Send message via WhatsApp Business API."""
     if not WHATSAPP_API_TOKEN:
         raise HTTPException(
@@ -63,36 +236,757 @@ async def send_whatsapp_message(payload: Dict) -> Dict:
         "Content-Type": "application/json"
     }
     
-    async with httpx.AsyncClient() as client:
+    try:
+        response = await graph_request("POST", WHATSAPP_API_URL, rate_limit, headers=headers, json=payload)
+        response.raise_for_status()
+        return response.json()
+    except httpx.HTTPError as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"WhatsApp API error: {str(e)}"
+        )
+
+
+class TokenBucket:
+    """Async token bucket allowing rate acquisitions per second, bursting to capacity."""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def broadcast_payload(message: Dict, to: str) -> Dict:
+    """Graph API payload of a broadcast message for one recipient."""
+    if message.get("template_name"):
+        return {
+            "messaging_product": "whatsapp",
+            "to": to,
+            "type": "template",
+            "template": {
+                "name": message["template_name"],
+                "language": {
+                    "code": message.get("language_code", "en")
+                }
+            }
+        }
+    return {
+        "messaging_product": "whatsapp",
+        "to": to,
+        "type": "text",
+        "text": {
+            "body": message["text"]
+        }
+    }
+
+
+def write_json_atomic(path: Path, data: Dict):
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def append_lines(path: Path, records: List):
+    with open(path, "a") as f:
+        f.writelines(json.dumps(record) + "\n" for record in records)
+
+
+def read_lines(path: Path) -> List:
+    if not path.exists():
+        return []
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class BroadcastManager:
+    """Fan broadcasts out to recipients under the account's rate limit.
+    
+    Each broadcast lives in BROADCASTS_DIR/{id}: state.json, recipients.jsonl
+    and results.jsonl (one line per processed recipient). Progress is
+    checkpointed every BROADCAST_CHECKPOINT_INTERVAL seconds, so after a
+    restart unfinished broadcasts resume with the recipients that have no
+    result yet; at most the last interval's sends are repeated. Finished
+    broadcasts leave memory state_ttl seconds after they complete.
+    """
+    
+    def __init__(self, root: Path, rate: float, concurrency: int, state_ttl: float = BROADCAST_STATE_TTL):
+        self.root = root
+        self.rate = rate
+        self.concurrency = concurrency
+        self.state_ttl = state_ttl
+        self.states: Dict[str, Dict] = {}
+        # broadcast_id -> expiry of finished broadcasts, in order of expiry
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._bucket: Optional[TokenBucket] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # One bucket shared by all broadcasts, bound to the running loop
+            self._loop = loop
+            self._bucket = TokenBucket(self.rate)
+    
+    def _expire_finished(self):
+        now = time.monotonic()
+        while self._finished and next(iter(self._finished.values())) <= now:
+            broadcast_id, _ = self._finished.popitem(last=False)
+            self.states.pop(broadcast_id, None)
+    
+    def create(self, message: Dict, recipients: List[str]) -> Dict:
+        """Persist a new broadcast (runs in the threadpool); returns its state."""
+        broadcast_id = str(uuid.uuid4())
+        broadcast_dir = self.root / broadcast_id
+        broadcast_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Each number gets the message once
+        unique = list(dict.fromkeys(recipients))
+        append_lines(broadcast_dir / "recipients.jsonl", unique)
+        state = {
+            "broadcast_id": broadcast_id,
+            "status": "queued",
+            "message": message,
+            "total": len(unique),
+            "duplicates": len(recipients) - len(unique),
+            "sent": 0,
+            "failed": 0,
+            "created_at": datetime.utcnow().isoformat(),
+            "started_at": None,
+            "finished_at": None
+        }
+        write_json_atomic(broadcast_dir / "state.json", state)
+        self.states[broadcast_id] = state
+        return state
+    
+    def start(self, broadcast_id: str):
+        self._ensure_started()
+        self._expire_finished()
+        if broadcast_id not in self._tasks:
+            self._tasks[broadcast_id] = asyncio.create_task(self._run(broadcast_id))
+    
+    def get(self, broadcast_id: str) -> Optional[Dict]:
+        self._expire_finished()
+        if broadcast_id in self.states:
+            return self.states[broadcast_id]
+        state_path = self.root / broadcast_id / "state.json"
+        if not state_path.exists():
+            return None
+        with open(state_path, "r") as f:
+            return json.load(f)
+    
+    async def resume_all(self) -> int:
+        """Restart queued or running broadcasts found on disk."""
+        if not self.root.exists():
+            return 0
+        resumed = 0
+        for state_path in self.root.glob("*/state.json"):
+            state = await run_in_threadpool(read_state, state_path)
+            if state is not None and state["status"] in ("queued", "running"):
+                self.states[state["broadcast_id"]] = state
+                self.start(state["broadcast_id"])
+                resumed += 1
+        return resumed
+    
+    async def _run(self, broadcast_id: str):
+        state = self.states[broadcast_id]
+        broadcast_dir = self.root / broadcast_id
+        recipients = await run_in_threadpool(read_lines, broadcast_dir / "recipients.jsonl")
+        done = await run_in_threadpool(read_lines, broadcast_dir / "results.jsonl")
+        
+        # Counts come from the results file, which may be ahead of state.json
+        processed = {result["index"] for result in done}
+        state["sent"] = sum(1 for result in done if result["status"] == "sent")
+        state["failed"] = len(done) - state["sent"]
+        state["status"] = "running"
+        state["started_at"] = state["started_at"] or datetime.utcnow().isoformat()
+        
+        pending = iter([(index, to) for index, to in enumerate(recipients) if index not in processed])
+        results: List[Dict] = []
+        
+        async def checkpoint():
+            batch = results[:]
+            del results[:len(batch)]
+            await run_in_threadpool(append_lines, broadcast_dir / "results.jsonl", batch)
+            await run_in_threadpool(write_json_atomic, broadcast_dir / "state.json", dict(state))
+        
+        async def worker():
+            for index, to in pending:
+                result = {"index": index, "to": to}
+                try:
+                    # Retries of a send take their own tokens
+                    response = await send_whatsapp_message(broadcast_payload(state["message"], to), self._bucket)
+                    result.update(status="sent", wamid=(response.get("messages") or [{}])[0].get("id"))
+                    state["sent"] += 1
+                    log_message("sent_broadcast", {
+                        "broadcast_id": broadcast_id,
+                        "to": to,
+                        "response": response
+                    })
+                except Exception as e:
+                    result.update(status="failed", error=e.detail if isinstance(e, HTTPException) else str(e))
+                    state["failed"] += 1
+                result["at"] = datetime.utcnow().isoformat()
+                results.append(result)
+        
+        async def checkpointer():
+            while True:
+                await asyncio.sleep(BROADCAST_CHECKPOINT_INTERVAL)
+                await checkpoint()
+        
+        saver = asyncio.create_task(checkpointer())
         try:
-            response = await client.post(
-                WHATSAPP_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=30.0
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            state["status"] = "completed"
+            state["finished_at"] = datetime.utcnow().isoformat()
+            self._finished[broadcast_id] = time.monotonic() + self.state_ttl
+        finally:
+            saver.cancel()
+            # Record progress even when cancelled by shutdown
+            with anyio.CancelScope(shield=True):
+                await checkpoint()
+            self._tasks.pop(broadcast_id, None)
+    
+    async def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._tasks = {}
+        self._loop = None
+
+
+def read_state(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+broadcasts = BroadcastManager(BROADCASTS_DIR, WHATSAPP_MESSAGES_PER_SECOND, BROADCAST_CONCURRENCY)
+
+
+def message_row(entry: Dict) -> Optional[Tuple]:
+    """(timestamp, type, phone, wamid, status, data) of a log entry.
+    
+    Raw webhook bodies aren't stored; their messages and statuses are
+    logged, and stored, individually.
+    """
+    data = entry["data"]
+    message_type = entry["type"]
+    if message_type == "webhook_received":
+        return None
+    if message_type == "received_message":
+        phone, wamid, status = data.get("from"), data.get("id"), None
+    elif message_type == "message_status":
+        phone, wamid, status = data.get("recipient_id"), data.get("id"), data.get("status")
+    else:
+        # Sent messages: the id comes from the send response
+        sent = (data.get("response") or {}).get("messages") or [{}]
+        phone, wamid = data.get("to"), sent[0].get("id")
+        status = "accepted" if wamid else None
+    return (entry["timestamp"], message_type, phone, wamid, status, json.dumps(data))
+
+
+def event_key(kind: str, event_id: str, status: Optional[str] = None) -> str:
+    """Identity of a webhook event: a message by its id, a status by id and status."""
+    return f"{kind}:{event_id}:{status}" if kind == "statuses" else f"{kind}:{event_id}"
+
+
+class MessageStore:
+    """Logged messages in SQLite, indexed for lookups by phone, type, status,
+    wamid and time.
+    
+    Status events are joined to the sent message with the same wamid when
+    they are stored, so a sent message's status column always holds its
+    furthest delivery status.
+    """
+    
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, type TEXT NOT NULL, "
+                "phone TEXT, wamid TEXT, status TEXT, data TEXT NOT NULL)"
             )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPError as e:
-            raise HTTPException(
-                status_code=500,
-                detail=f"WhatsApp API error: {str(e)}"
+            for column in ("phone", "type", "status", "timestamp"):
+                conn.execute(f"CREATE INDEX IF NOT EXISTS messages_{column} ON messages ({column}, id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS messages_wamid ON messages (wamid, type)")
+    
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+    
+    @staticmethod
+    def _rank(status: Optional[str]) -> int:
+        return STATUS_RANK.get(status, -1)
+    
+    def add(self, entries: List[Dict]) -> int:
+        """Store log entries in one transaction; returns the number stored."""
+        rows = [row for row in map(message_row, entries) if row is not None]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO messages (timestamp, type, phone, wamid, status, data) VALUES (?, ?, ?, ?, ?, ?)",
+                rows
             )
+            for timestamp, message_type, phone, wamid, status, data in rows:
+                if not wamid or message_type == "received_message":
+                    continue
+                # Furthest status recorded for this wamid so far, including this row
+                statuses = [
+                    row[0] for row in conn.execute(
+                        "SELECT status FROM messages WHERE wamid = ? AND type = 'message_status'", (wamid,)
+                    )
+                ]
+                if not statuses:
+                    continue
+                best = max(statuses, key=self._rank)
+                for message_id, current in conn.execute(
+                    "SELECT id, status FROM messages "
+                    "WHERE wamid = ? AND type NOT IN ('message_status', 'received_message')",
+                    (wamid,)
+                ).fetchall():
+                    if self._rank(best) > self._rank(current):
+                        conn.execute("UPDATE messages SET status = ? WHERE id = ?", (best, message_id))
+        return len(rows)
+    
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    
+    def query(
+        self,
+        phone: Optional[str] = None,
+        message_type: Optional[str] = None,
+        status: Optional[str] = None,
+        wamid: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        before: Optional[int] = None,
+        limit: int = 50
+    ) -> List[Dict]:
+        """Newest first; before is the id of the last entry of the previous page."""
+        where, params = [], []
+        for column, value in (("phone", phone), ("type", message_type), ("status", status), ("wamid", wamid)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            where.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("timestamp < ?")
+            params.append(until)
+        if before is not None:
+            where.append("id < ?")
+            params.append(before)
+        
+        sql = "SELECT id, timestamp, type, phone, wamid, status, data FROM messages"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {
+                "id": message_id,
+                "timestamp": timestamp,
+                "type": message_type,
+                "phone": phone,
+                "wamid": wamid,
+                "status": status,
+                "data": json.loads(data)
+            }
+            for message_id, timestamp, message_type, phone, wamid, status, data in rows
+        ]
+    
+    def recent_event_keys(self, limit: int) -> List[str]:
+        """Dedup keys (see event_key) of the latest received messages and statuses, oldest first."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT type, wamid, status FROM messages "
+                "WHERE type IN ('received_message', 'message_status') AND wamid IS NOT NULL "
+                "ORDER BY id DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [
+            event_key("messages" if message_type == "received_message" else "statuses", wamid, status)
+            for message_type, wamid, status in reversed(rows)
+        ]
+    
+    def backfill(self, root: Path, batch_size: int = 5000) -> int:
+        """Import messages.jsonl and the daily segments into an empty store."""
+        if self.count():
+            return 0
+        segments = sorted(root.glob("messages-*.jsonl*"), key=lambda path: path.name.split(".")[0])
+        paths = [root / "messages.jsonl"] + segments
+        
+        imported = 0
+        batch: List[Dict] = []
+        for path in paths:
+            if not path.exists():
+                continue
+            opener = gzip.open if path.suffix == ".gz" else open
+            with opener(path, "rt") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    batch.append(json.loads(line))
+                    if len(batch) >= batch_size:
+                        imported += self.add(batch)
+                        batch = []
+        if batch:
+            imported += self.add(batch)
+        return imported
+
+
+message_store = MessageStore(MESSAGES_DB_PATH)
+
+
+class MessageLogWriter:
+    """Append log entries to daily files from a background thread.
+    
+    Entries are queued in memory and written once MESSAGE_LOG_BATCH_SIZE are
+    waiting or MESSAGE_LOG_FLUSH_INTERVAL has passed, with one open and
+    write per file per batch. When compress is set, segments of earlier days
+    are gzipped as soon as entries for a later day are written.
+    """
+    
+    def __init__(
+        self,
+        root: Path,
+        batch_size: int,
+        interval: float,
+        compress: bool = False,
+        store: Optional[MessageStore] = None
+    ):
+        self.root = root
+        self.store = store
+        self.batch_size = batch_size
+        self.interval = interval
+        self.compress = compress
+        self._pending: List[Dict] = []
+        # Entries already in the daily files but not yet in the store
+        self._unstored: List[Dict] = []
+        self._writing = False
+        self._flush_waiters = 0
+        self._closed = False
+        self._current_day: Optional[str] = None
+        self._cond = threading.Condition()
+        self.batches = 0
+        self.written = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+    
+    def append(self, entry: Dict):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                # Started on first use, and again after close()
+                self._closed = False
+                self._thread = threading.Thread(target=self._run, name="message-log-writer", daemon=True)
+                self._thread.start()
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify_all()
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued entry is written."""
+        with self._cond:
+            self._flush_waiters += 1
+            self._cond.notify_all()
+            try:
+                return self._cond.wait_for(
+                    lambda: not self._pending and not self._unstored and not self._writing, timeout
+                )
+            finally:
+                self._flush_waiters -= 1
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._unstored or self._closed)
+                if not self._pending and not self._unstored:
+                    return
+                # Let a burst accumulate unless someone is waiting on it
+                self._cond.wait_for(
+                    lambda: len(self._pending) >= self.batch_size or self._flush_waiters or self._closed,
+                    self.interval
+                )
+                batch, self._pending = self._pending, []
+                unstored, self._unstored = self._unstored, []
+                self._writing = True
+            
+            # Files and store are retried separately, so a store error can't
+            # append the same entries to the daily files twice
+            files_written = stored = failed = False
+            try:
+                if batch:
+                    self._write_files(batch)
+                    self.batches += 1
+                    self.written += len(batch)
+                files_written = True
+                if self.store is not None:
+                    self.store.add(unstored + batch)
+                stored = True
+                if batch:
+                    self._rotate(batch)
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                failed = True
+            
+            with self._cond:
+                # Keep entries in order ahead of newer ones and retry
+                if not files_written:
+                    self._pending[:0] = batch
+                    self._unstored[:0] = unstored
+                elif not stored:
+                    self._unstored[:0] = unstored + batch
+                self._writing = False
+                self._cond.notify_all()
+            if failed:
+                time.sleep(1)
+    
+    def _write_files(self, batch: List[Dict]):
+        by_day: Dict[str, List[Dict]] = {}
+        for entry in batch:
+            by_day.setdefault(entry["timestamp"][:10], []).append(entry)
+        
+        self.root.mkdir(parents=True, exist_ok=True)
+        for day, entries in by_day.items():
+            append_lines(self.root / f"messages-{day}.jsonl", entries)
+    
+    def _rotate(self, batch: List[Dict]):
+        latest = max(entry["timestamp"][:10] for entry in batch)
+        if self._current_day is None or latest > self._current_day:
+            self._current_day = latest
+            if self.compress:
+                self.compress_segments(before=latest)
+    
+    def compress_segments(self, before: str):
+        """Gzip daily segments of days before the given YYYY-MM-DD."""
+        for path in self.root.glob("messages-*.jsonl"):
+            if path.stem[len("messages-"):] < before:
+                # Append mode: late entries become another gzip member
+                with open(path, "rb") as src, gzip.open(path.with_suffix(".jsonl.gz"), "ab") as dst:
+                    shutil.copyfileobj(src, dst)
+                path.unlink()
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            pending = len(self._pending)
+            unstored = len(self._unstored)
+        return {
+            "pending": pending,
+            "unstored": unstored,
+            "batches": self.batches,
+            "written": self.written,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
+    
+    def close(self):
+        """Write queued entries and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout=30)
+
+
+message_log = MessageLogWriter(
+    MESSAGES_DIR, MESSAGE_LOG_BATCH_SIZE, MESSAGE_LOG_FLUSH_INTERVAL, MESSAGE_LOG_COMPRESS, message_store
+)
 
 
 def log_message(message_type: str, data: Dict):
-    """Log sent/received messages."""
+    """Log sent/received messages.
+    
+    Only touches memory; the entry is written to disk in the background.
+    """
     log_entry = {
         "timestamp": datetime.utcnow().isoformat(),
         "type": message_type,
         "data": data
     }
-    messages_log.append(log_entry)
+    message_log.append(log_entry)
+
+
+class WebhookProcessor:
+    """Parse and log webhook bodies on worker threads.
+    
+    submit() only queues the raw body, so the webhook can be acknowledged
+    right away. Meta delivers at least once, so messages and statuses seen
+    before (by message id, and by id and status) are counted as duplicates
+    and not logged again.
+    """
+    
+    def __init__(self, workers: int, max_queue: int, dedup_size: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.dedup_size = dedup_size
+        self._queue: "deque[Tuple[float, bytes]]" = deque()
+        self._active = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._seen_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self.received = 0
+        self.processed = 0
+        self.events = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self.max_lag = 0.0
+    
+    def submit(self, body: bytes) -> bool:
+        """Queue a raw webhook body; False when the queue is full."""
+        with self._cond:
+            if not any(thread.is_alive() for thread in self._threads):
+                # Started on first use, and again after close()
+                self._closed = False
+                self._threads = [
+                    threading.Thread(target=self._run, name=f"webhook-worker-{n}", daemon=True)
+                    for n in range(self.workers)
+                ]
+                for thread in self._threads:
+                    thread.start()
+            if len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                return False
+            self._queue.append((time.monotonic(), body))
+            self.received += 1
+            self._cond.notify()
+            return True
+    
+    def seed(self, keys: List[str]):
+        """Mark events as seen, e.g. those already in the message store."""
+        for key in keys:
+            self.first_seen(key)
+    
+    def first_seen(self, key: str) -> bool:
+        with self._seen_lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return False
+            self._seen[key] = None
+            if len(self._seen) > self.dedup_size:
+                self._seen.popitem(last=False)
+            return True
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    return
+                queued_at, body = self._queue.popleft()
+                self._active += 1
+                self.max_lag = max(self.max_lag, time.monotonic() - queued_at)
+            
+            events = duplicates = 0
+            error = None
+            try:
+                events, duplicates = self._process(body)
+            except Exception as e:
+                error = str(e)
+            
+            # Counters are shared by the workers, so update them under the lock
+            with self._cond:
+                self._active -= 1
+                self.processed += 1
+                self.events += events
+                self.duplicates += duplicates
+                if error is not None:
+                    self.failures += 1
+                    self.last_error = error
+                self._cond.notify_all()
+    
+    def _process(self, body: bytes) -> Tuple[int, int]:
+        """Log a webhook body and its new events; returns (events, duplicates)."""
+        payload = json.loads(body)
+        log_message("webhook_received", payload)
+        if payload.get("object") != "whatsapp_business_account":
+            return 0, 0
+        
+        events = duplicates = 0
+        for entry in payload.get("entry", []):
+            for change in entry.get("changes", []):
+                value = change.get("value", {})
+                for kind, message_type in (("messages", "received_message"), ("statuses", "message_status")):
+                    for event in value.get(kind, []):
+                        events += 1
+                        if event.get("id") and not self.first_seen(event_key(kind, event["id"], event.get("status"))):
+                            duplicates += 1
+                            continue
+                        log_message(message_type, event)
+        return events, duplicates
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued body is processed."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._active, timeout)
+    
+    def stats(self) -> Dict:
+        with self._cond:
+            depth = len(self._queue)
+            # How long the oldest queued body has been waiting
+            lag = time.monotonic() - self._queue[0][0] if self._queue else 0.0
+            active = self._active
+        return {
+            "queue_depth": depth,
+            "in_progress": active,
+            "lag_seconds": round(lag, 6),
+            "max_lag_seconds": round(self.max_lag, 6),
+            "workers": self.workers,
+            "received": self.received,
+            "processed": self.processed,
+            "events": self.events,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "failures": self.failures,
+            "last_error": self.last_error
+        }
     
-    # Save to file
-    log_file = MESSAGES_DIR / "messages.jsonl"
-    with open(log_file, "a") as f:
-        f.write(json.dumps(log_entry) + "\n")
+    def close(self):
+        """Process queued bodies and stop the workers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            threads = self._threads
+        for thread in threads:
+            thread.join(timeout=30)
+
+
+webhook_processor = WebhookProcessor(WEBHOOK_WORKERS, WEBHOOK_QUEUE_SIZE, WEBHOOK_DEDUP_SIZE)
 
 
 @app.get("/")
@@ -201,6 +1095,75 @@ async def send_media_message(message: MediaMessage):
     }
 
 
+def parse_broadcast_ndjson(body: bytes) -> BroadcastRequest:
+    """First line is the message, every following line a recipient ("number" or {"to": ...})."""
+    lines = [json.loads(line) for line in body.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("Empty body")
+    recipients = [line["to"] if isinstance(line, dict) else line for line in lines[1:]]
+    return BroadcastRequest(**lines[0], recipients=recipients)
+
+
+@app.post("/whatsapp/broadcast", status_code=202)
+async def create_broadcast(request: Request):
+    """Send a text or template message to many recipients.
+    
+    The body is a BroadcastRequest, or NDJSON with the message on the first
+    line and one recipient per following line. Sending happens in the
+    background; poll the status URL for progress.
+    """
+    body = await request.body()
+    try:
+        if "ndjson" in request.headers.get("content-type", ""):
+            broadcast = await run_in_threadpool(parse_broadcast_ndjson, body)
+        else:
+            broadcast = BroadcastRequest.model_validate_json(body)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid broadcast: {str(e)}")
+    
+    if bool(broadcast.text) == bool(broadcast.template_name):
+        raise HTTPException(status_code=400, detail="Provide exactly one of text or template_name")
+    recipients = [to.strip() for to in broadcast.recipients if isinstance(to, str) and to.strip()]
+    if not recipients:
+        raise HTTPException(status_code=400, detail="No recipients provided")
+    if not WHATSAPP_API_TOKEN:
+        raise HTTPException(
+            status_code=500,
+            detail="WhatsApp API token not configured. Set WHATSAPP_API_TOKEN environment variable."
+        )
+    
+    message = broadcast.model_dump(exclude={"recipients"})
+    state = await run_in_threadpool(broadcasts.create, message, recipients)
+    broadcasts.start(state["broadcast_id"])
+    
+    return {
+        **state,
+        "status_url": f"/whatsapp/broadcast/{state['broadcast_id']}",
+        "results_url": f"/whatsapp/broadcast/{state['broadcast_id']}/results"
+    }
+
+
+@app.get("/whatsapp/broadcast/{broadcast_id}")
+async def get_broadcast(broadcast_id: str):
+    """Get a broadcast's progress."""
+    state = await run_in_threadpool(broadcasts.get, broadcast_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    return state
+
+
+@app.get("/whatsapp/broadcast/{broadcast_id}/results")
+async def get_broadcast_results(broadcast_id: str):
+    """Per-recipient results as NDJSON, in completion order."""
+    if await run_in_threadpool(broadcasts.get, broadcast_id) is None:
+        raise HTTPException(status_code=404, detail="Broadcast not found")
+    
+    results_path = BROADCASTS_DIR / broadcast_id / "results.jsonl"
+    if not results_path.exists():
+        await run_in_threadpool(results_path.touch)
+    return FileResponse(results_path, media_type="application/x-ndjson")
+
+
 @app.get("/whatsapp/webhook")
 async def webhook_verify(
     hub_mode: str = Query(None, alias="hub.mode"),
@@ -216,41 +1179,63 @@ async def webhook_verify(
 
 @app.post("/whatsapp/webhook")
 async def webhook_receive(request: Request):
-    """Receive WhatsApp webhook events."""
-    try:
-        body = await request.json()
-        
-        # Log received webhook
-        log_message("webhook_received", body)
-        
-        # Process webhook data
-        if body.get("object") == "whatsapp_business_account":
-            for entry in body.get("entry", []):
-                for change in entry.get("changes", []):
-                    value = change.get("value", {})
-                    
-                    # Process messages
-                    if "messages" in value:
-                        for message in value["messages"]:
-                            log_message("received_message", message)
-                    
-                    # Process statuses
-                    if "statuses" in value:
-                        for status in value["statuses"]:
-                            log_message("message_status", status)
-        
-        return {"status": "ok"}
+    """Receive WhatsApp webhook events.
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Webhook processing error: {str(e)}")
+    The body is queued as is and processed in the background, so Meta gets
+    its 200 without waiting on parsing or the message log.
+    """
+    body = await request.body()
+    if not webhook_processor.submit(body):
+        raise HTTPException(status_code=503, detail="Webhook queue is full")
+    return {"status": "ok"}
+
+
+@app.get("/whatsapp/webhook/stats")
+async def webhook_stats():
+    """Webhook queue depth, processing lag and duplicate counts."""
+    return webhook_processor.stats()
 
 
 @app.get("/whatsapp/messages")
-async def get_messages(limit: int = 50):
-    """Get recent message logs."""
+async def get_messages(
+    phone: Optional[str] = None,
+    message_type: Optional[str] = Query(None, alias="type"),
+    status: Optional[str] = None,
+    wamid: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    before: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=MAX_MESSAGES_PAGE)
+):
+    """Query logged messages, newest first.
+    
+    Filters are exact matches; since/until bound the timestamp (ISO 8601,
+    half-open). Pass next_cursor back as before to get the next page.
+    Entries still queued in the message log are written first, so a
+    message shows up as soon as it is logged.
+    """
+    for bound in (since, until):
+        if bound is not None:
+            try:
+                datetime.fromisoformat(bound)
+            except ValueError:
+                raise HTTPException(status_code=400, detail=f"Invalid timestamp: {bound}")
+    
+    await run_in_threadpool(message_log.flush, MESSAGES_QUERY_FLUSH_TIMEOUT)
+    messages = await run_in_threadpool(
+        message_store.query,
+        phone=phone,
+        message_type=message_type,
+        status=status,
+        wamid=wamid,
+        since=since,
+        until=until,
+        before=before,
+        limit=limit
+    )
     return {
-        "messages": messages_log[-limit:],
-        "total": len(messages_log)
+        "messages": messages,
+        "next_cursor": messages[-1]["id"] if len(messages) == limit else None
     }
 
 
@@ -280,24 +1265,24 @@ async def test_configuration():
         "Content-Type": "application/json"
     }
     
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"https://graph.facebook.com/v18.0/{WHATSAPP_PHONE_NUMBER_ID}",
-                headers=headers,
-                timeout=10.0
-            )
-            response.raise_for_status()
-            return {
-                "status": "configured",
-                "message": "WhatsApp API configuration is valid",
-                "details": response.json()
-            }
-        except httpx.HTTPError as e:
-            return {
-                "status": "error",
-                "message": f"Configuration test failed: {str(e)}"
-            }
+    try:
+        response = await graph_request(
+            "GET",
+            f"{GRAPH_API_URL}/{WHATSAPP_PHONE_NUMBER_ID}",
+            headers=headers,
+            timeout=10.0
+        )
+        response.raise_for_status()
+        return {
+            "status": "configured",
+            "message": "WhatsApp API configuration is valid",
+            "details": response.json()
+        }
+    except httpx.HTTPError as e:
+        return {
+            "status": "error",
+            "message": f"Configuration test failed: {str(e)}"
+        }
 
 
 @app.get("/health")
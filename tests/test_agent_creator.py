@@ -60,3 +60,185 @@ def test_create_agent():
     }
     response = client.post("/agents/create", json=invalid_data)
     assert response.status_code == 422
+
+
+def test_write_behind_store_persists_across_restarts(monkeypatch, tmp_path):
+    main = sys.modules["agent-creator.main"]
+    backend = main.SQLiteAgentStore(tmp_path / "agents.db")
+    # Long interval: the write must be readable before it is committed
+    store = main.WriteBehindStore(backend, batch_size=100, interval=60)
+    monkeypatch.setattr(main, "agent_store", store)
+
+    agent_id = client.post("/agents/create", json={
+        "name": "Durable", "description": "d", "system_prompt": "p", "capabilities": ["search"]
+    }).json()["agent_id"]
+    assert backend.get(agent_id) is None
+    assert client.get(f"/agents/{agent_id}").json()["config"]["name"] == "Durable"
+
+    yaml_response = client.get(f"/agents/{agent_id}/yaml")
+    assert yaml_response.status_code == 200
+    assert "name: Durable" in yaml_response.text
+
+    assert store.flush(timeout=5)
+    store.close()
+    assert backend.get(agent_id)["config"]["capabilities"] == ["search"]
+
+    # A new process sees the committed agent
+    restarted = main.WriteBehindStore(main.SQLiteAgentStore(tmp_path / "agents.db"), 100, 0.01)
+    monkeypatch.setattr(main, "agent_store", restarted)
+    assert len(client.get("/agents/list").json()["agents"]) == 1
+    assert client.delete(f"/agents/{agent_id}").status_code == 200
+    assert client.get(f"/agents/{agent_id}").status_code == 404
+    restarted.close()
+    assert backend.count() == 0
+
+
+def test_legacy_json_agents_are_imported(monkeypatch, tmp_path):
+    main = sys.modules["agent-creator.main"]
+    monkeypatch.setattr(main, "AGENTS_DIR", tmp_path)
+    legacy = main.FileAgentStore(tmp_path)
+    legacy.apply([{"id": "old", "config": {"name": "Old", "description": "d", "created_at": "2024-01-01T00:00:00"}}], [])
+
+    backend = main.SQLiteAgentStore(tmp_path / "agents.db")
+    assert main.import_legacy_agents(backend) == 1
+    assert backend.get("old")["config"]["name"] == "Old"
+    # Only an empty database is seeded
+    assert main.import_legacy_agents(backend) == 0
+
+
+def test_list_agents_pages_filters_and_projects(monkeypatch, tmp_path):
+    main = sys.modules["agent-creator.main"]
+    db_path = tmp_path / "agents.db"
+    # A database written before listing columns existed
+    conn = main.sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE agents (id TEXT PRIMARY KEY, created_at TEXT NOT NULL, config TEXT NOT NULL)")
+    for n in range(5):
+        config = {
+            "name": f"agent {n}", "description": "d", "system_prompt": "secret " * 100,
+            "model": "gpt-4" if n % 2 == 0 else "claude", "temperature": 0.5,
+            "tools": [], "capabilities": ["search", "chat"] if n < 3 else ["chat"],
+            "created_at": f"2024-01-0{n + 1}T00:00:00"
+        }
+        conn.execute("INSERT INTO agents VALUES (?, ?, ?)", (f"id{n}", config["created_at"], main.json.dumps(config)))
+    conn.commit()
+    conn.close()
+
+    store = main.WriteBehindStore(main.SQLiteAgentStore(db_path), 100, 0.01)
+    monkeypatch.setattr(main, "agent_store", store)
+
+    first = client.get("/agents/list", params={"limit": 2}).json()
+    assert [agent["agent_id"] for agent in first["agents"]] == ["id0", "id1"]
+    assert set(first["agents"][0]) == {"agent_id", "name", "description", "created_at"}
+    second = client.get("/agents/list", params={"limit": 2, "cursor": first["next_cursor"]}).json()
+    assert [agent["agent_id"] for agent in second["agents"]] == ["id2", "id3"]
+
+    filtered = client.get("/agents/list", params={
+        "model": "gpt-4", "capabilities": "search,chat", "created_after": "2024-01-02",
+        "fields": "agent_id,capabilities,model"
+    }).json()
+    assert filtered == {
+        "agents": [{"agent_id": "id2", "capabilities": ["search", "chat"], "model": "gpt-4"}],
+        "next_cursor": None
+    }
+
+    assert client.get("/agents/list", params={"fields": "system_prompt"}).status_code == 400
+    assert client.get("/agents/list", params={"cursor": "not-a-cursor"}).status_code == 400
+    store.close()
+
+
+def test_bulk_endpoints_report_per_item_results(monkeypatch, tmp_path):
+    main = sys.modules["agent-creator.main"]
+    store = main.WriteBehindStore(main.SQLiteAgentStore(tmp_path / "agents.db"), 100, 60)
+    monkeypatch.setattr(main, "agent_store", store)
+    agent = {"name": "Bulk", "description": "d", "system_prompt": "p"}
+
+    created = client.post("/agents/bulk/create", json=[agent, {"name": "missing fields"}, agent]).json()
+    assert (created["succeeded"], created["failed"]) == (2, 1)
+    assert [result["status"] for result in created["results"]] == ["created", "invalid", "created"]
+    ids = [result["agent_id"] for result in created["results"] if result["status"] == "created"]
+    # Committed before the response, not left to the background writer
+    assert store.backend.count() == 2
+
+    ndjson = "\n".join([
+        main.json.dumps({**agent, "agent_id": ids[0], "name": "Renamed"}),
+        main.json.dumps({**agent, "agent_id": "unknown"}),
+        "{not json"
+    ])
+    updated = client.post(
+        "/agents/bulk/update", content=ndjson, headers={"Content-Type": "application/x-ndjson"}
+    ).json()
+    assert [result["status"] for result in updated["results"]] == ["updated", "not_found", "invalid"]
+    assert store.backend.get(ids[0])["config"]["name"] == "Renamed"
+
+    deleted = client.post("/agents/bulk/delete", json=[ids[0], {"agent_id": ids[1]}, "unknown", 5]).json()
+    assert [result["status"] for result in deleted["results"]] == ["deleted", "deleted", "not_found", "invalid"]
+    assert store.backend.count() == 0
+
+    assert client.post("/agents/bulk/create", json={"not": "a list"}).status_code == 400
+    store.close()
+
+
+def test_list_fails_fast_while_store_rejects_writes(monkeypatch, tmp_path):
+    main = sys.modules["agent-creator.main"]
+    backend = main.SQLiteAgentStore(tmp_path / "agents.db")
+    apply = backend.apply
+    broken = [True]
+
+    def failing_apply(upserts, deletes):
+        if broken[0]:
+            raise main.sqlite3.OperationalError("disk I/O error")
+        apply(upserts, deletes)
+
+    backend.apply = failing_apply
+    store = main.WriteBehindStore(backend, 100, 0.01, flush_timeout=0.2)
+    monkeypatch.setattr(main, "agent_store", store)
+    client.post("/agents/create", json={"name": "A", "description": "d", "system_prompt": "p"})
+
+    response = client.get("/agents/list")
+    assert response.status_code == 503
+    assert "disk I/O error" in response.json()["detail"]
+
+    broken[0] = False
+    assert store.flush(timeout=5)
+    assert client.get("/agents/list").status_code == 200
+    store.close()
+
+
+def test_updates_keep_created_at(monkeypatch, tmp_path):
+    main = sys.modules["agent-creator.main"]
+    store = main.WriteBehindStore(main.SQLiteAgentStore(tmp_path / "agents.db"), 100, 0.01)
+    monkeypatch.setattr(main, "agent_store", store)
+    agent = {"name": "A", "description": "d", "system_prompt": "p"}
+
+    ids = [client.post("/agents/create", json=agent).json()["agent_id"] for _ in range(2)]
+    created = [client.get(f"/agents/{agent_id}").json()["config"]["created_at"] for agent_id in ids]
+
+    client.put(f"/agents/{ids[0]}", json={**agent, "name": "Renamed"})
+    client.post("/agents/bulk/update", json=[{**agent, "agent_id": ids[1], "name": "Bulk renamed"}])
+
+    # Paging order is unchanged by the updates
+    listed = client.get("/agents/list", params={"fields": "agent_id,name,created_at"}).json()["agents"]
+    assert [(a["agent_id"], a["name"], a["created_at"]) for a in listed] == [
+        (ids[0], "Renamed", created[0]), (ids[1], "Bulk renamed", created[1])
+    ]
+    store.close()
+
+
+def test_bulk_update_rejects_repeated_agent_id(monkeypatch, tmp_path):
+    main = sys.modules["agent-creator.main"]
+    store = main.WriteBehindStore(main.SQLiteAgentStore(tmp_path / "agents.db"), 100, 0.01)
+    monkeypatch.setattr(main, "agent_store", store)
+    agent = {"name": "A", "description": "d", "system_prompt": "p"}
+    agent_id = client.post("/agents/create", json=agent).json()["agent_id"]
+
+    updated = client.post("/agents/bulk/update", json=[
+        {**agent, "agent_id": agent_id, "capabilities": ["search"]},
+        {**agent, "agent_id": agent_id, "capabilities": ["chat"]}
+    ]).json()
+    assert [result["status"] for result in updated["results"]] == ["updated", "invalid"]
+
+    # The capability index matches the one config that was stored
+    assert client.get(f"/agents/{agent_id}").json()["config"]["capabilities"] == ["search"]
+    listed = client.get("/agents/list", params={"capabilities": "chat"}).json()["agents"]
+    assert listed == []
+    store.close()
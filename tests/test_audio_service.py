@@ -2,6 +2,7 @@ from fastapi.testclient import TestClient
 from pathlib import Path
 import importlib.util
 import sys
+from unittest.mock import MagicMock
 
 def load_service_app(service_name):
     file_path = Path(__file__).parent.parent / "services" / service_name / "main.py"
@@ -22,3 +23,264 @@ def test_health():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy", "service": "audio-service"}
+
+
+def test_transcribe_rejects_oversized_upload(monkeypatch, tmp_path):
+    main = sys.modules["audio-service.main"]
+    upload_dir = tmp_path / "audio"
+    upload_dir.mkdir()
+    monkeypatch.setattr(main, "UPLOAD_DIR", upload_dir)
+    monkeypatch.setattr(main, "UPLOAD_CHUNK_SIZE", 4)
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 10)
+
+    files = {"file": ("call.wav", b"RIFF" + b"\x00" * 32, "audio/wav")}
+    response = client.post("/audio/transcribe", files=files)
+
+    assert response.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_oversized_upload_is_rejected_while_streaming(monkeypatch, tmp_path):
+    main = sys.modules["audio-service.main"]
+    upload_dir = tmp_path / "audio"
+    upload_dir.mkdir()
+    monkeypatch.setattr(main, "UPLOAD_DIR", upload_dir)
+    monkeypatch.setattr(main, "MAX_UPLOAD_BYTES", 1000)
+    # The limit trips while the form is parsed, before the handler runs
+    monkeypatch.setattr(main, "spool_upload", MagicMock(side_effect=AssertionError("handler reached")))
+    body = (
+        b"--boundary\r\n"
+        b'Content-Disposition: form-data; name="file"; filename="call.wav"\r\n'
+        b"Content-Type: audio/wav\r\n\r\n" + b"\x00" * 5000 + b"\r\n--boundary--\r\n"
+    )
+    def chunks():
+        # No Content-Length: the body is counted as it arrives
+        for start in range(0, len(body), 500):
+            yield body[start:start + 500]
+
+    response = client.post(
+        "/audio/transcribe", content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=boundary"}
+    )
+
+    assert response.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_transcribe_queues_job_and_reports_result(monkeypatch, tmp_path):
+    import time
+
+    main = sys.modules["audio-service.main"]
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "search_index", main.SearchIndex(tmp_path / "index.db"))
+    monkeypatch.setattr(main, "transcribe_audio", lambda path, model_name=None, progress=None: {
+        "text": "hello world",
+        "language": "en",
+        "segments": []
+    })
+
+    with TestClient(main.app) as job_client:
+        files = {"file": ("call.wav", b"RIFF audio", "audio/wav")}
+        response = job_client.post("/audio/transcribe", files=files)
+        assert response.status_code == 202
+        file_id = response.json()["file_id"]
+
+        for _ in range(100):
+            result = job_client.get(f"/audio/result/{file_id}")
+            if result.status_code == 200:
+                break
+            assert result.json()["status"] in ("pending", "running")
+            time.sleep(0.01)
+
+    assert result.status_code == 200
+    assert result.json()["transcription"]["text"] == "hello world"
+
+
+def test_rejected_uploads_are_removed_and_failed_jobs_expire(monkeypatch, tmp_path):
+    import time
+
+    main = sys.modules["audio-service.main"]
+    upload_dir = tmp_path / "audio"
+    upload_dir.mkdir()
+    monkeypatch.setattr(main, "UPLOAD_DIR", upload_dir)
+    files = {"file": ("call.wav", b"RIFF audio", "audio/wav")}
+
+    full = MagicMock()
+    full.submit.side_effect = main.HTTPException(status_code=503, detail="Transcription queue is full, retry later")
+    monkeypatch.setattr(main, "jobs", full)
+    assert client.post("/audio/transcribe", files=files).status_code == 503
+    assert list(upload_dir.iterdir()) == []
+
+    def fail(path, model_name=None, progress=None):
+        raise RuntimeError("corrupt audio")
+
+    monkeypatch.setattr(main, "transcribe_audio", fail)
+    monkeypatch.setattr(main, "jobs", main.TranscriptionJobs(1, 4, failed_ttl=0.2))
+    with TestClient(main.app) as job_client:
+        file_id = job_client.post("/audio/transcribe", files=files).json()["file_id"]
+        for _ in range(100):
+            result = job_client.get(f"/audio/result/{file_id}")
+            if result.status_code != 202:
+                break
+            time.sleep(0.01)
+        assert result.status_code == 500
+        assert "corrupt audio" in result.json()["detail"]
+
+        time.sleep(0.3)
+        assert job_client.get(f"/audio/result/{file_id}").status_code == 404
+        assert file_id not in main.jobs.jobs
+
+
+def test_plan_chunks_cuts_in_silence():
+    main = sys.modules["audio-service.main"]
+    speech = [(0, 50_000), (51_000, 130_000), (132_000, 200_000)]
+
+    chunks = main.plan_chunks(speech, 200_000, target_ms=60_000)
+
+    assert chunks == [(0, 50_500), (50_500, 131_000), (131_000, 200_000)]
+
+
+def test_chunking_fits_memory_budget_and_skips_short_audio(monkeypatch):
+    main = sys.modules["audio-service.main"]
+    registry = main.ModelRegistry(["base", "large"], budget_bytes=1000 * 1024 ** 2)
+    monkeypatch.setattr(main, "models", registry)
+    monkeypatch.setattr(main, "AUDIO_CHUNK_PROCESSES", 8)
+
+    # Each worker loads its own copy, so only as many as the budget holds
+    assert main.chunk_workers("base") == 3
+    assert main.chunk_workers("large") == 0
+
+    # Short clips are transcribed directly, without decoding the audio first
+    decode = MagicMock()
+    monkeypatch.setattr(main.AudioSegment, "from_file", decode)
+    monkeypatch.setattr(main, "probe_duration", lambda path: 30.0)
+    model = MagicMock()
+    model.transcribe.return_value = {"text": " hi", "language": "en", "segments": []}
+    monkeypatch.setattr(main, "get_model", lambda name=None: model)
+    assert main.transcribe_audio("clip.wav")["text"] == " hi"
+    decode.assert_not_called()
+
+
+def test_chunk_pool_in_use_is_not_replaced_by_another_model(monkeypatch):
+    main = sys.modules["audio-service.main"]
+    registry = main.ModelRegistry(["tiny", "base"], budget_bytes=1000 * 1024 ** 2)
+    monkeypatch.setattr(main, "models", registry)
+    monkeypatch.setattr(main, "AUDIO_CHUNK_PROCESSES", 8)
+    monkeypatch.setattr(main, "ProcessPoolExecutor", lambda **kwargs: MagicMock())
+    pools = main.ChunkPools()
+
+    with pools.acquire("base") as base_pool:
+        assert base_pool is not None
+        # The busy base pool keeps its memory; tiny falls back to one process
+        with pools.acquire("tiny") as tiny_pool:
+            assert tiny_pool is None
+        base_pool.shutdown.assert_not_called()
+        with pools.acquire("base") as same_pool:
+            assert same_pool is base_pool
+
+    # Once idle, the base pool makes room for tiny
+    with pools.acquire("tiny") as tiny_pool:
+        assert tiny_pool is not None
+    base_pool.shutdown.assert_called_once()
+    assert list(pools.pools) == ["tiny"]
+
+
+def test_stitch_transcriptions_offsets_and_renumbers():
+    main = sys.modules["audio-service.main"]
+    word = {"word": " hi", "start": 0.5, "end": 0.9, "probability": 0.9}
+    chunk = {
+        "text": " hi",
+        "language": "en",
+        "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": " hi", "words": [word]}]
+    }
+
+    result = main.stitch_transcriptions([(0.0, chunk), (60.0, chunk)])
+
+    assert [segment["id"] for segment in result["segments"]] == [0, 1]
+    assert result["segments"][1]["start"] == 60.0
+    assert result["segments"][1]["words"][0]["end"] == 60.9
+    assert result["text"] == " hi hi"
+    assert result["language"] == "en"
+
+
+def test_model_registry_evicts_least_recently_used(monkeypatch):
+    from unittest.mock import MagicMock
+
+    main = sys.modules["audio-service.main"]
+    monkeypatch.setattr(main, "model_size_bytes", lambda loaded_model: 60)
+    monkeypatch.setattr(main.whisper, "load_model", MagicMock(side_effect=lambda name: MagicMock(name=name)))
+    registry = main.ModelRegistry(["tiny", "base", "small"], budget_bytes=150)
+
+    tiny = registry.get("tiny")
+    registry.get("base")
+    assert registry.get("tiny") is tiny
+    registry.get("small")
+
+    assert list(registry.models) == ["tiny", "small"]
+    assert registry.metrics["base"]["evictions"] == 1
+    assert registry.metrics["tiny"]["hits"] == 1
+    assert registry.metrics["small"]["loads"] == 1
+
+
+def test_transcribe_rejects_unknown_model():
+    files = {"file": ("call.wav", b"RIFF audio", "audio/wav")}
+    response = client.post("/audio/transcribe?model=enormous", files=files)
+    assert response.status_code == 400
+
+
+def test_keyword_matcher_finds_overlapping_keywords():
+    main = sys.modules["audio-service.main"]
+    matcher = main.KeywordMatcher(["he", "she", "hers", "His"])
+
+    matches = matcher.find("ushers and HIS hat")
+
+    assert sorted((matcher.keywords[i], start, end) for i, start, end in matches) == [
+        ("His", 11, 14), ("he", 2, 4), ("hers", 2, 6), ("she", 1, 4)
+    ]
+    whole = main.KeywordMatcher(["he", "his"], whole_word=True)
+    assert [(start, end) for _, start, end in whole.find("ushers and HIS hat")] == [(11, 14)]
+
+
+def test_generate_highlights_reports_word_timestamps():
+    main = sys.modules["audio-service.main"]
+    transcription = {"segments": [{
+        "id": 3,
+        "start": 10.0,
+        "end": 14.0,
+        "text": " The project deadline is Friday",
+        "words": [
+            {"word": " The", "start": 10.0, "end": 10.2},
+            {"word": " project", "start": 10.2, "end": 10.8},
+            {"word": " deadline", "start": 10.8, "end": 11.5},
+            {"word": " is", "start": 11.5, "end": 11.7},
+            {"word": " Friday", "start": 11.7, "end": 12.3}
+        ]
+    }]}
+
+    highlights = main.generate_highlights(transcription, ["friday", "project deadline", "missing"])
+
+    assert [h["keyword"] for h in highlights] == ["friday", "project deadline"]
+    match = highlights[1]["matches"][0]
+    assert (match["start"], match["end"]) == (10.2, 11.5)
+    assert [word["word"] for word in match["words"]] == [" project", " deadline"]
+    assert highlights[0]["segment_id"] == 3
+
+
+def test_rebuild_search_index_backfills_stored_results(monkeypatch, tmp_path):
+    import json
+
+    main = sys.modules["audio-service.main"]
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "search_index", main.SearchIndex(tmp_path / "index.db"))
+    segment = {"id": 0, "start": 4.0, "end": 6.0, "text": " quarterly budget review", "words": []}
+    transcription = {"text": segment["text"], "language": "en", "segments": [segment]}
+    (tmp_path / "old_transcription.json").write_text(json.dumps(transcription))
+    (tmp_path / "new_highlights.json").write_text(json.dumps({"transcription": transcription}))
+
+    assert main.rebuild_search_index() == 2
+    assert main.rebuild_search_index() == 2
+
+    response = client.get("/search", params={"q": "budget"})
+    assert response.status_code == 200
+    assert sorted(hit["file_id"] for hit in response.json()["results"]) == ["new", "old"]
+    assert response.json()["results"][0]["start"] == 4.0
@@ -2,6 +2,7 @@ from fastapi.testclient import TestClient
 from pathlib import Path
 import importlib.util
 import sys
+import pytest
 
 def load_service_app(service_name):
     file_path = Path(__file__).parent.parent / "services" / service_name / "main.py"
@@ -54,3 +55,87 @@ def test_create_mcp_project():
     assert data["project_name"] == "Test Project"
     assert "project_id" in data
     assert "download_url" in data
+
+
+def test_parallel_generation_matches_serial(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    main = sys.modules["mcp-creator.main"]
+    project = main.MCPProject(
+        project_name="Shop",
+        description="Shop API",
+        resources=[
+            main.MCPResource(name=f"item{n}", description="r", fields=[main.Field_Model(name="title", type="string")])
+            for n in range(5)
+        ]
+    )
+    serial = main.generate_fastapi_code(project)
+    compile(serial, "main.py", "exec")
+
+    monkeypatch.setattr(main, "MCP_PARALLEL_MIN_RESOURCES", 2)
+    monkeypatch.setattr(main, "MCP_RENDER_PROCESSES", 2)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        assert main.generate_fastapi_code(project, pool) == serial
+    assert serial.count("def create_item") == 5
+
+
+def test_memory_storage_output_matches_golden():
+    main = sys.modules["mcp-creator.main"]
+    project = main.MCPProject(project_name="Shop", description="Shop API", base_path="/api", resources=[
+        main.MCPResource(name="product", description="Products", fields=[
+            main.Field_Model(name="title", type="string", description="Product title"),
+            main.Field_Model(name="price", type="float"),
+            main.Field_Model(name="in_stock", type="boolean")
+        ]),
+        main.MCPResource(name="order", description="Orders", enable_delete=False, fields=[
+            main.Field_Model(name="quantity", type="integer")
+        ])
+    ])
+
+    golden = Path(__file__).parent / "golden" / "mcp_memory_main.txt"
+    assert main.generate_fastapi_code(project) == golden.read_text()
+
+
+@pytest.mark.parametrize("database", ["file", "memory"])
+def test_sqlite_storage_generates_persistent_paginated_service(monkeypatch, tmp_path, database):
+    main = sys.modules["mcp-creator.main"]
+    project = main.MCPProject(
+        project_name="Shop",
+        description="Shop API",
+        storage="sqlite",
+        resources=[main.MCPResource(name="product", description="A product", fields=[
+            main.Field_Model(name="title", type="string"),
+            main.Field_Model(name="category", type="string", indexed=True),
+            main.Field_Model(name="price", type="float", required=False)
+        ])]
+    )
+    code = main.generate_fastapi_code(project)
+    assert 'Index("ix_product_category", "category", "created_at", "id")' in code
+    assert "sqlalchemy" in main.generate_docker_files(project)["requirements.txt"]
+
+    # Run the generated service against a file database
+    url = f"sqlite:///{tmp_path / 'shop.db'}" if database == "file" else "sqlite:///:memory:"
+    monkeypatch.setenv("DATABASE_URL", url)
+    generated = tmp_path / "generated_main.py"
+    generated.write_text(code)
+    spec = importlib.util.spec_from_file_location("generated_shop", generated)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    service = TestClient(module.app)
+
+    for n in range(3):
+        assert service.post("/api/v1/product", json={"title": f"p{n}", "category": "books" if n < 2 else "toys"}).status_code == 200
+    first = service.get("/api/v1/product", params={"limit": 2}).json()
+    assert [item["title"] for item in first["items"]] == ["p0", "p1"]
+    rest = service.get("/api/v1/product", params={"limit": 2, "after": first["next_cursor"]}).json()
+    assert [item["title"] for item in rest["items"]] == ["p2"] and rest["next_cursor"] is None
+
+    toys = service.get("/api/v1/product", params={"category": "toys"}).json()["items"]
+    product_id = toys[0]["id"]
+    assert service.put(f"/api/v1/product/{product_id}", json={"price": 9.5}).json()["price"] == 9.5
+    assert service.put(f"/api/v1/product/{product_id}", json={"price": None}).json()["price"] is None
+    nulled = service.put(f"/api/v1/product/{product_id}", json={"title": None})
+    assert nulled.status_code == 422 and "title" in nulled.json()["detail"]
+    assert service.delete(f"/api/v1/product/{product_id}").status_code == 200
+    assert service.get(f"/api/v1/product/{product_id}").status_code == 404
+    module.engine.dispose()
@@ -1,3 +1,4 @@
+import pytest
 from fastapi.testclient import TestClient
 from pathlib import Path
 import importlib.util
@@ -26,3 +27,433 @@ def test_health():
     assert response.json() == {"status": "healthy", "service": "ocr-service"}
 
 # We can add more tests here that rely on the mocks
+
+
+class FakePage:
+    def __init__(self, page_num):
+        self.rect = MagicMock(width=612.0, height=792.0)
+        self._text = f"page {page_num + 1}"
+
+    def get_text(self, option):
+        span = {"text": self._text, "bbox": [0, 0, 10, 10], "size": 12.0, "font": "Helvetica"}
+        return {"blocks": [{"type": 0, "lines": [{"spans": [span]}]}]}
+
+
+class FakeDoc:
+    def __init__(self, page_count):
+        self._pages = [FakePage(n) for n in range(page_count)]
+
+    def __len__(self):
+        return len(self._pages)
+
+    def __getitem__(self, index):
+        return self._pages[index]
+
+    def close(self):
+        pass
+
+
+def test_page_shards():
+    main = sys.modules["ocr-service.main"]
+    assert main.page_shards(5, 2) == [(0, 2), (2, 4), (4, 5)]
+    assert main.page_shards(0, 16) == []
+
+
+def test_extract_text_sharded_keeps_page_order(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main.fitz, "open", lambda path: FakeDoc(7))
+    monkeypatch.setattr(main, "OCR_PAGES_PER_SHARD", 2)
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        result = main.extract_text_with_coordinates("doc.pdf", pool)
+
+    assert result["total_pages"] == 7
+    assert [page["page_number"] for page in result["pages"]] == list(range(1, 8))
+    assert result["pages"][6]["blocks"][0]["text"] == "page 7"
+
+
+def test_artifact_cache_evicts_least_recently_used(tmp_path):
+    main = sys.modules["ocr-service.main"]
+    cache = main.ArtifactCache(tmp_path, max_bytes=20)
+    for name in ["a", "b", "c"]:
+        (tmp_path / f"{name}.pdf").write_bytes(b"x" * 8)
+
+    cache.put("a", "a", ["a.pdf"])
+    cache.put("b", "b", ["b.pdf"])
+    assert cache.get("a")["file_id"] == "a"
+    cache.put("c", "c", ["c.pdf"])
+
+    # "b" was least recently used and is deleted from disk
+    assert cache.get("b") is None
+    assert not (tmp_path / "b.pdf").exists()
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["hits"] == 1
+
+    # The index survives a restart
+    reloaded = main.ArtifactCache(tmp_path, max_bytes=20)
+    assert list(reloaded.entries) == ["a", "c"]
+
+
+def test_evicted_results_drop_out_of_search(monkeypatch, tmp_path):
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main, "search_index", main.SearchIndex(tmp_path / "index.db"))
+    cache = main.ArtifactCache(tmp_path, max_bytes=10, on_evict=main.forget_evicted)
+    for name in ["old", "new"]:
+        (tmp_path / f"{name}_result.json").write_bytes(b"x" * 8)
+        page = {"page_number": 1, "blocks": [{"text": f"{name} invoice", "bbox": [0, 0, 1, 1]}]}
+        main.search_index.add(name, "ocr", main.ocr_index_rows({"pages": [page]}))
+        cache.put(f"extract:{name}", name, [f"{name}_result.json"])
+
+    hits = client.get("/search", params={"q": "invoice"}).json()["results"]
+    assert [hit["file_id"] for hit in hits] == ["new"]
+
+
+def test_artifact_cache_keeps_first_of_concurrent_puts(monkeypatch, tmp_path):
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main, "search_index", main.SearchIndex(tmp_path / "index.db"))
+    cache = main.ArtifactCache(tmp_path, max_bytes=10 ** 6, on_evict=main.forget_evicted)
+    for name in ["first", "second"]:
+        (tmp_path / f"{name}.pdf").write_bytes(b"x" * 8)
+        page = {"page_number": 1, "blocks": [{"text": "invoice", "bbox": [0, 0, 1, 1]}]}
+        main.search_index.add(name, "ocr", main.ocr_index_rows({"pages": [page]}))
+
+    assert cache.put("extract:same", "first", ["first.pdf"])["file_id"] == "first"
+    assert cache.put("extract:same", "second", ["second.pdf"])["file_id"] == "first"
+
+    # The file_id handed out first stays valid; the duplicate is dropped
+    assert (tmp_path / "first.pdf").exists()
+    assert not (tmp_path / "second.pdf").exists()
+    assert cache.stats()["size_bytes"] == 8
+    hits = client.get("/search", params={"q": "invoice"}).json()["results"]
+    assert [hit["file_id"] for hit in hits] == ["first"]
+
+
+def test_extract_serves_repeated_upload_from_cache(monkeypatch, tmp_path):
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "result_cache", main.ArtifactCache(tmp_path, max_bytes=10 ** 6))
+    monkeypatch.setattr(main, "search_index", main.SearchIndex(tmp_path / "index.db"))
+    open_mock = MagicMock(side_effect=lambda path: FakeDoc(2))
+    monkeypatch.setattr(main.fitz, "open", open_mock)
+
+    files = {"file": ("invoice.pdf", b"%PDF-1.4 invoice", "application/pdf")}
+    first = client.post("/ocr/extract", files=files)
+    calls = open_mock.call_count
+    second = client.post("/ocr/extract", files=files)
+
+    assert first.status_code == 200 and second.status_code == 200
+    assert first.json()["cached"] is False
+    assert second.json()["cached"] is True
+    assert second.json()["file_id"] == first.json()["file_id"]
+    assert second.json()["extraction"] == first.json()["extraction"]
+    assert open_mock.call_count == calls
+    assert client.get("/ocr/cache/stats").json()["hits"] == 1
+
+
+def test_locate_terms_matches_all_terms_in_one_pass():
+    main = sys.modules["ocr-service.main"]
+    words = [
+        (0, 0, 10, 10, "Net"), (11, 0, 20, 10, "Revenue,"), (21, 0, 30, 10, "grew"),
+        (0, 20, 10, 30, "revenue"), (11, 20, 20, 30, "(net)")
+    ]
+    term_index = main.compile_terms(["net revenue", "Revenue", "missing term"])
+
+    hits = main.locate_terms(words, term_index)
+
+    assert hits[0] == [(0, 0, 10, 10), (11, 0, 20, 10)]
+    assert hits[1] == [(11, 0, 20, 10), (0, 20, 10, 30)]
+    assert 2 not in hits
+
+
+def test_locate_substrings_matches_inside_words():
+    main = sys.modules["ocr-service.main"]
+    words = [(0, 0, 80, 10, "Invoices"), (90, 0, 180, 10, "Microsoft"), (190, 0, 230, 10, "Corp.")]
+    phrases = main.compile_substrings(["invoice", "micro", "soft  corp", "missing"])
+
+    hits = main.locate_substrings(words, phrases)
+
+    # Partly matched words are cut to the matched characters
+    assert hits[0] == [(0.0, 0, 70.0, 10)]
+    assert hits[1] == [(90.0, 0, 140.0, 10)]
+    assert hits[2] == [(140.0, 0, 180.0, 10), (190.0, 0, 222.0, 10)]
+    assert 3 not in hits
+
+    # Whole-word matching is opt-in
+    assert main.locate_terms(words, main.compile_terms(["invoice", "micro"])) == {}
+
+
+def test_highlight_pdf_batches_quads_per_term_and_page(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    main = sys.modules["ocr-service.main"]
+    pages = [MagicMock() for _ in range(3)]
+    pages[0].get_text.return_value = [(0, 0, 5, 5, "alpha"), (6, 0, 9, 5, "alpha")]
+    pages[1].get_text.return_value = [(0, 0, 5, 5, "beta")]
+    pages[2].get_text.return_value = [(0, 0, 5, 5, "gamma")]
+    doc = MagicMock()
+    doc.__len__.return_value = 3
+    doc.__getitem__.side_effect = lambda index: pages[index]
+    monkeypatch.setattr(main.fitz, "open", lambda path: doc)
+    monkeypatch.setattr(main, "OCR_PAGES_PER_SHARD", 1)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        main.highlight_pdf("doc.pdf", ["alpha", "beta"], "out.pdf", pool)
+
+    assert pages[0].add_highlight_annot.call_count == 1
+    assert len(pages[0].add_highlight_annot.call_args.kwargs["quads"]) == 2
+    assert pages[1].add_highlight_annot.call_count == 1
+    assert pages[2].add_highlight_annot.call_count == 0
+    doc.save.assert_called_once_with("out.pdf")
+
+
+def test_iter_pages_queues_ocr_ahead_of_the_reader(monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+
+    main = sys.modules["ocr-service.main"]
+    scanned_page = MagicMock(rect=MagicMock(width=612.0, height=792.0))
+    scanned_page.get_text.return_value = {"blocks": [{"type": 1}]}
+    doc = MagicMock()
+    doc.__len__.return_value = 6
+    doc.__getitem__.side_effect = lambda index: scanned_page
+    monkeypatch.setattr(main.fitz, "open", lambda path: doc)
+    monkeypatch.setattr(main, "OCR_PAGES_PER_SHARD", 1)
+    monkeypatch.setattr(main, "OCR_READAHEAD_SHARDS", 2)
+    monkeypatch.setattr(main, "ocr_page", lambda path, page_num, width, height, dpi: [])
+    queued = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def submit(self, fn, *args):
+            if fn is main.ocr_page:
+                queued.append(args[1])
+            return super().submit(fn, *args)
+
+    with RecordingPool(max_workers=2) as pool:
+        pages = main.iter_pages("scan.pdf", pool)
+        assert next(pages)["source"] == "ocr"
+        # The reader stalls on the first page; OCR for the window behind it is already queued
+        assert queued == [0, 1, 2, 3]
+        pages.close()
+
+
+def test_search_index_returns_locations(tmp_path):
+    main = sys.modules["ocr-service.main"]
+    index = main.SearchIndex(tmp_path / "index.db")
+    result = {"pages": [
+        {"page_number": 1, "blocks": [{"text": "Invoice total due", "bbox": [1, 2, 3, 4]}]},
+        {"page_number": 2, "blocks": [{"text": "Payment terms", "bbox": [5, 6, 7, 8]}]}
+    ]}
+    index.add("doc-1", "ocr", main.ocr_index_rows(result))
+    index.add("call-1", "audio", [(" the invoice was paid", {"segment_id": 0, "start": 1.0, "end": 2.5})])
+
+    hits = index.search("invoice")
+    assert {hit["file_id"] for hit in hits} == {"doc-1", "call-1"}
+
+    hits = index.search("invoice", source="ocr")
+    assert hits == [{
+        "file_id": "doc-1", "source": "ocr", "text": "Invoice total due", "page": 1, "bbox": [1, 2, 3, 4]
+    }]
+    # FTS5 syntax in user input is treated as plain words
+    assert index.search('terms" OR "x') == []
+
+
+def test_extract_ocrs_only_scanned_pages(monkeypatch):
+    main = sys.modules["ocr-service.main"]
+    scanned = MagicMock()
+    scanned.rect = MagicMock(width=600.0, height=800.0)
+    scanned.get_text.return_value = {"blocks": [{"type": 1}]}
+    doc = FakeDoc(2)
+    doc._pages.append(scanned)
+    monkeypatch.setattr(main.fitz, "open", lambda path: doc)
+
+    image = MagicMock(width=1200, height=1600)
+    convert = MagicMock(return_value=[image])
+    monkeypatch.setattr(main, "convert_from_path", convert)
+    monkeypatch.setattr(main.pytesseract, "image_to_data", MagicMock(return_value={
+        "text": ["", "Scanned", "total"],
+        "left": [0, 100, 400],
+        "top": [0, 200, 200],
+        "width": [1200, 200, 100],
+        "height": [1600, 40, 40],
+        "conf": ["-1", "96.5", "91"]
+    }))
+
+    result = main.extract_text_with_coordinates("scan.pdf", ocr_mode="auto")
+
+    convert.assert_called_once_with("scan.pdf", dpi=main.OCR_DPI, first_page=3, last_page=3)
+    assert [page["source"] for page in result["pages"]] == ["text", "text", "ocr"]
+    blocks = result["pages"][2]["blocks"]
+    assert [block["text"] for block in blocks] == ["Scanned", "total"]
+    assert blocks[0]["bbox"] == [50.0, 100.0, 150.0, 120.0]
+
+    result = main.extract_text_with_coordinates("scan.pdf", ocr_mode="off")
+    assert result["pages"][2]["source"] == "scanned"
+    assert convert.call_count == 1
+
+
+def test_extract_stream_sends_pages_and_tees_result(monkeypatch, tmp_path):
+    import json
+
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "result_cache", main.ArtifactCache(tmp_path, max_bytes=10 ** 6))
+    monkeypatch.setattr(main, "search_index", main.SearchIndex(tmp_path / "index.db"))
+    monkeypatch.setattr(main.fitz, "open", lambda path: FakeDoc(3))
+
+    files = {"file": ("report.pdf", b"%PDF-1.4 report", "application/pdf")}
+    response = client.post("/ocr/extract?stream=true", files=files)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines] == ["start", "page", "page", "page", "end"]
+    assert lines[-1]["total_pages"] == 3
+
+    file_id = lines[0]["file_id"]
+    stored = json.loads((tmp_path / f"{file_id}_result.json").read_text())
+    assert stored == {"pages": [line["page"] for line in lines[1:4]], "total_pages": 3}
+
+    # The tee'd result is cached like a regular extraction
+    cached = client.post("/ocr/extract", files=files).json()
+    assert cached["cached"] is True and cached["extraction"] == stored
+
+
+def test_failed_extraction_deletes_upload(monkeypatch, tmp_path):
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "result_cache", main.ArtifactCache(tmp_path, max_bytes=10 ** 6))
+    monkeypatch.setattr(main, "search_index", main.SearchIndex(tmp_path / "index.db"))
+    monkeypatch.setattr(main.fitz, "open", MagicMock(side_effect=RuntimeError("broken pdf")))
+
+    files = {"file": ("broken.pdf", b"%PDF-1.4 broken", "application/pdf")}
+    assert client.post("/ocr/extract", files=files).status_code == 500
+    streamed = client.post("/ocr/extract?stream=true", files=files)
+    assert streamed.text.splitlines()[-1].startswith('{"type": "error"')
+
+    assert list(tmp_path.glob("*.pdf")) == []
+    assert list(tmp_path.glob("*_result*")) == []
+
+
+def test_compact_result_round_trips_json_shape(tmp_path):
+    main = sys.modules["ocr-service.main"]
+    result = {"pages": [
+        {"page_number": 1, "width": 612.0, "height": 792.0, "source": "text", "blocks": [
+            {"text": "Résumé", "bbox": [72.5, 90.25, 140.0, 102.0], "size": 12.0, "font": "Helvetica"},
+            {"text": "Total", "bbox": [72.5, 110.0, 100.0, 122.0], "size": 10.5, "font": "Helvetica-Bold"}
+        ]},
+        {"page_number": 2, "width": 612.0, "height": 792.0, "source": "ocr", "blocks": [
+            {"text": "scanned", "bbox": [10.0, 20.0, 30.0, 40.0], "size": 20.0, "font": "", "confidence": 91.0}
+        ]},
+        {"page_number": 3, "width": 612.0, "height": 792.0, "source": "text", "blocks": []}
+    ], "total_pages": 3}
+    writer = main.CompactResultWriter(tmp_path / "doc_result.ocrc")
+    for page in result["pages"]:
+        writer.write_page(page)
+    writer.close()
+
+    with main.CompactResult(tmp_path / "doc_result.ocrc") as compact:
+        assert compact.fonts == ["Helvetica", "Helvetica-Bold", ""]
+        assert compact.page(1) == result["pages"][1]
+        assert compact.to_json() == result
+    assert main.load_result(tmp_path / "doc_result.ocrc") == result
+
+
+def test_get_result_reads_only_requested_pages(monkeypatch, tmp_path):
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    pages = [
+        {"page_number": n, "width": 612.0, "height": 792.0, "source": "text", "blocks": [
+            {"text": f"header {n}", "bbox": [10.0, 10.0, 100.0, 20.0], "size": 12.0, "font": "Helvetica"},
+            {"text": f"footer {n}", "bbox": [10.0, 700.0, 100.0, 710.0], "size": 8.0, "font": "Helvetica"}
+        ]}
+        for n in range(1, 6)
+    ]
+    main.save_result("doc", {"pages": pages, "total_pages": 5})
+    assert (tmp_path / "doc_result.idx").exists()
+
+    # Indexed results never parse the whole file
+    monkeypatch.setattr(main, "load_result", MagicMock(side_effect=AssertionError("full load")))
+    response = client.get("/ocr/result/doc", params={"pages": "2-3,5,9", "bbox": "0,650,612,792"})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_pages"] == 5
+    assert [page["page_number"] for page in data["pages"]] == [2, 3, 5]
+    assert [block["text"] for block in data["pages"][0]["blocks"]] == ["footer 2"]
+
+    assert client.get("/ocr/result/doc", params={"pages": "3-1"}).status_code == 400
+    assert client.get("/ocr/result/missing").status_code == 404
+
+
+def test_download_supports_ranges_and_conditional_requests(monkeypatch, tmp_path):
+    main = sys.modules["ocr-service.main"]
+    monkeypatch.setattr(main, "UPLOAD_DIR", tmp_path)
+    monkeypatch.setattr(main, "DOWNLOAD_CHUNK_SIZE", 4)
+    (tmp_path / "doc_highlighted.pdf").write_bytes(b"%PDF-0123456789")
+
+    full = client.get("/ocr/download/doc_highlighted.pdf")
+    assert full.status_code == 200
+    assert full.content == b"%PDF-0123456789"
+    etag = full.headers["etag"]
+
+    assert client.get("/ocr/download/doc_highlighted.pdf", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get(
+        "/ocr/download/doc_highlighted.pdf", headers={"If-Modified-Since": full.headers["last-modified"]}
+    ).status_code == 304
+
+    partial = client.get("/ocr/download/doc_highlighted.pdf", headers={"Range": "bytes=5-10"})
+    assert partial.status_code == 206
+    assert partial.content == b"012345"
+    assert partial.headers["content-range"] == "bytes 5-10/15"
+
+    suffix = client.get("/ocr/download/doc_highlighted.pdf", headers={"Range": "bytes=-3"})
+    assert suffix.content == b"789"
+
+    stale = client.get("/ocr/download/doc_highlighted.pdf", headers={"Range": "bytes=0-3", "If-Range": '"old"'})
+    assert stale.status_code == 200
+
+    unsatisfiable = client.get("/ocr/download/doc_highlighted.pdf", headers={"Range": "bytes=99-"})
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["content-range"] == "bytes */15"
+
+
+def test_highlight_incremental_and_overlay_modes(monkeypatch, tmp_path):
+    main = sys.modules["ocr-service.main"]
+    page = MagicMock()
+    page.rect = MagicMock(width=612.0, height=792.0)
+    page.get_text.return_value = [(0, 0, 5, 5, "alpha"), (6, 0, 9, 5, "beta")]
+    doc = MagicMock()
+    doc.__len__.return_value = 1
+    doc.__getitem__.side_effect = lambda index: page
+    doc.can_save_incrementally.return_value = True
+    monkeypatch.setattr(main.fitz, "open", lambda path: doc)
+
+    source = tmp_path / "doc.pdf"
+    source.write_bytes(b"%PDF")
+    output = tmp_path / "doc_highlighted.pdf"
+    assert main.highlight_pdf(str(source), ["alpha"], str(output), mode="incremental") is None
+    # The upload is moved rather than copied, and only an update is appended
+    assert output.exists() and not source.exists()
+    doc.saveIncr.assert_called_once_with()
+    doc.save.assert_not_called()
+
+    # A failed update leaves the upload in place and no output behind
+    failing = tmp_path / "failing.pdf"
+    failing.write_bytes(b"%PDF")
+    doc.saveIncr.side_effect = RuntimeError("disk full")
+    with pytest.raises(RuntimeError):
+        main.highlight_pdf(str(failing), ["alpha"], str(tmp_path / "failing_highlighted.pdf"), mode="incremental")
+    assert failing.exists() and not (tmp_path / "failing_highlighted.pdf").exists()
+    doc.saveIncr.side_effect = None
+
+    page.add_highlight_annot.reset_mock()
+    overlay = main.highlight_pdf(str(output), ["alpha", "beta"], None, mode="overlay")
+    assert overlay == {"total_pages": 1, "pages": [{
+        "page_number": 1, "width": 612.0, "height": 792.0, "highlights": [
+            {"term": "alpha", "quads": [[[0, 0], [5, 0], [0, 5], [5, 5]]]},
+            {"term": "beta", "quads": [[[6, 0], [9, 0], [6, 5], [9, 5]]]}
+        ]
+    }]}
+    page.add_highlight_annot.assert_not_called()
+    assert doc.save.call_count == 0
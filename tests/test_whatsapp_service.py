@@ -29,3 +29,275 @@ def test_webhook_verification():
     # We might need to mock os.environ
     # But for now, let's see if it handles missing token gracefully or if we can inject it.
     pass
+
+
+def test_send_retries_throttled_requests_on_shared_client(monkeypatch):
+    import httpx
+
+    main = sys.modules["whatsapp-service.main"]
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        if len(calls) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"messages": [{"id": "wamid.1"}]})
+
+    shared = {}
+
+    async def get_http_client():
+        if "client" not in shared:
+            shared["client"] = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        return shared["client"]
+
+    monkeypatch.setattr(main, "get_http_client", get_http_client)
+    monkeypatch.setattr(main, "WHATSAPP_API_TOKEN", "token")
+    monkeypatch.setattr(main, "WHATSAPP_BACKOFF_BASE", 0.001)
+
+    response = client.post("/whatsapp/send/text", json={"to": "15551234567", "message": "hi"})
+    assert response.status_code == 200
+    assert response.json()["response"]["messages"][0]["id"] == "wamid.1"
+    assert len(calls) == 3
+
+    # Retry-After wins over backoff; backoff is jittered within the cap
+    throttled = httpx.Response(429, headers={"Retry-After": "7"})
+    assert main.retry_delay(0, throttled) == 7.0
+    # An HTTP date is compared with the current UTC time, whatever the local zone
+    retry_at = main.email.utils.formatdate(main.time.time() + 20, usegmt=True)
+    assert 18 <= main.retry_delay(0, httpx.Response(503, headers={"Retry-After": retry_at})) <= 20
+    assert all(0 <= main.retry_delay(10) <= main.WHATSAPP_BACKOFF_MAX for _ in range(20))
+
+
+def test_every_attempt_takes_a_rate_limit_token(monkeypatch):
+    import asyncio
+    import httpx
+
+    main = sys.modules["whatsapp-service.main"]
+    statuses = [429, 503, 200]
+    transport = httpx.MockTransport(lambda request: httpx.Response(statuses.pop(0), headers={"Retry-After": "0"}))
+
+    async def get_http_client():
+        return httpx.AsyncClient(transport=transport)
+
+    class CountingBucket:
+        acquired = 0
+
+        async def acquire(self):
+            self.acquired += 1
+
+    monkeypatch.setattr(main, "get_http_client", get_http_client)
+    bucket = CountingBucket()
+    response = asyncio.run(main.graph_request("POST", "https://graph.test/messages", bucket))
+
+    assert response.status_code == 200
+    assert bucket.acquired == 3
+
+
+def test_finished_broadcasts_leave_memory_after_ttl(monkeypatch, tmp_path):
+    import asyncio
+
+    main = sys.modules["whatsapp-service.main"]
+
+    async def fake_send(payload, rate_limit=None):
+        return {"messages": [{"id": "wamid.1"}]}
+
+    monkeypatch.setattr(main, "send_whatsapp_message", fake_send)
+    manager = main.BroadcastManager(tmp_path, rate=1000, concurrency=2, state_ttl=0)
+
+    async def run():
+        state = manager.create({"text": "hi", "template_name": None, "language_code": "en"}, ["a", "b"])
+        manager.start(state["broadcast_id"])
+        await manager._tasks[state["broadcast_id"]]
+        return state["broadcast_id"]
+
+    broadcast_id = asyncio.run(run())
+
+    # The final state is still served, from disk
+    assert manager.get(broadcast_id)["status"] == "completed"
+    assert manager.states == {}
+
+
+def test_broadcast_sends_once_per_recipient_and_resumes(monkeypatch, tmp_path):
+    import json
+    import time
+
+    main = sys.modules["whatsapp-service.main"]
+    sent = []
+
+    async def fake_send(payload, rate_limit=None):
+        await rate_limit.acquire()
+        if payload["to"] == "bad":
+            raise main.HTTPException(status_code=500, detail="WhatsApp API error: 400")
+        sent.append(payload["to"])
+        return {"messages": [{"id": f"wamid.{payload['to']}"}]}
+
+    monkeypatch.setattr(main, "send_whatsapp_message", fake_send)
+    monkeypatch.setattr(main, "WHATSAPP_API_TOKEN", "token")
+    monkeypatch.setattr(main, "BROADCAST_CHECKPOINT_INTERVAL", 0.01)
+    monkeypatch.setattr(main, "BROADCASTS_DIR", tmp_path)
+    manager = main.BroadcastManager(tmp_path, rate=1000, concurrency=4)
+    monkeypatch.setattr(main, "broadcasts", manager)
+
+    # An interrupted broadcast: one of three recipients already has a result
+    interrupted = manager.create({"text": "again", "template_name": None, "language_code": "en"}, ["a", "b", "c"])
+    main.append_lines(tmp_path / interrupted["broadcast_id"] / "results.jsonl", [{"index": 0, "to": "a", "status": "sent"}])
+    interrupted["status"] = "running"
+    main.write_json_atomic(tmp_path / interrupted["broadcast_id"] / "state.json", interrupted)
+    manager.states.clear()
+
+    with TestClient(main.app) as broadcast_client:
+        body = "\n".join([json.dumps({"text": "hello"}), '"111"', '{"to": "bad"}', '"111"', '"222"'])
+        response = broadcast_client.post(
+            "/whatsapp/broadcast", content=body, headers={"Content-Type": "application/x-ndjson"}
+        )
+        assert response.status_code == 202
+        broadcast = response.json()
+        assert (broadcast["total"], broadcast["duplicates"]) == (3, 1)
+
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            states = [broadcast_client.get(f"/whatsapp/broadcast/{b}").json() for b in (broadcast["broadcast_id"], interrupted["broadcast_id"])]
+            if all(state["status"] == "completed" for state in states):
+                break
+            time.sleep(0.02)
+
+        assert (states[0]["sent"], states[0]["failed"]) == (2, 1)
+        assert states[1]["sent"] == 3
+        results = broadcast_client.get(broadcast["results_url"]).text.splitlines()
+        assert sorted(json.loads(line)["status"] for line in results) == ["failed", "sent", "sent"]
+
+    # The resumed broadcast only sent to recipients without a result
+    assert sorted(sent) == ["111", "222", "b", "c"]
+
+
+def test_message_log_batches_rotates_and_compresses(monkeypatch, tmp_path):
+    import gzip
+    import json
+
+    main = sys.modules["whatsapp-service.main"]
+    writer = main.MessageLogWriter(tmp_path, batch_size=100, interval=60, compress=True)
+    for day, count in (("2024-01-01", 3), ("2024-01-02", 2)):
+        for n in range(count):
+            writer.append({"timestamp": f"{day}T10:00:0{n}", "type": "received_message", "data": {"n": n}})
+
+    # A long interval still writes everything on flush, in one batch
+    assert writer.flush(timeout=5)
+    assert writer.stats()["batches"] == 1
+    assert not (tmp_path / "messages-2024-01-01.jsonl").exists()
+    with gzip.open(tmp_path / "messages-2024-01-01.jsonl.gz", "rt") as f:
+        assert [json.loads(line)["data"]["n"] for line in f] == [0, 1, 2]
+    assert len((tmp_path / "messages-2024-01-02.jsonl").read_text().splitlines()) == 2
+    writer.close()
+
+
+def test_message_log_retries_store_without_rewriting_files(tmp_path):
+    main = sys.modules["whatsapp-service.main"]
+    store = main.MessageStore(tmp_path / "messages.db")
+    add = store.add
+    calls = []
+
+    def flaky_add(entries):
+        calls.append(len(entries))
+        if len(calls) == 1:
+            raise main.sqlite3.OperationalError("database is locked")
+        return add(entries)
+
+    store.add = flaky_add
+    writer = main.MessageLogWriter(tmp_path, batch_size=100, interval=60, store=store)
+    for n in range(3):
+        writer.append({"timestamp": "2024-01-01T10:00:00", "type": "received_message", "data": {"id": f"w{n}"}})
+    assert writer.flush(timeout=5)
+    writer.close()
+
+    assert calls == [3, 3]
+    assert len((tmp_path / "messages-2024-01-01.jsonl").read_text().splitlines()) == 3
+    assert store.count() == 3
+    assert writer.stats()["failures"] == 1
+
+
+def test_message_store_joins_statuses_and_pages(monkeypatch, tmp_path):
+    main = sys.modules["whatsapp-service.main"]
+    store = main.MessageStore(tmp_path / "messages.db")
+    monkeypatch.setattr(main, "message_store", store)
+    monkeypatch.setattr(main, "message_log", main.MessageLogWriter(tmp_path, 100, 60, store=store))
+
+    # A status can arrive in an earlier batch than its sent message
+    main.log_message("message_status", {"id": "wamid.1", "recipient_id": "15550001", "status": "delivered"})
+    main.message_log.flush(timeout=5)
+    for n in range(5):
+        main.log_message("sent_text", {"to": f"1555000{n % 2}", "response": {"messages": [{"id": f"wamid.{n}"}]}})
+    main.log_message("received_message", {"id": "wamid.in", "from": "15550001"})
+    main.log_message("message_status", {"id": "wamid.1", "recipient_id": "15550001", "status": "read"})
+    main.log_message("message_status", {"id": "wamid.1", "recipient_id": "15550001", "status": "sent"})
+
+    sent = client.get("/whatsapp/messages", params={"type": "sent_text"}).json()["messages"]
+    assert [(m["wamid"], m["status"]) for m in sent][-2:] == [("wamid.1", "read"), ("wamid.0", "accepted")]
+
+    pages, cursor = [], None
+    while True:
+        params = {"phone": "15550001", "limit": 2, **({"before": cursor} if cursor else {})}
+        page = client.get("/whatsapp/messages", params=params).json()
+        pages.append([m["type"] for m in page["messages"]])
+        if not (cursor := page["next_cursor"]):
+            break
+    assert sum(pages, []) == [
+        "message_status", "message_status", "received_message", "sent_text", "sent_text", "message_status"
+    ]
+    assert client.get("/whatsapp/messages", params={"since": "yesterday"}).status_code == 400
+    main.message_log.close()
+
+    # A new store imports the existing log files once
+    backfilled = main.MessageStore(tmp_path / "backfill.db")
+    assert backfilled.backfill(tmp_path) == 9
+    assert backfilled.query(wamid="wamid.1", message_type="sent_text")[0]["status"] == "read"
+    assert backfilled.backfill(tmp_path) == 0
+
+
+def test_webhook_acks_then_processes_without_duplicates(monkeypatch, tmp_path):
+    main = sys.modules["whatsapp-service.main"]
+    store = main.MessageStore(tmp_path / "messages.db")
+    monkeypatch.setattr(main, "message_store", store)
+    monkeypatch.setattr(main, "message_log", main.MessageLogWriter(tmp_path, 100, 60, store=store))
+    processor = main.WebhookProcessor(workers=2, max_queue=10, dedup_size=100)
+    monkeypatch.setattr(main, "webhook_processor", processor)
+
+    # A status stored before a restart is still recognised afterwards
+    store.add([{"timestamp": "2024-01-01T00:00:00", "type": "message_status",
+                "data": {"id": "wamid.out", "recipient_id": "15550001", "status": "delivered"}}])
+    processor.seed(store.recent_event_keys(100))
+
+    body = {
+        "object": "whatsapp_business_account",
+        "entry": [{"changes": [{"value": {
+            "messages": [{"id": "wamid.in", "from": "15550001", "type": "text"}],
+            "statuses": [
+                {"id": "wamid.out", "recipient_id": "15550001", "status": "delivered"},
+                {"id": "wamid.out", "recipient_id": "15550001", "status": "read"}
+            ]
+        }}]}]
+    }
+    # Meta redelivers the same body
+    for _ in range(2):
+        assert client.post("/whatsapp/webhook", json=body).json() == {"status": "ok"}
+    assert client.post("/whatsapp/webhook", content=b"not json").status_code == 200
+
+    assert processor.flush(timeout=5)
+    stats = client.get("/whatsapp/webhook/stats").json()
+    assert stats["received"] == stats["processed"] == 3
+    assert stats["queue_depth"] == 0
+    assert (stats["events"], stats["duplicates"], stats["failures"]) == (6, 4, 1)
+
+    main.message_log.flush(timeout=5)
+    logged = client.get("/whatsapp/messages", params={"phone": "15550001"}).json()["messages"]
+    assert sorted((m["type"], m["status"]) for m in logged) == [
+        ("message_status", "delivered"), ("message_status", "read"), ("received_message", None)
+    ]
+    processor.close()
+    main.message_log.close()
+
+    # With the queue full the webhook asks Meta to retry
+    monkeypatch.setattr(main, "webhook_processor", main.WebhookProcessor(workers=1, max_queue=0, dedup_size=10))
+    assert client.post("/whatsapp/webhook", json=body).status_code == 503
+    main.webhook_processor.close()